@@ -18,8 +18,62 @@
 #   4) Produce a report
 #
 # Running the Program:
-#   >python HLSv3.py <format: batch> <batch-file-name>
-#   >python HLSv3.py <format: command> <valid-URL>
+#   >python HLSv3.py [options] <format: batch> <batch-file-name>
+#   >python HLSv3.py [options] <format: command> <valid-URL>
+#   >python HLSv3.py [options] <format: monitor> <live-playlist-URL or file-of-URLs>
+#   >python HLSv3.py [options] <format: merge> <result-file> [<result-file> ...]
+#   >python HLSv3.py [options] <format: crawl> <playlist-URL>
+#
+#   crawl        Walks every resource a playlist references, breadth first: Variant,
+#                rendition (EXT-X-MEDIA) and I-frame playlists, EXT-X-SESSION-DATA
+#                JSON, keys, EXT-X-MAP and media segments.  Relative URIs are resolved
+#                against the playlist that references them, and each distinct resource
+#                is fetched (and a playlist validated) once, --workers at a time.
+#   merge        Merges json/ndjson result files (e.g. of --shard runs) into one
+#                aggregate report, and with --format json|ndjson into one result file.
+#   monitor      Reloads live Media playlists (and every Variant of a Master) on the
+#                cadence their EXT-X-TARGETDURATION allows and validates the new
+#                segments of each reload, until EXT-X-ENDLIST or Ctrl-C.  A file
+#                that is not a playlist lists one playlist URL per line.
+#   --refreshes N  monitor: stop after N reloads of each playlist (default 0, no limit).
+#   --concurrency N  monitor: reloads in progress at the same time (default 64).
+#   --per-host N   monitor: reloads in progress at the same time per host (default 8).
+#   --journal FILE  batch: append a checkpoint line to FILE for every playlist that
+#                was validated and reported (or failed).
+#   --resume     batch: skip the playlists the --journal says are done (failed ones
+#                are tried again).  ndjson --output files are appended to.
+#   --verify-content  With --resume, fetch the done playlists again and validate only
+#                those whose content hash changed.
+#   --shard K/N  batch: only validate the lines of shard K (1 to N) of N.  The shard
+#                of a line is picked by a hash of its URL, the same on every machine.
+#   --report FILE  batch: write one PDF for the whole batch file, a summary table of
+#                the checks and the worst playlists followed by a section per
+#                playlist, in place of a PDF per playlist.
+#   --detail-lines N  PDF: error lines listed per check (default 50, 0 for all).
+#                Errors repeated on nearby lines are listed as one line range.
+#   --stream     Media playlists are validated line by line as they are read,
+#                so very large VOD/EVENT playlists are checked in constant memory.
+#   --workers N  Number of Variant playlists of a Master (or crawl resources)
+#                retrieved at the same time (default 8).
+#   --pool-size N  Keep-alive HTTP connections kept open to each host (default:
+#                the number of workers).
+#   --timeout S  HTTP timeout in seconds, or CONNECT,READ (default 5,30).
+#   --jobs N     Batch mode: validate the playlists of a batch file in N worker
+#                processes (default 1).  Reports keep their per-playlist names.
+#   --format F   report (PDF in batch mode, screen in command mode), json or ndjson.
+#                json/ndjson write a record per playlist and Variant, no PDF.
+#   --output FILE  Where json/ndjson records go (default '-', stdout).
+#   --log-level L  off, error, warning (default), info or debug.  Only debug
+#                logs every line of the playlists.
+#   --log-file FILE  Log file (default Hlsv3.log, '-' for stderr).  It is only
+#                created if something is logged.
+#   --cache DIR  Keep the web playlists in DIR and revalidate them with conditional
+#                GETs; an unchanged playlist reuses its stored body and results.
+#                The results are pickled: DIR must not be writable by untrusted users.
+#   --result-cache N  Keep the results of the last N distinct playlist contents in
+#                memory (default 256, 0 turns the memory tier off).
+#   --result-db FILE  Also keep the results in a SQLite database, across runs.  The
+#                results are pickled: FILE must not be writable by untrusted users.
 #
 ####################################
 ####################################
@@ -54,117 +108,121 @@ import json
 import getopt
 import re
 import logging
-import requests
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.platypus import Paragraph, Frame
-from reportlab.lib.colors import blue as blue
-from PyPDF2 import PdfFileWriter, PdfFileReader
+import logging.handlers
+import queue
+import atexit
 import os
+import time
+import urllib.parse
+import collections
+import hashlib
+import pickle
+import heapq
+import array
+import bisect
+import math
+import functools
+import itertools
+import concurrent.futures
+import multiprocessing
+import threading
+import tempfile
+import shutil
+import xml.sax.saxutils
 
 ##End package import section
+##requests, reportlab and PyPDF2 are slow to import, so they are loaded the first
+##time they are needed: see getSession(), loadReportlab() and loadPyPDF2()
+
+##Logging is set up by setupLogging() from the --log-level and --log-file options
+##of main(), nothing is configured (or written) just by importing the program.
+LOG_LEVELS = {'off': None, 'debug': logging.DEBUG, 'info': logging.INFO,
+	'warning': logging.WARNING, 'error': logging.ERROR}
+LOG_FORMAT = '%(levelname)s:%(name)s:%(message)s'
+traceLines = False  #True only at --log-level debug; guards the logs of every content line
+
+##Number of Variant playlists retrieved at the same time by createMaster() (--workers)
+FETCH_WORKERS = 8
+
+##Shared HTTP connection pool used by fetchURL() (--pool-size, --timeout)
+HTTP_POOL_HOSTS = 10            #Number of hosts the pool keeps connections for
+HTTP_POOL_SIZE = FETCH_WORKERS  #Keep-alive connections kept open to each host
+HTTP_TIMEOUT = (5, 30)          #(connect, read) timeout in seconds
 
-##Set up logging for the program
-logging.basicConfig(filename='Hlsv3.log', level=logging.DEBUG)
+##Tag codes of the playlist lines.  Every line of a playlist is tokenized once
+##when the playlist object is created (see tokenizeContent()), and the
+##ValidationEngine feeds each line only to the rules that want its tag.
+TAG_BLANK = 0     #Empty line
+TAG_URI = 1       #Line that is not a comment/tag (media segment or playlist URI)
+TAG_COMMENT = 2   #Comment line that is not an #EXT tag
+TAG_UNKNOWN = 3   ##EXT tag that is not in TAG_NAMES
+TAG_NAMES = ['EXTM3U', 'EXT-X-VERSION', 'EXTINF', 'EXT-X-BYTERANGE', 'EXT-X-DISCONTINUITY',
+	'EXT-X-KEY', 'EXT-X-MAP', 'EXT-X-PROGRAM-DATE-TIME', 'EXT-X-DATERANGE', 'EXT-X-TARGETDURATION',
+	'EXT-X-MEDIA-SEQUENCE', 'EXT-X-DISCONTINUITY-SEQUENCE', 'EXT-X-ENDLIST', 'EXT-X-PLAYLIST-TYPE',
+	'EXT-X-I-FRAMES-ONLY', 'EXT-X-MEDIA', 'EXT-X-STREAM-INF', 'EXT-X-I-FRAME-STREAM-INF',
+	'EXT-X-SESSION-DATA', 'EXT-X-SESSION-KEY', 'EXT-X-INDEPENDENT-SEGMENTS', 'EXT-X-START',
+	'EXT-X-ALLOW-CACHE']
+TAG_CODES = {name: code for code, name in enumerate(TAG_NAMES, TAG_UNKNOWN + 1)}
+URI_KEY = 'URI'   #Tag name of URI lines (in Rule.tags)
 
 ##Class definitions for the playlist hierarchy
+##Each playlist keeps its own results and lists in __slots__, so nothing is shared
+##between playlists (or threads/processes) and the objects stay small in a batch.
 class Playlist(object):
+	__slots__ = ('suppliedURL', 'master', 'playVersion', 'ckHeader', 'checkResults',
+		'tagCodes', 'rules', 'streamed')
+
+	def __init__(self):
+		self.playVersion = 0
+		self.checkResults = []	 # Used to store the contents of check results
+		self.tagCodes = bytearray()
+		self.rules = None		 # Set by runRules() / ruleResult()
+		self.streamed = False	 # Set by streamVariant()
+
+	def reset(self):
+		#Removes every result and starts the lists empty again (see clearMaster())
+		for cls in type(self).__mro__:
+			for name in getattr(cls, '__slots__', ()):
+				if hasattr(self, name):
+					delattr(self, name)
+		self.__init__()
+
 	def accept(self, validator):
 		validator.visit(self)
 		
 	def __str__(self):
 		return self.__class__.__name__
-		
-	def checkHeader(self, validator):
-		check = False
+
+	def ruleResult(self, name):
+		#Returns the result of the named validation rule.  The rules are filled in by
+		#a single traversal of the playlist (see runRules()), which is run here if
+		#the checks did not start through runChecks().
+		if self.rules is None:
+			self.rules = ValidationEngine(self.master).run(self.content(), self.tagCodes)
+		return self.rules[name].result(self)
+
+	def content(self):
+		#Returns the raw content list of a Master or Variant playlist
 		if self.master:
-			if self.mContent[0] == '#EXTM3U':
-				check = True
-		else:
-			if self.vContent[0] == '#EXTM3U':
-				check = True
-		return check
+			return self.mContent
+		return self.vContent
+
+	def checkHeader(self, validator):
+		return self.ruleResult('checkHeader')
 		
 	def masVersion(self, validator):
 		# A playlist file must not contain more than one EXT-X-VERSION tag (ERROR)
-		
-		logging.info("++---------->> Beginning version check for Master object")
-		multiple = False      #boolean result for check 1)
-		versionInstance = 0   #integer for number of EXT-X-VERSION tags found
-		version = 0           #integer for extracted version number
-		lineNums = []         #Keeps track of line numbers where multiple tags found
-		lineNums.clear
-		
-		for line in range(0, len(self.mContent)):
-			if self.mContent[line].startswith('#EXT-X-VERSION:'):
-				versionInstance += 1
-				logging.info("++---------->> #EXT-X-VERSION tag found on line %s", line)
-				lineNums.append(line)
-				version = int(self.mContent[line].strip('#EXT-X-VERSION:'))
-		if versionInstance > 1:
-			multiple = True
-		logging.info("++---------->> Number of EXT-X-VERSION tags found = %s", versionInstance)
-		logging.info("++---------->> Version of Master object = %s", version)
-		logging.info("++---------->> Leaving version check for Master object")
-		return multiple, version, lineNums
-				
+		return self.ruleResult('masVersion')
 		
 	def varVersion(self, validator):
 		# A playlist file must not contain more than one EXT-X-VERSION tag (ERROR)
-		
-		logging.info("++---------->> Beginning version check for Variant object")
-		multiple = False      #Assumed false unless versionInstance > 1
-		versionInstance = 0   #integer for number of EXT-X-VERSION tags found
-		version = 0           #integer for extracted version number
-		lineNums = []         #Keeps track of line numbers where multiple tags found
-		lineNums.clear
-		
-		for line in range(0, len(self.vContent)):
-			if self.vContent[line].startswith('#EXT-X-VERSION:'):
-				versionInstance += 1
-				logging.info("++---------->> #EXT-X-VERSION tag found on line %s", line)
-				lineNums.append(line)
-				version = int(self.vContent[line].strip('#EXT-X-VERSION:'))
-		if versionInstance > 1:
-			multiple = True
-		logging.info("++---------->> Number of EXT-X-VERSION tags found = %s", versionInstance)
-		logging.info("++---------->> Version of Variant object = %s", version)
-		logging.info("++---------->> Leaving version check for Variant object")
-		return multiple, version, lineNums
+		return self.ruleResult('varVersion')
 		
 	def mCompVersion(self, validator):
 		# 1) Must be 7+ if Master has SERVICE values for INSTREAM-ID attribute of EXT-X-MEDIA (ERROR)
 		# 2) If 6+ PROGRAM-ID attribute for EXT-X-STREAM-INF and EXT-X-I-FRAME-STREAM-INF removed (WARNING)
 		# 3) If 7+ EXT-X-ALLOW-CACHE removed
-		
-		logging.info("++------------------------------>> Entering mCompVersion")
-		compService = True  #Validation status for 1) - SERVICE values for INSTREAM-ID
-		compProgram = True  #Validation status for 2) - PROGRAM-ID attribute
-		compCache = True    #Validation status for 3) - EXT-X-ALLOW-CACHE
-		lineNums = []
-		lineNums.clear
-		for line in range(0, len(self.mContent)):
-			if self.mContent[line].startswith('#EXT-X-MEDIA'):
-				if 'INSTREAM-ID' and 'SERVICE' in self.mContent[line]:
-					if self.playVersion < 7:
-						compService = False
-						lineNums.append('INSTREAM-ID and SERVICE require version 7+ on line= ' + str(line+1))
-			elif self.mContent[line].startswith('#EXT-X-STREAM-INF'):
-				if self.playVersion < 6 and 'PROGRAM-ID' in self.mContent[line]:
-					compProgram = False
-					lineNums.append('EXT-X-STREAM-INF used with PROGRAM-ID requires version 6+ line= ' + str(line+1))
-			elif self.mContent[line].startswith('#EXT-X-I-FRAME-STREAM-INF'):
-				if self.playVersion < 6 and 'PROGRAM-ID' in self.mContent[line]:
-					compProgram = False
-					lineNums.append('EXT-X-I-FRAME-STREAM-INF tag used with PROGRAM-ID requires version 6+ line= ' + str(line+1))
-			elif self.playVersion >= 7:
-				if 'EXT-X-ALLOW-CACHE' in self.mContent[line]:
-					compCache = False
-					lineNums.append('EXT-X-ALLOW-CACHE tag NOT allowed in version 7+ line= ' + str(line+1))
-		logging.info("++------------------------------>> Leaving mCompVersion")
-		return compService, compProgram, compCache, lineNums
+		return self.ruleResult('mCompVersion')
 	
 	def vCompVersion(self, validator):
 		# Must be 2+ if IV attribute of EXT-X-KEY:IV tag(ERROR)
@@ -173,390 +231,73 @@ class Playlist(object):
 		# Must be 5+ if has EXT-X-MAP (ERROR)
 		# Must be 6+ if Media playlist & EXT-X-MAP does not contain EXT-X-I-FRAMES-ONLY (ERROR)
 		# If 7+ EXT-X-ALLOW-CACHE removed
-		logging.info("++------------------------------>> Entering vCompVersion")
-		check2 = True  #Status of IV attribute of EXT-X-KEY:IV
-		check3 = True  #Status of floating point EXTINF values
-		check4 = True  #Status of EXT-X-BYTERANGE or EXT-X-I-FRAMES-ONLY
-		check5 = True  #Status of EXT-X-MAP
-		check6 = True  #Status of EXT-X-MAP does not contain EXT-X-I-FRAMES-ONLY
-		check7 = True  #Status of EXT-X-ALLOW-CACHE removed
-		iFrames = False #True if the EXT-X-I-FRAMES-ONLY tag is found
-		lineNums = []
-		lineNums.clear
-		
-		#Fist iterate through the list to find if certain tags exist
-		for line in range(0, len(self.vContent)):
-			if self.vContent[line].startswith('#EXT-X-I-FRAMES-ONLY'):
-				iFrames = True
-		#Now iterate through the list and make our checks
-		for line in range(0, len(self.vContent)):
-			if self.vContent[line].startswith('#EXT-X-KEY:IV'):
-				check2 = False
-				lineNums.append('EXT-X-KEY:IV tag on line: ' + str(line+1))
-			elif self.vContent[line].startswith('#EXTINF:'):
-				tag = self.vContent[line].strip('#EXTINF:')
-				if self.playVersion < 3 and '.' in tag:   #Decimals not allowed below version-3
-					if tag.find('.') < 3:    #EXTINF:<duration>,<title> and title could have period
-						check3 = False
-						lineNums.append('EXTINF tag with decimals & Version less than 3.0  on line= ' + str(line+1))
-			elif self.vContent[line].startswith('#EXT-X-BYTERANGE:') and self.playVersion < 4:
-				check4 = False
-				lineNums.append('EXT-X-BYTERANGE tag & Version < 4 on line= ' + str(line+1))
-			elif self.vContent[line].startswith('#EXT-X-I-FRAMES-ONLY') and self.playVersion < 4:
-				check4 = False
-				lineNums.append('EXT-X-I-FRAMES-ONLY tag & Version < 4 on line= ' + str(line+1))
-			elif self.vContent[line].startswith('#EXT-X-MAP'):
-				if iFrames:
-					if self.playVersion < 5:
-						check5 = False
-						lineNums.append('EXT-X-MAP tag & I-Frames with Version < 5 on line= ' + str(line+1))
-				else:
-					if self.playVersion < 6:
-						check6 = False
-						lineNums.append('EXT-X-MAP tag without I-Frames & Version < 6 on line= ' + str(line+1))
-			elif self.vContent[line].startswith('#EXT-X-ALLOW-CACHE') and self.playVersion >= 7:
-				check7 = False
-				lineNums.append('EXT-X-ALLOW-CACHE tag & Version 7+ on line= ' + str(line+1))
-			logging.info("++------------------------------>> Leaving vCompVersion")
-			return check2, check3, check4, check5, check6, check7, lineNums
+		return self.ruleResult('vCompVersion')
 			
 	def mMixCheck(self, validator):
 	#This check determines if Master Playlists contain Media or Variant tags
-		logging.info("++------------------------------>> Entering mMixCheck")
-		mixedTags = False
-		lineNums = []
-		lineNums.clear
-		for line in range(0, len(self.mContent)):
-			if self.mContent[line].startswith('#EXTINF:') or self.mContent[line].startswith('#EXT-X-BYTERANGE:'):
-				mixedTags = True
-				lineNums.append('#EXTINF/#EXT-X-BYTERANGE found on line= ' + str(line+1))
-			elif self.mContent[line].startswith('#EXT-X-DISCONTINUITY:') or self.mContent[line].startswith('#EXT-X-KEY:'):
-				mixedTags = True
-				lineNums.append('#EXT-X-DISCONTINUITY/#EXT-X-KEY found on line= ' + str(line+1))
-			elif self.mContent[line].startswith('EXT-X-MAP:') or self.mContent[line].startswith('#EXT-X-PROGRAM-DATE-TIME:'):
-				mixedTags = True
-				lineNums.append('EXT-X-MAP/EXT-X-PROGRAM-DATE-TIME found on line= ' + str(line+1))
-			elif self.mContent[line].startswith('#EXT-X-DATERANGE:') or self.mContent[line].startswith('#EXT-X-TARGETDURATION:'):
-				mixedTags = True
-				lineNums.append('EXT-X-DATERANGE/EXT-X-TARGETDURATION found on line= ' + str(line+1))
-			elif self.mContent[line].startswith('#EXT-X-MEDIA-SEQUENCE:') or self.mContent[line].startswith('#EXT-X-ENDLIST:'):
-				mixedTags = True
-				lineNums.append('EXT-X-MEDIA-SEQUENCE/EXT-X-ENDLIST found on line= ' + str(line+1))
-			elif self.mContent[line].startswith('#EXT-X-PLAYLIST-TYPE:') or self.mContent[line].startswith('#EXT-X-I-FRAMES-ONLY:'):
-				mixedTags = True
-				lineNums.append('EXT-X-PLAYLIST-TYPE/EXT-X-I-FRAMES-ONLY found on line= ' + str(line+1))
-			elif self.mContent[line].startswith('#EXT-X-DISCONTINUITY-SEQUENCE:'):
-				mixedTags = True
-				lineNums.append('EXT-X-DISCONTINUITY-SEQUENCE found on line= ' + str(line+1))
-		return mixedTags, lineNums
-		logging.info("++------------------------------>> Exiting  mMixCheck")
+		return self.ruleResult('mMixCheck')
 			
 	def vMixCheck(self, validator):
 	#This check determines if Variant/Media playlists contain Master tags
-		logging.info("++------------------------------>> Entering vMixCheck")
-		mixedTags = False
-		lineNums = []
-		lineNums.clear
-		for line in range(0, len(self.vContent)):
-			if self.vContent[line].startswith('#EXT-X-MEDIA:') or self.vContent[line].startswith('#EXT-X-STREAM-INF:'):
-				mixedTags = True
-				lineNums.append('EXT-X-MEDIA/EXT-X-STREAM-INF found on line= ' + str(line+1))
-			if self.vContent[line].startswith('#EXT-X-I-FRAME-STREAM-INF:') or self.vContent[line].startswith('#EXT-X-SESSION-DATA:'):
-				mixedTags = True
-				lineNums.append('EXT-X-I-FRAME-STREAM-INF/EXT-X-SESSION-DATA found on line= ' + str(line+1))
-			if self.vContent[line].startswith('#EXT-X-SESSION-KEY:'):
-				mixedTags = True
-				lineNums.append('EXT-X-SESSION-KEY found on line= ' + str(line+1))
-		return mixedTags, lineNums
-		logging.info("++------------------------------>> Exiting  vMixCheck")
+		return self.ruleResult('vMixCheck')
 		
 	def mStreamInf(self, validator):
 	#This check looks to see if the EXT-X-STREAM-INF tag in a master playlist is
 	#followed by a URI line, and if the BANDWIDTH attribute is present.
-		logging.info("++----------------------------->> Entering mStreamInf")
-		nextLine = False  #Will be set true if next line does not contain .m3u8
-		bwAttr = True     #Will be set to false if no ATTRIBUTE in tag
-		lineNums = []
-		lineNums.clear
-		for line in range(0, len(self.mContent)):
-			if self.mContent[line].startswith('#EXT-X-STREAM-INF:'):
-				if self.mContent[line].count('BANDWIDTH') < 1:
-					bwAttr = False
-					lineNums.append('EXT-X-STREAM-INF tag does NOT have BANDWIDTH attribute line= ' + str(line+1))
-				if  not self.mContent[line + 1].endswith('.m3u8'):
-					nextLine = True
-					lineNums.append('EXT-X-STREAM-INF tag NOT followed by URI on line= ' + str(line+1))
-		logging.info("++----------------------------->> Exiting mStreamInf")
-		return nextLine, bwAttr, lineNums
+		return self.ruleResult('mStreamInf')
 		
 	def vStreamInf(self, validator):
 	#This check looks to see if the EXT-X-STREAM-INF tag is present in a variant file.
 	#This is a violation, and an ERROR.
-		logging.info("++----------------------------->> Entering vStreamInf")
-		checkV = False
-		lineNums = []
-		lineNums.clear
-		for line in range(0, len(self.vContent)):
-			if self.vContent[line].startswith('#EXT-X-STREAM-INF:'):
-				checkV = True
-				lineNums.append('EXT-X-STREAM-INF found on line= ' + str(line+1))
-		logging.info("++----------------------------->> Exiting vStreamInf")
-		return checkV, lineNums
+		return self.ruleResult('vStreamInf')
 	
 	def mIFrame(self, validator):
 	#This check applies to Master Playlists and if this tag is used it must have
 	#a BANDWIDTH and URI attribute
-		logging.info("++----------------------------->> Entering mIFrame")
-		bwAttr = True
-		uriAttr = True
-		lineNums = []
-		lineNums.clear
-		for line in range(0, len(self.mContent)):
-			if self.mContent[line].startswith('#EXT-X-I-FRAME-STREAM-INF:'):
-				if self.mContent[line].count('BANDWIDTH') < 1:
-					bwAttr = False
-					lineNums.append('EXT-X-I-FRAME-STREAM-INF tag missing BANDWIDTH on line= ' + str(line+1))
-				if self.mContent[line].count('URI') < 1:
-					uriAttr = False
-					lineNums.append('EXT-X-I-FRAME-STREAM-INF tag missing URI on line= ' + str(line+1))
-		logging.info("<<-----------------------------++ Exiting mIFrame")
-		return bwAttr, uriAttr, lineNums
+		return self.ruleResult('mIFrame')
 		
 	def mSessionData(self, validator):
 	#This check applies to Master Playlists and if this tag is used it must have
 	#a DATA-ID attribute.  It must also have one of: URI formatted as JSON or a value
 	#but, may not have a value and a URI.
-		logging.info("++----------------------------->> Entering mSessionData")
-		dCheck = False  #If the checks are violated, json, uri, and/or multiples
-		json = False   #will be set to True and returned.
-		uri = False
-		missing = False
-		multiples = False
-		tagList = []   #used to keep track of lines with the tag for multiples portion
-		tagList.clear
-		possibleMults = [] #list of possible multiples
-		possibleMults.clear
-		dIDList = []       #Used to keep track of DATA-ID values for multiple tags
-		dIDList.clear
-		langList = []      #Used to keep track of LANGUAGE values for multiples
-		langList.clear
-		iterList = []      #Working list used for parsing possible multiple tags
-		iterList.clear
-		multiLines = []    #Keeps track of DATA-ID:LANGUAGE lines
-		multiLines.clear
-		lineNums = []      #Returned list for errors and line numbers
-		lineNums.clear
-		for line in range(0, len(self.mContent)):
-			if self.mContent[line].startswith('#EXT-X-SESSION-DATA'):
-				#If you have the tag DATA-ID must be present
-				if not 'DATA-ID' in self.mContent[line]:
-					dCheck = True
-					lineNums.append('EXT-X-SESSION-DATA Must have DATA-ID attribute on line= ' + str(line + 1))
-				#If you have a VALUE it must be json formatted
-				if 'VALUE' in self.mContent[line]:
-					if 'URI' in self.mContent[line]:
-						uri = True
-						lineNums.append('VALUE may not be used with URI line= ' + str(line + 1))
-				if 'URI' in self.mContent[line]:
-					if not '.json' in self.mContent[line]:
-						json = True
-						lineNums.append('URI MUST be JSON formatted line= ' + str(line + 1))
-				#VALUE not found, so URI must be present
-				elif not 'URI' in self.mContent[line]:
-					missing = True
-					lineNums.append('EXT-X-SESSION-DATA Must have URI formatted as JSON or a VALUE line= ' + str(line + 1))
-				tagList.append(self.mContent[line])
-				multiLines.append(line)
-		if len(tagList) > 0:  #If no tags found not an issue
-			logging.info("++------------------->> mSessionData possible multiples")
-			#Filter out all of the possible multiple DATA-ID:LANGUAGE tags
-			for l in range(0, len(tagList)):
-				if 'DATA-ID' in tagList[l] and 'LANGUAGE' in tagList[l]:
-					possibleMults.append(tagList[l])
-				else:
-					multiLines.pop(l)  #If not a match, remove the line number from the list
-			#Current logic: now that we have a list of possible multiples we need to split(")
-			#each line to extract the first and third elements.  If that set matches another
-			#set, then we have a multiple DATA-ID and LANGUAGE and multiples is set to True.
-			
-			#Extract the values into new lists we can compare
-			for k in range(0, len(possibleMults)):
-				iterList = possibleMults[k].split('"')
-				dIDList.append(iterList[1])
-				langList.append(iterList[3])
-				iterList.clear()
-				
-			#Now iterate through the dIDList and look for multiples
-			for k in range(0, len(dIDList)):
-				logging.info("++---------->> DATA-ID= %s", dIDList[k])
-				logging.info("++---------->> LANGUAGE= %s", langList[k])
-				for j in range(k+1, len(dIDList)):
-					if dIDList[k] == dIDList[j] and langList[k] == langList[j]:
-						multiples = True
-			if multiples:
-				for j in range(0, len(multiLines)):  #text file starts counting at 1 not zero
-					multiLines[j] = multiLines[j] + 1
-				lineNums.append('DATA-ID:LANGUAGE Lines to check for duplicates= ' + str(multiLines))
-						
-			logging.info("<<-------------------++ mSessionData possible multiples")
-		logging.info("<<-----------------------------+++ Exiting mSessionData")
-		return dCheck, json, uri, missing, multiples, lineNums
+		return self.ruleResult('mSessionData')
 		
 	def mMediaMaster(self, validator):
 		#The EXT-X-INDEPENDENT-SEGMENTS tag and EXT-X-START tag may appear in either
 		#a Master or Variant playlist.  They MUST only appear once in the playlist.  Additionally,
 		#the START tag also has a REQUIRED TIME-OFFSET attribute (if the optional tag is used.)
-		logging.info("++------------------------------>> Entering mMediaMaster")
-		segCount = 0   #counter used to keep track of the number of SEGMENTS tags
-		startCount = 0 #counter used to keep track of the number of START tags
-		segments = False  #Result of segments test where True indicates a Failure
-		start = False     #Result of START test where True indicates a Failure
-		tOffset = False   #Result of Time offset attribute where True indicates a failure
-		lineNums = []      #Returned list for errors and line numbers
-		lineNums.clear
-		for line in range(0, len(self.mContent)):
-			if self.mContent[line].startswith('#EXT-X-INDEPENDENT-SEGMENTS'):
-				segCount += 1
-				lineNums.append('EXT-X-INDEPENDENT-SEGMENTS on line=' + str(line+1))
-			elif self.mContent[line].startswith('#EXT-X-START'):
-				startCount += 1
-				lineNums.append('EXT-X-START on line= ' + str(line))
-				if 'TIME-OFFSET' not in self.mContent[line]:
-					tOffset = True
-					lineNums.append('EXT-X-START tag missing on line= ' + str(line+1))
-		if segCount > 1:
-			segments = True
-		if startCount > 1:
-			start = True
-		logging.info("<<------------------------------++ Exiting mMediaMaster")
-		return segments, start, tOffset, lineNums
+		return self.ruleResult('mMediaMaster')
 		
 	def vMediaMaster(self, validator):
 		#The EXT-X-INDEPENDENT-SEGMENTS tag and EXT-X-START tag may appear in either
 		#a Master or Variant playlist.  They MUST only appear once in the playlist.  Additionally,
 		#the START tag also has a REQUIRED TIME-OFFSET attribute (if the optional tag is used.)
-		logging.info("++------------------------------>> Entering vMediaMaster")
-		segCount = 0   #counter used to keep track of the number of SEGMENTS tags
-		startCount = 0 #counter used to keep track of the number of START tags
-		segments = False  #Result of segments test where True indicates a Failure
-		start = False     #Result of START test where True indicates a Failure
-		tOffset = False   #Result of Time offset attribute where True indicates a failure
-		lineNums = []      #Returned list for errors and line numbers
-		lineNums.clear
-		for line in range(0, len(self.vContent)):
-			if self.vContent[line].startswith('#EXT-X-INDEPENDENT-SEGMENTS'):
-				segCount += 1
-				lineNums.append('EXT-X-INDEPENDENT-SEGMENTS on line=' + str(line+1))
-			elif self.vContent[line].startswith('#EXT-X-START'):
-				startCount += 1
-				lineNums.append('EXT-X-START on line= ' + str(line))
-				if 'TIME-OFFSET' not in self.vContent[line]:
-					tOffset = True
-					lineNums.append('EXT-X-START tag missing on line= ' + str(line+1))
-		if segCount > 1:
-			segments = True
-		if startCount > 1:
-			start = True
-		logging.info("<<------------------------------++ Exiting vMediaMaster")
-		return segments, start, tOffset, lineNums
+		return self.ruleResult('vMediaMaster')
 		
 	def vTargetDuration(self, validator):
 		#This method ensures that this tag only appears once in a playlist, and the EXTINF duration 
 		#must be less than or equal to this maximum amount.
-		logging.info("++------------------------------>> Entering vTargetDuration")
-		count = 0         #Keeps track of the number of times this tag is found in playlist
-		duration = 0.0    #Duration from EXTINF tag
-		maxDuration = 0.0 #Duration from Targetduration tag (the max value)
-		delim = 0       #Used to note the position of ',' in the tag for slicing the duration value
-		check = False   #Returned as True if TARGETDURATION tag present
-		multTag = False #Returned as True if too many tags 
-		durationCheck = False  #Returned as True if duration > maxDuration
-		lineNums = []      #Returned list for errors and line numbers
-		lineNums.clear
-		for line in range(0, len(self.vContent)):
-			if self.vContent[line].startswith('#EXT-X-TARGETDURATION'):
-				check = True
-				count = count + 1
-				if count == 1:
-					lineNums.append('First EXT-X-TARGETDURATION tag found on line= ' + str(line+1))
-				maxDuration = float(self.vContent[line].strip('#EXT-X-TARGETDURATION:'))
-				if count > 1:
-					multTag = True
-					lineNums.append('Extra EXT-X-TARGETDURATION tag found on line= ' + str(line+1))
-			if self.vContent[line].startswith('#EXTINF:'):
-				duration = float(self.vContent[line].strip('#EXTINF:,'))
-				if duration > maxDuration:
-					durationCheck = True
-					lineNums.append('EXTINF value exceeds Max on line= ' + str(line+1))
-		logging.info("<<------------------------------++ Exiting vTargetDuration")
-		return check, multTag, durationCheck, lineNums
+		return self.ruleResult('vTargetDuration')
 	
 	def vMediaSequence(self, validator):
 		#This method ensures that the optional EXT-X-MEDIA-SEQUENCE tag appears only once in a playlist
 		#and if present appears before the first media segment in the playlist.
-		logging.info("++------------------------------>> Entering vMediaSequence")
-		count = 0         #Keeps track of the number of times this tag is found in playlist
-		medSeg = False  #Set to True when a media-segment.ts is encountered
-		check = False   #Returned as True if EXT-X-MEDIA-SEQUENCE tag present and before first media segment
-		multTag = False #Returned as True if too many tags 
-		lineNums = []      #Returned list for errors and line numbers
-		lineNums.clear
-		for line in range(0, len(self.vContent)):
-			if self.vContent[line].endswith('.ts'):
-				medSeg = True
-			if self.vContent[line].startswith('#EXT-X-MEDIA-SEQUENCE'):
-				count = count + 1
-				if not medSeg:
-					check = True
-					lineNums.append('EXT-X-MEDIA-SEQUENCE found before Media Segment line= ' + str(line+1))
-				else:
-					lineNums.append('EXT-X-MEDIA-SEQUENCE found on line= ' + str(line+1))
-		if count > 1:
-			multTag = True
-		logging.info("<<------------------------------++ Exiting vMediaSequence")
-		return count, check, multTag, lineNums
+		return self.ruleResult('vMediaSequence')
 		
 	def vDiscontinuitySequence(self, validator):
 	#This method ensures that the optional EXT-X-DISCONTINUITY-SEQUENCE tag appears only once in a playlist
 	#and if present appears before the first media segment in the playlist.
-		logging.info("++------------------------------>> Entering vDiscontinuitySequence")
-		count = 0         #Keeps track of the number of times this tag is found in playlist
-		medSeg = False  #Set to True when a media-segment.ts is encountered
-		check = False   #Returned as True if EXT-X-DISCONTINUITY-SEQUENCE tag present and before first media segment
-		multTag = False #Returned as True if too many tags 
-		lineNums = []      #Returned list for errors and line numbers
-		lineNums.clear
-		for line in range(0, len(self.vContent)):
-			if self.vContent[line].endswith('.ts'):
-				medSeg = True
-			if self.vContent[line].startswith('#EXT-X-DISCONTINUITY-SEQUENCE'):
-				count = count + 1
-				if not medSeg:
-					check = True
-					lineNums.append('EXT-X-DISCONTINUITY-SEQUENCE found before first media segment on line= ' + str(line+1))
-				else:
-					lineNums.append('EXT-X-DISCONTINUITY-SEQUENCE found on line= ' + str(line+1))
-		if count > 1:
-			multTag = True
-		logging.info("<<------------------------------++ Exiting vDiscontinuitySequence")
-		return count, check, multTag, lineNums
+		return self.ruleResult('vDiscontinuitySequence')
 		
 	def vIFramesOnly(self, validator):
 	#This method checks to see if a variant playlist contains the EXT-X-I-FRAMES-ONLY tag, and if it 
 	#does, then raises a warning if the EXT-X-MAP tag is not in the file.
-		logging.info("++------------------------------>> Entering vIFramesOnly")
-		check = False  #Set to True when EXT-X-I-FRAMES-ONLY tag is found
-		medSeg = False #Set to True when EXT-X-MAP tag is found
-		lineNums = []      #Returned list for errors and line numbers
-		lineNums.clear
-		for line in range(0, len(self.vContent)):
-			if self.vContent[line].startswith('#EXT-X-I-FRAMES-ONLY'):
-				check = True
-			if self.vContent[line].startswith('#EXT-X-MAP'):
-				medSeg = True
-				lineNums.append('EXT-X-MAP missing on line= ' + str(line+1))
-		logging.info("<<------------------------------++ Exiting vIFramesOnly")
-		return check, medSeg, lineNums
+		return self.ruleResult('vIFramesOnly')
+
+	def segmentTable(self):
+	#This method returns the SegmentTable of a variant playlist (durations, byte ranges,
+	#discontinuities and URI lines of its media segments).
+		return self.ruleResult('segments')
 		
 	# BASIC DEFINITONS USED
 	#suppliedURL 		 # The string for URL supplied by the command line or batch file
@@ -565,11 +306,26 @@ class Playlist(object):
 	
 	# RELEASE-2 ADDITIONS
 	# ckHeader - A text string set by HeaderCheck() for checkHeader() results
-	
-	# OTHER ATTRIBUTES
-	checkResults = []	 # Used to store the contents of check results
+
+	# TAG CODES (set by createMaster()/createVariant() from tokenizeContent())
+	# tagCodes = bytearray with the TAG_* code of every line
+	# rules = Dictionary of check method name -> Rule filled in by the ValidationEngine
+	# streamed = True if the rules were filled in while the playlist was read (--stream),
+	#            in which case the content and tag codes are not kept
+
+	# OTHER ATTRIBUTES (set in __init__)
+	# checkResults = Used to store the contents of check results
 
 class VariantPlaylist(Playlist):
+	__slots__ = ('type', 'vContent', 'fetchError', 'vVersionCk', 'compCheckV2', 'compCheckV3',
+		'compCheckV4', 'compCheckV5', 'compCheckV6', 'compCheckV7', 'vTagsResult', 'vResultTag',
+		'vSegTag', 'vStartTag', 'vTimeTag', 'vTagCheck', 'vMultiTag', 'vDurCheck', 'vRoundCheck',
+		'vDurStats', 'durationStats', 'vTCount',
+		'vMedTagCheck', 'vMultiSeqTag', 'vDSTCount', 'DSTagCheck', 'vDSMultiCheck', 'vFrameCheck',
+		'vMediaSeg', 'verCkErrorLines', 'verCompCkErrorLines', 'vTagsErrorLines', 'vStreamInfLines',
+		'vMediaMasterLines', 'vTargetDurationLines', 'vMediaSequenceLines', 'vDiscSequenceLines',
+		'vIFramesOnlyLines', 'vRoundingLines')
+
 	# BASIC DEFINITIONS:
 	# Has a list of URLs to media segments (or locally defined) that end in ".ts"
 	# Has #EXT-X-PLAYLIST-TYPE the playlist type (LIVE, EVENT, VOD)
@@ -596,6 +352,8 @@ class VariantPlaylist(Playlist):
 	# vTagCheck = Text result for EXT-X-TARGETDURATION Tag in TargetDurationCheck()
 	# vMultiTag = Text result for Multiple EXT-X-TARGETDURATION Tags in TargetDurationCheck()
 	# vDurCheck = Text result for EXTINF duration values in TargetDurationCheck()
+	# vRoundCheck = Text result for rounded EXTINF duration values in TargetDurationCheck()
+	# vDurStats = Text summary of the EXTINF durations (count, total, mean, p99, drift) in TargetDurationCheck()
 	# vTCount = Text result (exists if) EXT-X-MEDIA-SEQUENCE is NOT present for MediaSequenceCheck()
 	# vMedTagCheck = Text result of EXT-X-MEDIA-SEQUENCE appears before media segments in MediaSequenceCheck()
 	# vMultiSeqTag = Text result (exists if) Multiple EXT-X-MEDIA-SEQUENCE tags found in MediaSequenceCheck()
@@ -607,20 +365,45 @@ class VariantPlaylist(Playlist):
 	# 
 	
 	# OTHER ATTRIBUTES:
-	type = []  # EVENT,VOD,LIVE
-	vContent = []     #List of content from the original URL
-	verCkErrorLines = []  #Lists the lines tags were found for VersionCheck()
-	verCompCkErrorLines = [] #Tracks which lines were errors for VerCompatCheck()
-	vTagsErrorLines = []   #Tracks which lines were errors for MixTagsCheck()
-	vStreamInfLines = []   #Tracks which lines were errors for StreamInfCheck()
-	vMediaMasterLines = [] #Tracks which lines were errors for MediaMasterCheck()
-	#vTargetDurationLines = [] #Tracks which lines were errors for TargetDurationCheck()
-	#vMediaSequenceLines = [] #Tracks which lines were errors for MediaSequenceCheck()
-	#vDiscSequenceLines = []  #Tracks which lines were errors for DiscontinuitySequenceCheck()
-	#vIFramesOnlyLines = []  #Tracks which lines were errors for IFramesOnlyCheck()
+	def __init__(self):
+		Playlist.__init__(self)
+		self.master = False
+		self.type = None  # EVENT,VOD,LIVE
+		self.vContent = []     #List of content from the original URL
+		self.fetchError = None	 # Reason a Variant could not be retrieved, set by createMaster()
+		self.verCkErrorLines = []  #Lists the lines tags were found for VersionCheck()
+		self.verCompCkErrorLines = Findings() #Tracks which lines were errors for VerCompatCheck()
+		self.vTagsErrorLines = Findings()   #Tracks which lines were errors for MixTagsCheck()
+		self.vStreamInfLines = Findings()   #Tracks which lines were errors for StreamInfCheck()
+		self.vMediaMasterLines = Findings() #Tracks which lines were errors for MediaMasterCheck()
+		self.vTargetDurationLines = Findings() #Tracks which lines were errors for TargetDurationCheck()
+		self.vRoundingLines = Findings()   #Tracks which EXTINF lines round above the target for TargetDurationCheck()
+		self.durationStats = None  #DurationStats from TargetDurationCheck()
+		self.vMediaSequenceLines = Findings() #Tracks which lines were errors for MediaSequenceCheck()
+		self.vDiscSequenceLines = Findings()  #Tracks which lines were errors for DiscontinuitySequenceCheck()
+		self.vIFramesOnlyLines = Findings()  #Tracks which lines were errors for IFramesOnlyCheck()
+
+	def accept(self, validator):
+		#A Variant that could not be retrieved is not checked (see notRetrieved())
+		if self.fetchError is None:
+			validator.visit(self)
+
+	def notRetrieved(self, reason):
+		#Marks a Variant that could not be retrieved: no rule runs on it, and every
+		#check result reads NOT RETRIEVED instead of a PASSED for content never seen.
+		self.fetchError = reason   #Listed with the Master's variantErrors
+		for name in VARIANT_CHECKS:
+			setattr(self, name, 'NOT RETRIEVED')
 	
 	
 class MasterPlaylist(Playlist):
+	__slots__ = ('variantList', 'variantURLs', 'variantErrors', 'mContent', 'mVersionCk',
+		'compService', 'compProgram', 'compCache', 'mTagsResult', 'mResultLine', 'mResultBW',
+		'mBWidth', 'mURI', 'mIDCheck', 'mJSONCk', 'mURICk', 'mMultCk', 'mMissCk', 'mSegTag',
+		'mStartTag', 'mTimeTag', 'verCkErrorLines', 'verCompCkErrorLines', 'mTagsErrorLines',
+		'mStreamInfLines', 'mIFrameLines', 'mSessionDataLines', 'mMediaMasterLines')
+
+
 	# BASIC DEFINITIONS:
 	# Has a header that starts with #EXTM3U
 	# Has a #EXT-X-STREAM-INF that has BANDWIDTH, RESOLUTION, & CODEC
@@ -649,19 +432,922 @@ class MasterPlaylist(Playlist):
 	#
 	
 	# OTHER ATTRIBUTES:
-	variantList = []  #List of variant objects
-	variantURLs = []  #List of URLs for each variant object
-	mContent = []     #List of content from the original URL
-	verCkErrorLines = [] #Tracks which lines were errors for VersionCheck()
-	verCompCkErrorLines = [] #Tracks which lines were errors for VerCompatCheck()
-	mTagsErrorLines = []  #List of error lines from MixTagsCheck()
-	mStreamInfLines = []  #List of error lines from StreamInfCheck()
-	mIFrameLines = []  #List of error lines from IFrameCheck()
-	mSessionDataLines = [] #List of error lines from SessionDataCheck()
-	mMediaMasterLines = [] #List of error lines from MediaMasterCheck()
+	def __init__(self):
+		Playlist.__init__(self)
+		self.master = True
+		self.variantList = []  #List of variant objects
+		self.variantURLs = []  #List of URLs for each variant object
+		self.variantErrors = []  #(URL, reason) for each variant that could not be retrieved
+		self.mContent = []     #List of content from the original URL
+		self.verCkErrorLines = [] #Tracks which lines were errors for VersionCheck()
+		self.verCompCkErrorLines = Findings() #Tracks which lines were errors for VerCompatCheck()
+		self.mTagsErrorLines = Findings()  #List of error lines from MixTagsCheck()
+		self.mStreamInfLines = Findings()  #List of error lines from StreamInfCheck()
+		self.mIFrameLines = Findings()  #List of error lines from IFrameCheck()
+		self.mSessionDataLines = Findings() #List of error lines from SessionDataCheck()
+		self.mMediaMasterLines = Findings() #List of error lines from MediaMasterCheck()
 	
 
 
+## This is where the validation rules are defined
+##
+## Each check method on Playlist is backed by a rule object.  The ValidationEngine
+## makes one traversal over a playlist and hands every line to the rules that
+## subscribed to its tag (rule.tags), so a playlist is read once no matter how
+## many checks there are.  A rule keeps whatever state it needs while the lines
+## stream past, and result() returns the same tuple the check method always has.
+## Rules that depend on the playlist version defer the decision to result(),
+## which runs after VersionCheck has set playVersion.
+
+##The offending lines of the checks are kept as findings: a finding code and a line
+##number.  FINDING_TEXT holds the (severity, text, label) of each code, and the text
+##of a finding is only made when a report lists it (see Findings).
+SEVERITY_INFO = 0
+SEVERITY_WARNING = 1
+SEVERITY_ERROR = 2
+SEVERITY_NAMES = ('INFO', 'WARNING', 'ERROR')
+FINDING_TEXT = []
+
+def findingCode(severity, text, label=' on line= '):
+	FINDING_TEXT.append((severity, text, label))
+	return len(FINDING_TEXT) - 1
+
+F_NOTE = findingCode(SEVERITY_INFO, '', '')   #Free text, kept in Findings.notes
+F_VERSION_SERVICE = findingCode(SEVERITY_ERROR, 'INSTREAM-ID and SERVICE require version 7+')
+F_VERSION_PROGRAM = findingCode(SEVERITY_WARNING, 'EXT-X-STREAM-INF used with PROGRAM-ID requires version 6+', ' line= ')
+F_VERSION_IFRAME_PROGRAM = findingCode(SEVERITY_WARNING, 'EXT-X-I-FRAME-STREAM-INF tag used with PROGRAM-ID requires version 6+', ' line= ')
+F_VERSION_MASTER_CACHE = findingCode(SEVERITY_ERROR, 'EXT-X-ALLOW-CACHE tag NOT allowed in version 7+', ' line= ')
+F_VERSION_IV = findingCode(SEVERITY_ERROR, 'EXT-X-KEY:IV tag', ' on line: ')
+F_VERSION_FLOAT = findingCode(SEVERITY_ERROR, 'EXTINF tag with decimals & Version less than 3.0 ')
+F_VERSION_BYTERANGE = findingCode(SEVERITY_ERROR, 'EXT-X-BYTERANGE tag & Version < 4')
+F_VERSION_IFRAMES = findingCode(SEVERITY_ERROR, 'EXT-X-I-FRAMES-ONLY tag & Version < 4')
+F_VERSION_MAP_IFRAMES = findingCode(SEVERITY_ERROR, 'EXT-X-MAP tag & I-Frames with Version < 5')
+F_VERSION_MAP = findingCode(SEVERITY_ERROR, 'EXT-X-MAP tag without I-Frames & Version < 6')
+F_VERSION_CACHE = findingCode(SEVERITY_ERROR, 'EXT-X-ALLOW-CACHE tag & Version 7+')
+F_MIX_EXTINF = findingCode(SEVERITY_ERROR, '#EXTINF/#EXT-X-BYTERANGE found')
+F_MIX_DISCONTINUITY = findingCode(SEVERITY_ERROR, '#EXT-X-DISCONTINUITY/#EXT-X-KEY found')
+F_MIX_MAP = findingCode(SEVERITY_ERROR, 'EXT-X-MAP/EXT-X-PROGRAM-DATE-TIME found')
+F_MIX_DATERANGE = findingCode(SEVERITY_ERROR, 'EXT-X-DATERANGE/EXT-X-TARGETDURATION found')
+F_MIX_SEQUENCE = findingCode(SEVERITY_ERROR, 'EXT-X-MEDIA-SEQUENCE/EXT-X-ENDLIST found')
+F_MIX_TYPE = findingCode(SEVERITY_ERROR, 'EXT-X-PLAYLIST-TYPE/EXT-X-I-FRAMES-ONLY found')
+F_MIX_DISC_SEQUENCE = findingCode(SEVERITY_ERROR, 'EXT-X-DISCONTINUITY-SEQUENCE found')
+F_MIX_STREAM = findingCode(SEVERITY_ERROR, 'EXT-X-MEDIA/EXT-X-STREAM-INF found')
+F_MIX_IFRAME = findingCode(SEVERITY_ERROR, 'EXT-X-I-FRAME-STREAM-INF/EXT-X-SESSION-DATA found')
+F_MIX_SESSION_KEY = findingCode(SEVERITY_ERROR, 'EXT-X-SESSION-KEY found')
+F_STREAM_BANDWIDTH = findingCode(SEVERITY_ERROR, 'EXT-X-STREAM-INF tag does NOT have BANDWIDTH attribute', ' line= ')
+F_STREAM_URI = findingCode(SEVERITY_ERROR, 'EXT-X-STREAM-INF tag NOT followed by URI')
+F_STREAM_VARIANT = findingCode(SEVERITY_ERROR, 'EXT-X-STREAM-INF found')
+F_IFRAME_BANDWIDTH = findingCode(SEVERITY_ERROR, 'EXT-X-I-FRAME-STREAM-INF tag missing BANDWIDTH')
+F_IFRAME_URI = findingCode(SEVERITY_ERROR, 'EXT-X-I-FRAME-STREAM-INF tag missing URI')
+F_SESSION_ID = findingCode(SEVERITY_ERROR, 'EXT-X-SESSION-DATA Must have DATA-ID attribute')
+F_SESSION_VALUE_URI = findingCode(SEVERITY_ERROR, 'VALUE may not be used with URI', ' line= ')
+F_SESSION_JSON = findingCode(SEVERITY_ERROR, 'URI MUST be JSON formatted', ' line= ')
+F_SESSION_MISSING = findingCode(SEVERITY_ERROR, 'EXT-X-SESSION-DATA Must have URI formatted as JSON or a VALUE', ' line= ')
+F_INDEPENDENT_SEGMENTS = findingCode(SEVERITY_INFO, 'EXT-X-INDEPENDENT-SEGMENTS', ' on line=')
+F_START = findingCode(SEVERITY_INFO, 'EXT-X-START')
+F_START_OFFSET = findingCode(SEVERITY_ERROR, 'EXT-X-START tag missing')
+F_TARGET_FIRST = findingCode(SEVERITY_INFO, 'First EXT-X-TARGETDURATION tag found')
+F_TARGET_EXTRA = findingCode(SEVERITY_ERROR, 'Extra EXT-X-TARGETDURATION tag found')
+F_TARGET_INVALID = findingCode(SEVERITY_ERROR, 'EXT-X-TARGETDURATION value is not a valid number')
+F_TARGET_EXCEEDED = findingCode(SEVERITY_ERROR, 'EXTINF value exceeds Max')
+F_TARGET_ROUNDED = findingCode(SEVERITY_WARNING, 'EXTINF duration rounds above the target')
+F_EXTINF_INVALID = findingCode(SEVERITY_ERROR, 'EXTINF duration is not a valid number')
+F_MEDIA_SEQUENCE_BEFORE = findingCode(SEVERITY_ERROR, 'EXT-X-MEDIA-SEQUENCE found before Media Segment', ' line= ')
+F_MEDIA_SEQUENCE = findingCode(SEVERITY_INFO, 'EXT-X-MEDIA-SEQUENCE found')
+F_DISC_SEQUENCE_BEFORE = findingCode(SEVERITY_ERROR, 'EXT-X-DISCONTINUITY-SEQUENCE found before first media segment')
+F_DISC_SEQUENCE = findingCode(SEVERITY_INFO, 'EXT-X-DISCONTINUITY-SEQUENCE found')
+F_MAP_MISSING = findingCode(SEVERITY_WARNING, 'EXT-X-MAP missing')
+
+class Findings(object):
+	#The findings of one check, as runs of (finding code, first line, last line,
+	#count) kept in arrays.  previous is the line of the tag before this one that the
+	#finding is about (the line before, if not given): when the latest run with the
+	#same code ends there, the finding extends that run.  So an error on every EXTINF
+	#keeps one run, which spans the URI lines between them but counts only the tags,
+	#and an EXTINF without the error starts a new run.  Indexing or iterating gives
+	#the text of each run, which is only made then.
+	__slots__ = ('codes', 'firsts', 'lasts', 'counts', 'notes', 'latest')
+
+	def __init__(self):
+		self.codes = array.array('H')
+		self.firsts = array.array('q')
+		self.lasts = array.array('q')
+		self.counts = array.array('q')
+		self.notes = []    #Text of the F_NOTE findings, their line is the index
+		self.latest = {}   #Finding code -> index of its latest run
+
+	def add(self, code, line, count=1, last=None, previous=None):
+		if last is None:
+			last = line
+		if previous is None:
+			previous = line - 1
+		index = self.latest.get(code)
+		if code != F_NOTE and index is not None and self.lasts[index] == previous:
+			self.lasts[index] = last
+			self.counts[index] += count
+		else:
+			self.latest[code] = len(self.codes)
+			self.codes.append(code)
+			self.firsts.append(line)
+			self.lasts.append(last)
+			self.counts.append(count)
+
+	def note(self, text):
+		self.notes.append(text)
+		self.add(F_NOTE, len(self.notes) - 1)
+
+	def extend(self, other):
+		for index in range(0, len(other.codes)):
+			if other.codes[index] == F_NOTE:
+				self.note(other.notes[other.firsts[index]])
+			else:
+				self.add(other.codes[index], other.firsts[index], other.counts[index], other.lasts[index], -1)   #Copied as it is
+
+	def runs(self):
+		#Yields (code, severity, first line, last line, count) of every run
+		for index in range(0, len(self.codes)):
+			code = self.codes[index]
+			yield code, FINDING_TEXT[code][0], self.firsts[index], self.lasts[index], self.counts[index]
+
+	def lineCount(self):
+		return sum(self.counts)
+
+	def format(self, index):
+		code = self.codes[index]
+		if code == F_NOTE:
+			return self.notes[self.firsts[index]]
+		severity, text, label = FINDING_TEXT[code]
+		if self.counts[index] == 1:
+			return text + label + str(self.firsts[index])
+		return '%s%s%d-%d (%d lines)' % (text, label.replace('line', 'lines', 1), self.firsts[index], self.lasts[index], self.counts[index])
+
+	def __len__(self):
+		return len(self.codes)
+
+	def __getitem__(self, index):
+		if index < 0:
+			index += len(self.codes)
+		if not 0 <= index < len(self.codes):
+			raise IndexError('finding index out of range')
+		return self.format(index)
+
+	def __iter__(self):
+		for index in range(0, len(self.codes)):
+			yield self.format(index)
+
+	def __repr__(self):
+		return repr(list(self))
+
+##RFC 8216 section 4.2: an attribute-list is a comma-separated list of
+##AttributeName=AttributeValue pairs, where a quoted-string value may itself
+##contain commas and '=' signs.
+ATTRIBUTE_PAIR = re.compile(r'([A-Z0-9-]+)=("[^"\r\n]*"|[^",]*)')
+
+@functools.lru_cache(maxsize=1024)
+def attributeList(text):
+	#Parses the attribute-list of a tag line into a dictionary of attribute name ->
+	#value, with the quotes removed from quoted-string values.  The result is cached
+	#by line, so a tag line is parsed once however many rules read it.  Callers
+	#must not modify the returned dictionary.
+	attributes = {}
+	colon = text.find(':')
+	if colon >= 0:
+		for name, value in ATTRIBUTE_PAIR.findall(text, colon + 1):
+			if value.startswith('"'):
+				value = value[1:-1]
+			attributes[name] = value
+	return attributes
+
+def tagValue(text):
+	#Returns the value following the ':' of a tag line, e.g. '10' for #EXT-X-TARGETDURATION:10
+	return text.partition(':')[2].strip()
+
+def extinfDuration(text):
+	#Returns the <duration> part of #EXTINF:<duration>,[<title>] as a string
+	return tagValue(text).partition(',')[0].strip()
+
+class SegmentTable(object):
+	#Columnar table of the media segments of a VariantPlaylist, one row per EXTINF,
+	#built by SegmentRule while the lines are read.  Each column is a typed array,
+	#so a segment costs about 33 bytes however long its lines are.
+	__slots__ = ('durations', 'extinfLines', 'uriLines', 'byteLengths', 'byteOffsets',
+		'discontinuity', 'mediaSequence', 'invalidLines')
+
+	def __init__(self):
+		self.durations = array.array('d')      #EXTINF duration, -1 if not a valid number
+		self.extinfLines = array.array('i')    #Line number of the EXTINF tag
+		self.uriLines = array.array('i')       #Line number of the segment URI, -1 if missing
+		self.byteLengths = array.array('q')    #EXT-X-BYTERANGE length, -1 if not a sub-range
+		self.byteOffsets = array.array('q')    #EXT-X-BYTERANGE offset, -1 if not a sub-range
+		self.discontinuity = array.array('b')  #1 if EXT-X-DISCONTINUITY comes before the segment
+		self.mediaSequence = 0                 #EXT-X-MEDIA-SEQUENCE of the first segment
+		self.invalidLines = array.array('i')   #EXTINF lines whose duration is not a valid number
+
+	def __len__(self):
+		return len(self.durations)
+
+	def sequenceNumber(self, index):
+		#Media sequence number of the segment in the given row
+		return self.mediaSequence + index
+
+	def totalDuration(self):
+		return sum(duration for duration in self.durations if duration >= 0)   #Skips invalid durations
+
+	def previousExtinf(self, line):
+		#Line of the EXTINF before the given line, -1 if there is none
+		row = bisect.bisect_left(self.extinfLines, line)
+		return self.extinfLines[row - 1] if row > 0 else -1
+
+numpy = None       #Set by loadNumpy() if NumPy is installed
+numpyLoaded = False
+
+def loadNumpy():
+	#NumPy is optional and slow to import, so it is only looked for the first time
+	#durationAnalytics() runs.  Returns None if it is not installed.
+	global numpy, numpyLoaded
+	if not numpyLoaded:
+		numpyLoaded = True
+		try:
+			import numpy
+		except ImportError:
+			logging.info("++---------->> NumPy not installed, durationAnalytics() uses plain Python")
+	return numpy
+
+class DurationStats(object):
+	#Results of durationAnalytics() for one SegmentTable.  The line numbers are
+	#0-based like the rest of the rules.
+	__slots__ = ('count', 'total', 'mean', 'p99', 'maxDrift', 'driftLine', 'overLines', 'roundLines',
+		'invalidLines')
+
+	def __init__(self):
+		self.count = 0          #Segments with a numeric EXTINF duration
+		self.total = 0.0
+		self.mean = 0.0
+		self.p99 = 0.0          #99th percentile duration (linear interpolation)
+		self.maxDrift = 0.0     #Largest gap between the real and the integer-rounded timeline
+		self.driftLine = -1     #EXTINF line where maxDrift is reached
+		self.overLines = []     #EXTINF lines with a duration greater than the target duration
+		self.roundLines = []    #EXTINF lines whose rounded duration is greater than the target
+		self.invalidLines = []  #EXTINF lines left out because the duration is not a valid number
+
+def durationAnalytics(table, targets):
+	#Works out the duration findings of a SegmentTable in one pass.  targets is the
+	#(line, target duration) of each EXT-X-TARGETDURATION tag; a segment is held to
+	#the last one before its EXTINF (0 if there is none yet).  Durations are rounded
+	#half up, and the drift is how far the sum of the rounded durations (what a
+	#client using integer durations sees) moves away from the sum of the real ones.
+	stats = DurationStats()
+	stats.invalidLines = table.invalidLines.tolist()
+	if len(table) == 0:
+		return stats
+	np = loadNumpy()
+	if np is not None:
+		durations = np.frombuffer(table.durations, dtype=np.float64)
+		lines = np.frombuffer(table.extinfLines, dtype=np.int32)
+		targetLines = np.array([line for line, target in targets], dtype=np.int64)
+		targetValues = np.array([0.0] + [target for line, target in targets])
+		limit = targetValues[np.searchsorted(targetLines, lines, side='left')]
+		valid = durations >= 0
+		rounded = np.floor(durations + 0.5)
+		stats.overLines = lines[valid & (durations > limit)].tolist()
+		stats.roundLines = lines[valid & (rounded > limit)].tolist()
+		values = durations[valid]
+		drift = np.cumsum(np.where(valid, durations - rounded, 0.0))
+		stats.count = int(values.size)
+		if stats.count > 0:
+			stats.total = float(values.sum())
+			stats.mean = stats.total / stats.count
+			stats.p99 = float(np.percentile(values, 99))
+			row = int(np.argmax(np.where(valid, np.abs(drift), -1.0)))
+			stats.maxDrift = float(drift[row])
+			stats.driftLine = int(lines[row])
+		return stats
+	values = []
+	drift = 0.0
+	nextTarget = 0
+	limit = 0.0
+	for row in range(0, len(table)):
+		line = table.extinfLines[row]
+		while nextTarget < len(targets) and targets[nextTarget][0] < line:
+			limit = targets[nextTarget][1]
+			nextTarget += 1
+		duration = table.durations[row]
+		if duration < 0:   #Not a valid number, in invalidLines
+			continue
+		rounded = math.floor(duration + 0.5)
+		if duration > limit:
+			stats.overLines.append(line)
+		if rounded > limit:
+			stats.roundLines.append(line)
+		values.append(duration)
+		drift += duration - rounded
+		if abs(drift) > abs(stats.maxDrift) or stats.driftLine < 0:
+			stats.maxDrift = drift
+			stats.driftLine = line
+	stats.count = len(values)
+	if stats.count > 0:
+		stats.total = math.fsum(values)
+		stats.mean = stats.total / stats.count
+		values.sort()
+		rank = (stats.count - 1) * 0.99
+		low = int(rank)
+		high = min(low + 1, stats.count - 1)
+		stats.p99 = values[low] + (values[high] - values[low]) * (rank - low)
+	return stats
+
+class Rule(object):
+	tags = ()   #Tag names (or URI_KEY) this rule wants to be fed
+
+	def feed(self, line, text):
+		#Called for every line carrying one of self.tags.  A rule that needs to see the
+		#line that follows returns a callable, which is fed that next line.
+		pass
+
+	def result(self, pList):
+		pass
+
+	def __str__(self):
+		return self.__class__.__name__
+
+class HeaderRule(Rule):
+	#The first line of every playlist must be #EXTM3U
+	tags = ('EXTM3U',)
+
+	def __init__(self):
+		self.check = False
+
+	def feed(self, line, text):
+		if line == 0 and text == '#EXTM3U':
+			self.check = True
+
+	def result(self, pList):
+		return self.check
+
+class VersionRule(Rule):
+	#A playlist file must not contain more than one EXT-X-VERSION tag (ERROR)
+	tags = ('EXT-X-VERSION',)
+
+	def __init__(self, kind):
+		self.kind = kind        #'Master' or 'Variant' for the log messages
+		self.versionInstance = 0
+		self.version = 0
+		self.lineNums = []   #Lines of the EXT-X-VERSION tags
+
+	def feed(self, line, text):
+		if text.startswith('#EXT-X-VERSION:'):
+			self.versionInstance += 1
+			logging.info("++---------->> #EXT-X-VERSION tag found on line %s", line)
+			self.lineNums.append(line)
+			self.version = int(tagValue(text))
+
+	def result(self, pList):
+		multiple = self.versionInstance > 1
+		logging.info("++---------->> Number of EXT-X-VERSION tags found = %s", self.versionInstance)
+		logging.info("++---------->> Version of %s object = %s", self.kind, self.version)
+		return multiple, self.version, list(self.lineNums)
+
+class MasterCompatRule(Rule):
+	#Version compatibility of the Master tags.  Offending lines are remembered while
+	#streaming and judged against playVersion in result().
+	tags = ('EXT-X-MEDIA', 'EXT-X-STREAM-INF', 'EXT-X-I-FRAME-STREAM-INF', 'EXT-X-ALLOW-CACHE')
+
+	def __init__(self):
+		self.found = []   #(line, kind) in file order
+
+	def feed(self, line, text):
+		if text.startswith('#EXT-X-MEDIA:'):
+			if attributeList(text).get('INSTREAM-ID', '').startswith('SERVICE'):
+				self.found.append((line, 'service'))
+		elif text.startswith('#EXT-X-STREAM-INF:'):
+			if 'PROGRAM-ID' in attributeList(text):
+				self.found.append((line, 'stream'))
+		elif text.startswith('#EXT-X-I-FRAME-STREAM-INF:'):
+			if 'PROGRAM-ID' in attributeList(text):
+				self.found.append((line, 'iframe'))
+		elif text.startswith('#EXT-X-ALLOW-CACHE'):
+			self.found.append((line, 'cache'))
+
+	def result(self, pList):
+		logging.info("++------------------------------>> Entering mCompVersion")
+		compService = True  #Validation status for 1) - SERVICE values for INSTREAM-ID
+		compProgram = True  #Validation status for 2) - PROGRAM-ID attribute
+		compCache = True    #Validation status for 3) - EXT-X-ALLOW-CACHE
+		lineNums = Findings()
+		for line, kind in self.found:
+			if kind == 'service':
+				if pList.playVersion < 7:
+					compService = False
+					lineNums.add(F_VERSION_SERVICE, line+1)
+			elif kind == 'stream':
+				if pList.playVersion < 6:
+					compProgram = False
+					lineNums.add(F_VERSION_PROGRAM, line+1)
+			elif kind == 'iframe':
+				if pList.playVersion < 6:
+					compProgram = False
+					lineNums.add(F_VERSION_IFRAME_PROGRAM, line+1)
+			elif pList.playVersion >= 7:
+				compCache = False
+				lineNums.add(F_VERSION_MASTER_CACHE, line+1)
+		logging.info("++------------------------------>> Leaving mCompVersion")
+		return compService, compProgram, compCache, lineNums
+
+class VariantCompatRule(Rule):
+	#Version compatibility of the Media tags.  Offending lines are remembered while
+	#streaming and judged against playVersion (and EXT-X-I-FRAMES-ONLY) in result().
+	#The segment tags can repeat on every segment, so once an EXT-X-VERSION that allows
+	#them has been read they are no longer remembered (keeps a streamed playlist small).
+	tags = ('EXT-X-VERSION', 'EXT-X-KEY', 'EXTINF', 'EXT-X-BYTERANGE', 'EXT-X-I-FRAMES-ONLY', 'EXT-X-MAP', 'EXT-X-ALLOW-CACHE')
+
+	def __init__(self):
+		self.iFrames = False #True if the EXT-X-I-FRAMES-ONLY tag is found
+		self.version = 0     #Last EXT-X-VERSION read so far
+		self.found = []      #(line, kind, line of the previous tag of that kind) in file order
+		self.tagLines = {}   #Kind -> line of its last tag, for the per-segment tags
+
+	def lastTag(self, kind, line):
+		#Returns the line of the last tag of this kind and remembers this one
+		previous = self.tagLines.get(kind, -1)
+		self.tagLines[kind] = line
+		return previous
+
+	def feed(self, line, text):
+		if text.startswith('#EXT-X-VERSION:'):
+			value = tagValue(text)
+			if value.isdigit():
+				self.version = int(value)
+			return
+		if text.startswith('#EXT-X-I-FRAMES-ONLY'):
+			self.iFrames = True
+		if text.startswith('#EXT-X-KEY:'):
+			previous = self.lastTag('iv', line)
+			if 'IV' in attributeList(text):
+				self.found.append((line, 'iv', previous))
+		elif text.startswith('#EXTINF:'):
+			previous = self.lastTag('float', line)
+			if self.version < 3 and '.' in extinfDuration(text):   #The title could have a period, so only the duration counts
+				self.found.append((line, 'float', previous))
+		elif text.startswith('#EXT-X-BYTERANGE:'):
+			previous = self.lastTag('byterange', line)
+			if self.version < 4:
+				self.found.append((line, 'byterange', previous))
+		elif text.startswith('#EXT-X-I-FRAMES-ONLY'):
+			self.found.append((line, 'iframes', line - 1))
+		elif text.startswith('#EXT-X-MAP'):
+			self.found.append((line, 'map', line - 1))
+		elif text.startswith('#EXT-X-ALLOW-CACHE'):
+			self.found.append((line, 'cache', line - 1))
+
+	def result(self, pList):
+		logging.info("++------------------------------>> Entering vCompVersion")
+		check2 = True  #Status of IV attribute of EXT-X-KEY:IV
+		check3 = True  #Status of floating point EXTINF values
+		check4 = True  #Status of EXT-X-BYTERANGE or EXT-X-I-FRAMES-ONLY
+		check5 = True  #Status of EXT-X-MAP
+		check6 = True  #Status of EXT-X-MAP does not contain EXT-X-I-FRAMES-ONLY
+		check7 = True  #Status of EXT-X-ALLOW-CACHE removed
+		lineNums = Findings()
+		for line, kind, previous in self.found:
+			if kind == 'iv':
+				if pList.playVersion < 2:
+					check2 = False
+					lineNums.add(F_VERSION_IV, line+1, previous=previous+1)
+			elif kind == 'float':
+				if pList.playVersion < 3:   #Decimals not allowed below version-3
+					check3 = False
+					lineNums.add(F_VERSION_FLOAT, line+1, previous=previous+1)
+			elif kind == 'byterange':
+				if pList.playVersion < 4:
+					check4 = False
+					lineNums.add(F_VERSION_BYTERANGE, line+1, previous=previous+1)
+			elif kind == 'iframes':
+				if pList.playVersion < 4:
+					check4 = False
+					lineNums.add(F_VERSION_IFRAMES, line+1, previous=previous+1)
+			elif kind == 'map':
+				if self.iFrames:
+					if pList.playVersion < 5:
+						check5 = False
+						lineNums.add(F_VERSION_MAP_IFRAMES, line+1, previous=previous+1)
+				else:
+					if pList.playVersion < 6:
+						check6 = False
+						lineNums.add(F_VERSION_MAP, line+1, previous=previous+1)
+			elif pList.playVersion >= 7:
+				check7 = False
+				lineNums.add(F_VERSION_CACHE, line+1, previous=previous+1)
+		logging.info("++------------------------------>> Leaving vCompVersion")
+		return check2, check3, check4, check5, check6, check7, lineNums
+
+class MasterMixRule(Rule):
+	#Master Playlists must not contain Media or Variant tags
+	tags = ('EXTINF', 'EXT-X-BYTERANGE', 'EXT-X-DISCONTINUITY', 'EXT-X-KEY', 'EXT-X-MAP',
+		'EXT-X-PROGRAM-DATE-TIME', 'EXT-X-DATERANGE', 'EXT-X-TARGETDURATION', 'EXT-X-MEDIA-SEQUENCE',
+		'EXT-X-ENDLIST', 'EXT-X-PLAYLIST-TYPE', 'EXT-X-I-FRAMES-ONLY', 'EXT-X-DISCONTINUITY-SEQUENCE')
+
+	def __init__(self):
+		self.mixedTags = False
+		self.lineNums = Findings()
+
+	def feed(self, line, text):
+		if text.startswith('#EXTINF:') or text.startswith('#EXT-X-BYTERANGE:'):
+			self.mixedTags = True
+			self.lineNums.add(F_MIX_EXTINF, line+1)
+		elif text.startswith('#EXT-X-DISCONTINUITY:') or text.startswith('#EXT-X-KEY:'):
+			self.mixedTags = True
+			self.lineNums.add(F_MIX_DISCONTINUITY, line+1)
+		elif text.startswith('EXT-X-MAP:') or text.startswith('#EXT-X-PROGRAM-DATE-TIME:'):
+			self.mixedTags = True
+			self.lineNums.add(F_MIX_MAP, line+1)
+		elif text.startswith('#EXT-X-DATERANGE:') or text.startswith('#EXT-X-TARGETDURATION:'):
+			self.mixedTags = True
+			self.lineNums.add(F_MIX_DATERANGE, line+1)
+		elif text.startswith('#EXT-X-MEDIA-SEQUENCE:') or text.startswith('#EXT-X-ENDLIST:'):
+			self.mixedTags = True
+			self.lineNums.add(F_MIX_SEQUENCE, line+1)
+		elif text.startswith('#EXT-X-PLAYLIST-TYPE:') or text.startswith('#EXT-X-I-FRAMES-ONLY:'):
+			self.mixedTags = True
+			self.lineNums.add(F_MIX_TYPE, line+1)
+		elif text.startswith('#EXT-X-DISCONTINUITY-SEQUENCE:'):
+			self.mixedTags = True
+			self.lineNums.add(F_MIX_DISC_SEQUENCE, line+1)
+
+	def result(self, pList):
+		return self.mixedTags, self.lineNums
+
+class VariantMixRule(Rule):
+	#Variant/Media playlists must not contain Master tags
+	tags = ('EXT-X-MEDIA', 'EXT-X-STREAM-INF', 'EXT-X-I-FRAME-STREAM-INF', 'EXT-X-SESSION-DATA', 'EXT-X-SESSION-KEY')
+
+	def __init__(self):
+		self.mixedTags = False
+		self.lineNums = Findings()
+
+	def feed(self, line, text):
+		if text.startswith('#EXT-X-MEDIA:') or text.startswith('#EXT-X-STREAM-INF:'):
+			self.mixedTags = True
+			self.lineNums.add(F_MIX_STREAM, line+1)
+		if text.startswith('#EXT-X-I-FRAME-STREAM-INF:') or text.startswith('#EXT-X-SESSION-DATA:'):
+			self.mixedTags = True
+			self.lineNums.add(F_MIX_IFRAME, line+1)
+		if text.startswith('#EXT-X-SESSION-KEY:'):
+			self.mixedTags = True
+			self.lineNums.add(F_MIX_SESSION_KEY, line+1)
+
+	def result(self, pList):
+		return self.mixedTags, self.lineNums
+
+class MasterStreamInfRule(Rule):
+	#EXT-X-STREAM-INF must have a BANDWIDTH attribute and be followed by a URI line
+	tags = ('EXT-X-STREAM-INF',)
+
+	def __init__(self):
+		self.nextLine = False  #Will be set true if next line does not contain .m3u8
+		self.bwAttr = True     #Will be set to false if no ATTRIBUTE in tag
+		self.lineNums = Findings()
+
+	def feed(self, line, text):
+		if text.startswith('#EXT-X-STREAM-INF:'):
+			if 'BANDWIDTH' not in attributeList(text):
+				self.bwAttr = False
+				self.lineNums.add(F_STREAM_BANDWIDTH, line+1)
+			return self.checkURI
+
+	def checkURI(self, line, text):
+		if text.startswith('#') or not text.strip():
+			self.nextLine = True
+			self.lineNums.add(F_STREAM_URI, line)
+
+	def result(self, pList):
+		return self.nextLine, self.bwAttr, self.lineNums
+
+class VariantStreamInfRule(Rule):
+	#EXT-X-STREAM-INF is not allowed in a variant file (ERROR)
+	tags = ('EXT-X-STREAM-INF',)
+
+	def __init__(self):
+		self.checkV = False
+		self.lineNums = Findings()
+
+	def feed(self, line, text):
+		if text.startswith('#EXT-X-STREAM-INF:'):
+			self.checkV = True
+			self.lineNums.add(F_STREAM_VARIANT, line+1)
+
+	def result(self, pList):
+		return self.checkV, self.lineNums
+
+class IFrameRule(Rule):
+	#EXT-X-I-FRAME-STREAM-INF must have a BANDWIDTH and URI attribute
+	tags = ('EXT-X-I-FRAME-STREAM-INF',)
+
+	def __init__(self):
+		self.bwAttr = True
+		self.uriAttr = True
+		self.lineNums = Findings()
+
+	def feed(self, line, text):
+		if text.startswith('#EXT-X-I-FRAME-STREAM-INF:'):
+			attributes = attributeList(text)
+			if 'BANDWIDTH' not in attributes:
+				self.bwAttr = False
+				self.lineNums.add(F_IFRAME_BANDWIDTH, line+1)
+			if 'URI' not in attributes:
+				self.uriAttr = False
+				self.lineNums.add(F_IFRAME_URI, line+1)
+
+	def result(self, pList):
+		return self.bwAttr, self.uriAttr, self.lineNums
+
+class SessionDataRule(Rule):
+	#EXT-X-SESSION-DATA must have a DATA-ID attribute and one of: URI formatted as JSON
+	#or a VALUE, but may not have a VALUE and a URI.  DATA-ID/LANGUAGE pairs must be unique.
+	tags = ('EXT-X-SESSION-DATA',)
+
+	def __init__(self):
+		self.dCheck = False
+		self.json = False
+		self.uri = False
+		self.missing = False
+		self.pairLines = {}   #(DATA-ID, LANGUAGE) -> lines, for the multiples portion
+		self.lineNums = Findings()
+
+	def feed(self, line, text):
+		if text.startswith('#EXT-X-SESSION-DATA:'):
+			attributes = attributeList(text)
+			#If you have the tag DATA-ID must be present
+			if 'DATA-ID' not in attributes:
+				self.dCheck = True
+				self.lineNums.add(F_SESSION_ID, line + 1)
+			#A VALUE may not be used with a URI
+			if 'VALUE' in attributes and 'URI' in attributes:
+				self.uri = True
+				self.lineNums.add(F_SESSION_VALUE_URI, line + 1)
+			#A URI must point at JSON
+			if 'URI' in attributes:
+				if not attributes['URI'].partition('?')[0].endswith('.json'):
+					self.json = True
+					self.lineNums.add(F_SESSION_JSON, line + 1)
+			#Neither found, so one of them must be present
+			elif 'VALUE' not in attributes:
+				self.missing = True
+				self.lineNums.add(F_SESSION_MISSING, line + 1)
+			if 'DATA-ID' in attributes:
+				pair = (attributes['DATA-ID'], attributes.get('LANGUAGE'))
+				self.pairLines.setdefault(pair, []).append(line)
+
+	def result(self, pList):
+		logging.info("++----------------------------->> Entering mSessionData")
+		multiples = False
+		multiLines = []    #Lines of the DATA-ID:LANGUAGE pairs that appear more than once
+		lineNums = Findings()   #A copy, result() can be called again for cached rules
+		lineNums.extend(self.lineNums)
+		for pair, lines in self.pairLines.items():
+			logging.info("++---------->> DATA-ID= %s LANGUAGE= %s", pair[0], pair[1])
+			if len(lines) > 1:
+				multiples = True
+				multiLines.extend(lines)
+		if multiples:
+			multiLines = [line + 1 for line in sorted(multiLines)]  #text file starts counting at 1 not zero
+			lineNums.note('DATA-ID:LANGUAGE Lines to check for duplicates= ' + str(multiLines))
+		logging.info("<<-----------------------------+++ Exiting mSessionData")
+		return self.dCheck, self.json, self.uri, self.missing, multiples, lineNums
+
+class MediaMasterRule(Rule):
+	#EXT-X-INDEPENDENT-SEGMENTS and EXT-X-START must only appear once, and EXT-X-START
+	#has a REQUIRED TIME-OFFSET attribute.  Used for both Master and Variant playlists.
+	tags = ('EXT-X-INDEPENDENT-SEGMENTS', 'EXT-X-START')
+
+	def __init__(self):
+		self.segCount = 0   #counter used to keep track of the number of SEGMENTS tags
+		self.startCount = 0 #counter used to keep track of the number of START tags
+		self.tOffset = False   #Result of Time offset attribute where True indicates a failure
+		self.lineNums = Findings()
+
+	def feed(self, line, text):
+		if text.startswith('#EXT-X-INDEPENDENT-SEGMENTS'):
+			self.segCount += 1
+			self.lineNums.add(F_INDEPENDENT_SEGMENTS, line+1)
+		elif text.startswith('#EXT-X-START'):
+			self.startCount += 1
+			self.lineNums.add(F_START, line)
+			if 'TIME-OFFSET' not in attributeList(text):
+				self.tOffset = True
+				self.lineNums.add(F_START_OFFSET, line+1)
+
+	def result(self, pList):
+		return self.segCount > 1, self.startCount > 1, self.tOffset, self.lineNums
+
+class TargetDurationRule(Rule):
+	#EXT-X-TARGETDURATION must appear once, and every EXTINF duration must be less than
+	#or equal to it.  The durations are read from the SegmentTable in result(), each
+	#one against the EXT-X-TARGETDURATION in force on its line.  A tag whose value is
+	#not a number is a finding, and no duration is held to it.
+	tags = ('EXT-X-TARGETDURATION',)
+
+	def __init__(self):
+		self.targets = []       #(line, max duration) of each EXT-X-TARGETDURATION tag
+		self.invalidLines = []  #Lines of the tags whose value is not a valid number
+
+	def feed(self, line, text):
+		try:
+			target = float(tagValue(text))
+		except ValueError:
+			target = -1.0
+		if not 0.0 <= target < math.inf:   #Not a number, negative, nan or inf
+			target = math.inf
+			self.invalidLines.append(line)
+		self.targets.append((line, target))
+
+	def result(self, pList):
+		table = pList.segmentTable()
+		stats = durationAnalytics(table, self.targets)
+		check = len(self.targets) > 0    #True if TARGETDURATION tag present
+		multTag = len(self.targets) > 1  #True if too many tags
+		durationCheck = len(stats.overLines) > 0  #True if duration > maxDuration
+		tagLines = [(self.targets[index][0], F_TARGET_EXTRA if index else F_TARGET_FIRST, self.targets[index][0] - 1)
+			for index in range(0, len(self.targets))]
+		tagLines += [(line, F_TARGET_INVALID, line - 1) for line in self.invalidLines]
+		tagLines.sort()
+		overLines = ((line, F_TARGET_EXCEEDED, table.previousExtinf(line)) for line in stats.overLines)
+		invalidLines = ((line, F_EXTINF_INVALID, table.previousExtinf(line)) for line in stats.invalidLines)
+		lineNums = Findings()
+		for line, code, previous in heapq.merge(tagLines, overLines, invalidLines):
+			lineNums.add(code, line+1, previous=previous+1)
+		return check, multTag, durationCheck, lineNums, stats, len(self.invalidLines) > 0
+
+class SequenceTagRule(Rule):
+	#The optional EXT-X-MEDIA-SEQUENCE / EXT-X-DISCONTINUITY-SEQUENCE tag must appear only
+	#once in a playlist, and if present before the first media segment.
+	def __init__(self, tagName, beforeCode, foundCode):
+		self.tags = (tagName, URI_KEY)
+		self.prefix = '#' + tagName
+		self.beforeCode = beforeCode   #Finding of a tag before the first media segment
+		self.foundCode = foundCode
+		self.count = 0       #Keeps track of the number of times this tag is found in playlist
+		self.medSeg = False  #Set to True when a media-segment.ts is encountered
+		self.check = False   #True if the tag is present before the first media segment
+		self.lineNums = Findings()
+
+	def feed(self, line, text):
+		if text.endswith('.ts'):
+			self.medSeg = True
+		elif text.startswith(self.prefix):
+			self.count = self.count + 1
+			if not self.medSeg:
+				self.check = True
+				self.lineNums.add(self.beforeCode, line+1)
+			else:
+				self.lineNums.add(self.foundCode, line+1)
+
+	def result(self, pList):
+		return self.count, self.check, self.count > 1, self.lineNums
+
+class SegmentRule(Rule):
+	#Builds the SegmentTable of a Media playlist.  A row is opened by each EXTINF and
+	#is closed by the URI line that follows it; EXT-X-BYTERANGE and EXT-X-DISCONTINUITY
+	#apply to that next segment.
+	tags = ('EXTINF', 'EXT-X-BYTERANGE', 'EXT-X-DISCONTINUITY', 'EXT-X-MEDIA-SEQUENCE', URI_KEY)
+
+	def __init__(self):
+		self.table = SegmentTable()
+		self.open = False          #True while an EXTINF is waiting for its URI
+		self.range = None          #(length, offset or None) of a pending EXT-X-BYTERANGE
+		self.rangeEnd = 0          #Byte after the previous sub-range, the default offset
+		self.discontinuity = False
+		self.sequenceSet = False
+
+	def feed(self, line, text):
+		table = self.table
+		if text.startswith('#EXTINF:'):
+			try:
+				duration = float(extinfDuration(text))
+			except ValueError:
+				duration = -1.0
+			if not 0.0 <= duration < math.inf:   #Not a number, negative, nan or inf
+				duration = -1.0
+				table.invalidLines.append(line)
+			table.durations.append(duration)
+			table.extinfLines.append(line)
+			table.uriLines.append(-1)
+			table.byteLengths.append(-1)
+			table.byteOffsets.append(-1)
+			table.discontinuity.append(0)
+			self.open = True
+		elif text.startswith('#EXT-X-BYTERANGE:'):
+			length, at, offset = tagValue(text).partition('@')
+			if length.strip().isdigit() and (not at or offset.strip().isdigit()):
+				self.range = (int(length), int(offset) if at else None)
+		elif text.startswith('#EXT-X-DISCONTINUITY') and not text.startswith('#EXT-X-DISCONTINUITY-SEQUENCE'):
+			self.discontinuity = True
+		elif text.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+			value = tagValue(text)
+			if not self.sequenceSet and value.isdigit():
+				table.mediaSequence = int(value)
+				self.sequenceSet = True
+		elif self.open:   #URI line of the open segment
+			table.uriLines[-1] = line
+			if self.range is not None:
+				length, offset = self.range
+				if offset is None:
+					offset = self.rangeEnd
+				table.byteLengths[-1] = length
+				table.byteOffsets[-1] = offset
+				self.rangeEnd = offset + length
+				self.range = None
+			if self.discontinuity:
+				table.discontinuity[-1] = 1
+				self.discontinuity = False
+			self.open = False
+
+	def result(self, pList):
+		return self.table
+
+class IFramesOnlyRule(Rule):
+	#If EXT-X-I-FRAMES-ONLY is used a warning is raised when EXT-X-MAP is not in the file
+	tags = ('EXT-X-I-FRAMES-ONLY', 'EXT-X-MAP')
+
+	def __init__(self):
+		self.check = False  #Set to True when EXT-X-I-FRAMES-ONLY tag is found
+		self.medSeg = False #Set to True when EXT-X-MAP tag is found
+		self.lineNums = Findings()
+
+	def feed(self, line, text):
+		if text.startswith('#EXT-X-I-FRAMES-ONLY'):
+			self.check = True
+		if text.startswith('#EXT-X-MAP'):
+			self.medSeg = True
+			self.lineNums.add(F_MAP_MISSING, line+1)
+
+	def result(self, pList):
+		return self.check, self.medSeg, self.lineNums
+
+##The rules run for each kind of playlist, keyed by the Playlist check method they back
+def masterRules():
+	return {'checkHeader': HeaderRule(), 'masVersion': VersionRule('Master'),
+		'mCompVersion': MasterCompatRule(), 'mMixCheck': MasterMixRule(),
+		'mStreamInf': MasterStreamInfRule(), 'mIFrame': IFrameRule(),
+		'mSessionData': SessionDataRule(), 'mMediaMaster': MediaMasterRule()}
+
+def variantRules():
+	return {'checkHeader': HeaderRule(), 'varVersion': VersionRule('Variant'),
+		'vCompVersion': VariantCompatRule(), 'vMixCheck': VariantMixRule(),
+		'vStreamInf': VariantStreamInfRule(), 'vMediaMaster': MediaMasterRule(),
+		'vTargetDuration': TargetDurationRule(),
+		'vMediaSequence': SequenceTagRule('EXT-X-MEDIA-SEQUENCE', F_MEDIA_SEQUENCE_BEFORE, F_MEDIA_SEQUENCE),
+		'vDiscontinuitySequence': SequenceTagRule('EXT-X-DISCONTINUITY-SEQUENCE', F_DISC_SEQUENCE_BEFORE, F_DISC_SEQUENCE),
+		'vIFramesOnly': IFramesOnlyRule(), 'segments': SegmentRule()}
+
+class ValidationEngine(object):
+	#Runs all of the rules for one playlist in a single traversal of its lines.
+	#The tag code of each line selects the rules that are interested in it.
+	def __init__(self, master):
+		if master:
+			self.rules = masterRules()
+		else:
+			self.rules = variantRules()
+		self.dispatch = [[] for code in range(TAG_UNKNOWN + 1 + len(TAG_NAMES))]
+		for rule in self.rules.values():
+			for tag in rule.tags:
+				if tag == URI_KEY:
+					self.dispatch[TAG_URI].append(rule.feed)
+				else:
+					self.dispatch[TAG_CODES[tag]].append(rule.feed)
+		self.nextLine = []   #Rules still waiting for a line when run() returned
+
+	def run(self, lines, tagCodes=None, firstLine=0, end=True):
+		#lines can be any iterable (see iterLines()).  Without tagCodes the code of
+		#each line is worked out as it arrives, so nothing has to be kept in memory.
+		#firstLine numbers lines that do not start the playlist; run() can be called
+		#again to feed the same rules more lines (see appendedPlaylist()), and with
+		#end=False the rules still waiting for a line are left for the next call.
+		#At the end of the playlist they are given an empty line.
+		logging.info("++------------------------->> Entering ValidationEngine run")
+		if tagCodes is None:
+			coded = ((text, lineCode(text)[1]) for text in lines)
+		else:
+			coded = zip(lines, tagCodes)
+		dispatch = self.dispatch
+		nextLine = self.nextLine   #Rules waiting to see the line that follows
+		line = firstLine - 1
+		for line, (text, code) in enumerate(coded, firstLine):
+			if nextLine:
+				for feed in nextLine:
+					feed(line, text)
+				nextLine = []
+			for feed in dispatch[code]:
+				wants = feed(line, text)
+				if wants is not None:
+					nextLine.append(wants)
+		if end:
+			for feed in nextLine:
+				feed(line + 1, '')
+			nextLine = []
+		self.nextLine = nextLine
+		logging.info("<<-------------------------++ Leaving ValidationEngine run")
+		return self.rules
+
+
 ## This is where the visitors (check hierarchy) are defined
 
 class Visitor:
@@ -724,8 +1410,7 @@ class VersionCheck(Validator):
 			test, ver, errorLines = pList.masVersion(self)
 			pList.playVersion = ver      #Attribute of the object to be used for compatibility
 			if test:
-				for line in range(0, len(errorLines)):
-					pList.verCkErrorLines.append(errorLines[line])
+				pList.verCkErrorLines.extend(errorLines)
 				logging.info("++---------->> EXT-X-VERSION tag found on lines: %s", pList.verCkErrorLines)
 				pList.checkResults.append('Master Playlist =' + pList.suppliedURL)
 				pList.checkResults.append('EXT-X-VERSION test: Failed / multiple tags')
@@ -745,8 +1430,7 @@ class VersionCheck(Validator):
 			test, ver, errorLines = pList.varVersion(self)
 			pList.playVersion = ver      #Attribute of the object to be used for compatibility
 			if test:
-				for line in range(0, len(errorLines)):
-					pList.verCkErrorLines.append(errorLines[line])
+				pList.verCkErrorLines.extend(errorLines)
 				logging.info("++---------->> EXT-X-VERSION tag found on lines: %s", pList.verCkErrorLines)
 				pList.checkResults.append('Variant Playlist =' + pList.suppliedURL)
 				pList.checkResults.append('EXT-X-VERSION test: Failed / multiple tags')
@@ -779,8 +1463,7 @@ class VerCompatCheck(Validator):
 			pList.checkResults.append('Master Version Compatibility Checks for ' + pList.suppliedURL)
 			#If there was an error, then load up the error line list
 			if not compatService or not compatProgram or not compatCache:
-				for line in range(0, len(errorLines)):
-					pList.verCompCkErrorLines.append(errorLines[line])
+				pList.verCompCkErrorLines.extend(errorLines)
 			if compatService:
 				pList.checkResults.append('PASSED: SERVICE values for INSTREAM-ID attribute of EXT-X-MEDIA')
 				pList.compService = 'PASSED: SERVICE values for INSTREAM-ID attribute of EXT-X-MEDIA'
@@ -815,8 +1498,7 @@ class VerCompatCheck(Validator):
 			logging.info("++---------->> Variant compCkV7 = %s", compCkV7)
 			pList.checkResults.append('Variant Version Compatibility Checks for ' + pList.suppliedURL)
 			if not compCkV2 or not compCkV3 or not compCkV4 or not compCkV5 or not compCkV6 or not compCkV7:
-				for line in range(0, len(errorLines)):
-					pList.verCompCkErrorLines.append(errorLines[line])
+				pList.verCompCkErrorLines.extend(errorLines)
 			if compCkV2:
 				pList.checkResults.append('PASSED: Version 2+ if EXT-X-KEY:IV tag')
 				pList.compCheckV2 = 'PASSED: Version 2+ if EXT-X-KEY:IV tag'
@@ -869,8 +1551,7 @@ class MixTagsCheck(Validator):
 			test, errorLines = pList.mMixCheck(self)
 			if test:
 				pList.checkResults.append('<<----- FAILED: Master Playlist contains Media/Variant tags ')
-				for line in range(0, len(errorLines)):
-					pList.mTagsErrorLines.append(errorLines[line])
+				pList.mTagsErrorLines.extend(errorLines)
 				pList.mTagsResult = 'FAILED: Master Playlist contains Media/Variant tags'
 			else:
 				pList.checkResults.append('<<----- PASSED: Master Playlist only contains Master tags ')
@@ -882,8 +1563,7 @@ class MixTagsCheck(Validator):
 			test, errorLines = pList.vMixCheck(self)
 			if test:
 				pList.checkResults.append('<<----- FAILED: Media/Variant Playlist contains Master tags ')
-				for line in range(0, len(errorLines)):
-					pList.vTagsErrorLines.append(errorLines[line])
+				pList.vTagsErrorLines.extend(errorLines)
 				pList.vTagsResult = 'FAILED: Media/Variant Playlist contains Master tags'
 			else:
 				pList.checkResults.append('<<----- PASSED: Media/Variant only contains Media/Variant tags ')
@@ -904,8 +1584,7 @@ class StreamInfCheck(Validator):
 		if pList.master:
 			resultLine, resultBW, errorLines = pList.mStreamInf(self)
 			if resultLine or not resultBW:
-				for line in range(0, len(errorLines)):
-					pList.mStreamInfLines.append(errorLines[line])
+				pList.mStreamInfLines.extend(errorLines)
 			if resultLine:
 				pList.checkResults.append('<<----- FAILED: Master> EXT-X-STREAM-INF tag not followed by URI')
 				pList.mResultLine = 'FAILED: Master> EXT-X-STREAM-INF tag not followed by URI'
@@ -926,8 +1605,7 @@ class StreamInfCheck(Validator):
 			if resultTag:
 				pList.checkResults.append('<<----- FAILED: Variant> contains EXT-X-STREAM-INF tag')
 				pList.vResultTag = 'FAILED: Variant> contains EXT-X-STREAM-INF tag'
-				for line in range(0, len(errorLines)):
-					pList.vStreamInfLines.append(errorLines[line])
+				pList.vStreamInfLines.extend(errorLines)
 			else:
 				pList.vResultTag = 'PASSED: Variant EXT-X-STREAM-INF tag check'
 		pList.checkResults.append('')
@@ -946,8 +1624,7 @@ class IFrameCheck(Validator):
 		if pList.master:
 			bWidth, uri, errorLines = pList.mIFrame(self)
 			if not bWidth or not uri:
-				for line in range(0, len(errorLines)):
-					pList.mIFrameLines.append(errorLines[line])
+				pList.mIFrameLines.extend(errorLines)
 			if not bWidth:
 				pList.checkResults.append('<<-----FAILED: BANDWIDTH attribute missing in tag')
 				pList.mBWidth = 'FAILED: BANDWIDTH attribute missing in tag'
@@ -975,8 +1652,7 @@ class SessionDataCheck(Validator):
 		if pList.master:
 			idCheck, jsonCk, uriCk, missCk, multCk, errorLines = pList.mSessionData(self)
 			if idCheck or jsonCk or uriCk or multCk:
-				for line in range(0, len(errorLines)):
-					pList.mSessionDataLines.append(errorLines[line])
+				pList.mSessionDataLines.extend(errorLines)
 			if idCheck:
 				pList.checkResults.append('<<-----FAILED: EXT-X-SESSION-DATA tag missing DATA-ID attribute')
 				pList.mIDCheck = 'FAILED: EXT-X-SESSION-DATA tag missing DATA-ID attribute'
@@ -1024,8 +1700,7 @@ class MediaMasterCheck(Validator):
 			segTag, startTag, timeTag, errorLines = pList.mMediaMaster(self)
 			pList.checkResults.append('<<----- Master Playlist: ' + pList.suppliedURL)
 			if segTag or startTag or timeTag:
-				for line in range(0, len(errorLines)):
-					pList.mMediaMasterLines.append(errorLines[line])
+				pList.mMediaMasterLines.extend(errorLines)
 			if segTag:
 				pList.checkResults.append('<<-----FAILED: Multiple EXT-X-INDEPENDENT-SEGMENTS tags found')
 				pList.mSegTag = 'FAILED: Multiple EXT-X-INDEPENDENT-SEGMENTS tags found'
@@ -1050,8 +1725,7 @@ class MediaMasterCheck(Validator):
 		else:
 			segTag, startTag, timeTag, errorLines = pList.vMediaMaster(self)
 			if segTag or startTag or timeTag:
-				for line in range(0, len(errorLines)):
-					pList.vMediaMasterLines.append(errorLines[line])
+				pList.vMediaMasterLines.extend(errorLines)
 			pList.checkResults.append('<<----- Variant Playlist: ' + pList.suppliedURL)
 			if segTag:
 				pList.checkResults.append('<<-----FAILED: Multiple EXT-X-INDEPENDENT-SEGMENTS tags found in variant')
@@ -1098,16 +1772,23 @@ class TargetDurationCheck(Validator):
 			#the current Variant.  The class definition presumably due to the Visitor pattern produced
 			#weird results where the list continued to be overwritten each time.
 			
-			pList.vTargetDurationLines = []
+			pList.vTargetDurationLines = Findings()
 			
-			tagCheck, multiTag, durCheck, errorLines = pList.vTargetDuration(self)
-			if multiTag or durCheck:
-				for line in range(0, len(errorLines)):
-					pList.vTargetDurationLines.append(errorLines[line])
+			tagCheck, multiTag, durCheck, errorLines, stats, invalidTag = pList.vTargetDuration(self)
+			pList.durationStats = stats
+			pList.vRoundingLines = Findings()
+			table = pList.segmentTable()
+			for line in stats.roundLines:
+				pList.vRoundingLines.add(F_TARGET_ROUNDED, line+1, previous=table.previousExtinf(line)+1)
+			if multiTag or durCheck or stats.invalidLines or invalidTag:
+				pList.vTargetDurationLines.extend(errorLines)
 			else:
-				pList.vTargetDurationLines.append('No error lines found')
+				pList.vTargetDurationLines.note('No error lines found')
 			pList.checkResults.append('<<----- Variant Playlist: ' + pList.suppliedURL)
-			if tagCheck:
+			if invalidTag:
+				pList.checkResults.append('<<-----FAILED: EXT-X-TARGETDURATION value is not a valid number')
+				pList.vTagCheck = 'FAILED: EXT-X-TARGETDURATION value is not a valid number'
+			elif tagCheck:
 				pList.checkResults.append('<<-----PASSED: TARGETDURATION Tag is present')
 				pList.vTagCheck = 'PASSED: TARGETDURATION Tag is present'
 			else:
@@ -1121,9 +1802,24 @@ class TargetDurationCheck(Validator):
 			if durCheck:
 				pList.checkResults.append('<<-----FAILED: EXTINF duration values greater then Maximum')
 				pList.vDurCheck = 'FAILED: EXTINF duration values greater then Maximum'
+			elif stats.invalidLines:
+				pList.checkResults.append('<<-----FAILED: EXTINF duration values that are not valid numbers')
+				pList.vDurCheck = 'FAILED: EXTINF duration values that are not valid numbers'
 			else:
 				pList.checkResults.append('<<-----PASSED: DURATION for EXTINF tags less than MAX')
 				pList.vDurCheck = 'PASSED: DURATION for EXTINF tags less than MAX'
+			if stats.roundLines:
+				pList.checkResults.append('<<-----FAILED: Rounded EXTINF duration values greater then Maximum')
+				pList.vRoundCheck = 'FAILED: Rounded EXTINF duration values greater then Maximum'
+			else:
+				pList.vRoundCheck = 'PASSED: Rounded EXTINF durations less than MAX'
+			pList.vDurStats = ('Segments= %d Total= %.3f Mean= %.3f P99= %.3f Max drift= %.3f' %
+				(stats.count, stats.total, stats.mean, stats.p99, stats.maxDrift))
+			if stats.driftLine >= 0:
+				pList.vDurStats += ' on line= ' + str(stats.driftLine+1)
+			if stats.invalidLines:
+				pList.vDurStats += ' Invalid EXTINF= %d' % len(stats.invalidLines)
+			pList.checkResults.append('<<-----' + pList.vDurStats)
 		pList.checkResults.append('')
 		pList.checkResults.append('<<-----TargetDurationCheck Tag Validation----->>')
 		pList.checkResults.append('')
@@ -1143,12 +1839,11 @@ class MediaSequenceCheck(Validator):
 		else:
 			errorLines = []
 			errorLines.clear
-			pList.vMediaSequenceLines = []
+			pList.vMediaSequenceLines = Findings()
 			tCount, tagCheck, multiTag, errorLines = pList.vMediaSequence(self)
 			
 			if not tagCheck or multiTag:
-				for line in range(0, len(errorLines)):
-					pList.vMediaSequenceLines.append(errorLines[line])
+				pList.vMediaSequenceLines.extend(errorLines)
 			pList.checkResults.append('<<-----Variant Playlist: ' + pList.suppliedURL)
 			if tCount == 0:
 				pList.checkResults.append('<<-----PASSED: EXT-X-MEDIA-SEQUENCE is NOT present')
@@ -1190,11 +1885,10 @@ class DiscontinuitySequenceCheck(Validator):
 		else:
 			errorLines = []
 			errorLines.clear
-			pList.vDiscSequenceLines = []
+			pList.vDiscSequenceLines = Findings()
 			tCount, tagCheck, multiTag, errorLines = pList.vDiscontinuitySequence(self)
 			if not tagCheck or multiTag:
-				for line in range(0, len(errorLines)):
-					pList.vDiscSequenceLines.append(errorLines[line])
+				pList.vDiscSequenceLines.extend(errorLines)
 			pList.checkResults.append('<<-----Variant Playlist: ' + pList.suppliedURL)
 			if tCount == 0:
 				pList.checkResults.append('<<-----PASSED: EXT-X-DISCONTINUITY-SEQUENCE is NOT present')
@@ -1231,13 +1925,12 @@ class IFramesOnlyCheck(Validator):
 				iFrameOnlyCk = IFramesOnlyCheck()
 				pList.variantList[variant].accept(iFrameOnlyCk)
 		else:
-			pList.vIFramesOnlyLines = []
+			pList.vIFramesOnlyLines = Findings()
 			errorLines = []
 			errorLines.clear
 			frameCheck, mediaSeg, errorLines = pList.vIFramesOnly(self)
 			if mediaSeg:
-				for line in range(0, len(errorLines)):
-					pList.vIFramesOnlyLines.append(errorLines[line])
+				pList.vIFramesOnlyLines.extend(errorLines)
 			pList.checkResults.append('<<-----Variant Playlist: ' + pList.suppliedURL)
 			if not frameCheck:
 				pList.checkResults.append('<<-----PASSED: EXT-X-I-FRAMES-ONLY tag NOT used')
@@ -1256,46 +1949,195 @@ class IFramesOnlyCheck(Validator):
 		pList.checkResults.append('')
 		logging.info("<<-------------------------++ IFramesOnlyCheck Validation")
 
+##The order the check visitors run in and report their results
+CHECK_ORDER = [HeaderCheck, VersionCheck, VerCompatCheck, MixTagsCheck, StreamInfCheck, IFrameCheck,
+	SessionDataCheck, MediaMasterCheck, TargetDurationCheck, MediaSequenceCheck,
+	DiscontinuitySequenceCheck, IFramesOnlyCheck]
+
+####################################
+#
+# This function runs the validation engine over a playlist, one traversal for
+# the Master and one for each of its Variants.
+def runRules(playList):
+	logging.info("++------------------------->> Entering runRules")
+	if not playList.streamed:
+		playList.rules = engineRules(playList)
+	if playList.master:
+		for variant in playList.variantList:
+			if not variant.streamed and variant.fetchError is None:   #Streamed variants were validated as they were read
+				variant.rules = engineRules(variant)
+	logging.info("<<-------------------------++ Leaving runRules")
+#
+# End of runRules
+####################################
+
+####################################
+#
+# ResultCache memoizes the ValidationEngine rules by playlist content, so the same
+# playlist met again (the same Variant in several Masters of a batch, or with
+# --result-db in an earlier run) is not traversed again.  The key is a hash of
+# RESULT_VERSION, the kind of playlist and its content without the trailing blank
+# lines.  The rule results only depend on the content, so one rules dictionary can
+# back every playlist with that content.
+RESULT_VERSION = 7       #Must be raised when a rule changes what it reports
+RESULT_CACHE_SIZE = 256  #Distinct playlist contents kept in memory (--result-cache)
+resultCache = None       #Set by openResultCache()
+sqlite3 = None           #Imported by ResultCache for --result-db
+
+def contentHash(playList):
+	#SHA-256 of RESULT_VERSION, the kind of playlist and its content without the
+	#trailing blank lines (the lines of a streamed Variant are not kept, and a
+	#Variant that was not retrieved has none: None)
+	if playList.streamed or (not playList.master and playList.fetchError is not None):
+		return None
+	lines = playList.content()
+	end = len(lines)
+	while end > 0 and not lines[end-1].strip():
+		end -= 1
+	digest = hashlib.sha256(('%s:%s\n' % (RESULT_VERSION, playList.master)).encode('utf-8'))
+	digest.update('\n'.join(itertools.islice(lines, end)).encode('utf-8', 'ignore'))
+	return digest.hexdigest()
+
+class ResultCache(object):
+	def __init__(self, size=RESULT_CACHE_SIZE, dbName=None):
+		global sqlite3
+		self.size = size
+		self.entries = collections.OrderedDict()   #key -> (rules, seconds), oldest first
+		self.lock = threading.Lock()
+		self.db = None
+		if dbName is not None:
+			if sqlite3 is None:
+				import sqlite3
+			self.db = sqlite3.connect(dbName, timeout=30, check_same_thread=False)
+			self.db.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, seconds REAL, rules BLOB)')
+			self.db.commit()
+		self.lookups = 0
+		self.memoryHits = 0
+		self.dbHits = 0
+		self.secondsSaved = 0.0   #Validation time the hits took when they were stored
+
+	def key(self, playList):
+		return contentHash(playList)
+
+	def remember(self, key, rules, seconds):
+		if self.size > 0:
+			self.entries[key] = (rules, seconds)
+			self.entries.move_to_end(key)
+			while len(self.entries) > self.size:
+				self.entries.popitem(last=False)
+
+	def get(self, key):
+		#Returns the stored rules for key, or None
+		with self.lock:
+			self.lookups += 1
+			entry = self.entries.get(key)
+			if entry is not None:
+				self.entries.move_to_end(key)
+				self.memoryHits += 1
+				self.secondsSaved += entry[1]
+				return entry[0]
+			if self.db is None:
+				return None
+			row = self.db.execute('SELECT seconds, rules FROM results WHERE key = ?', (key,)).fetchone()
+			if row is None:
+				return None
+			try:
+				rules = pickle.loads(row[1])
+			except (pickle.UnpicklingError, AttributeError, EOFError, ValueError):
+				return None
+			self.dbHits += 1
+			self.secondsSaved += row[0]
+			self.remember(key, rules, row[0])
+			return rules
+
+	def put(self, key, rules, seconds):
+		with self.lock:
+			self.remember(key, rules, seconds)
+			if self.db is not None:
+				self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?)',
+					(key, seconds, pickle.dumps(rules, pickle.HIGHEST_PROTOCOL)))
+				self.db.commit()
+
+	def stats(self):
+		#Lines of the cache stats section of the reports
+		hits = self.memoryHits + self.dbHits
+		rate = 100.0 * hits / self.lookups if self.lookups else 0.0
+		return ['Lookups= %d Hits= %d (memory= %d database= %d) Hit rate= %.1f%%' %
+				(self.lookups, hits, self.memoryHits, self.dbHits, rate),
+			'Validation time saved= %.3f seconds' % self.secondsSaved]
+
+	def close(self):
+		with self.lock:
+			if self.db is not None:
+				self.db.close()
+				self.db = None
+
+def openResultCache(size=RESULT_CACHE_SIZE, dbName=None):
+	#There is no cache if the memory tier is off and no database was given
+	global resultCache
+	if resultCache is not None:
+		resultCache.close()
+	if size > 0 or dbName is not None:
+		resultCache = ResultCache(size, dbName)
+	else:
+		resultCache = None
+#
+# End of ResultCache
+####################################
+
+####################################
+#
+# This function returns the rules of a playlist that was read in full.  Content
+# already in the ResultCache, or a web playlist that has not changed since it was
+# stored by the ResponseCache, reuses the stored rules.  Otherwise the
+# ValidationEngine is run and the result is stored.
+def engineRules(playList):
+	key = None
+	if resultCache is not None:
+		key = resultCache.key(playList)
+		rules = resultCache.get(key)
+		if rules is not None:
+			logging.info("++---------->> ResultCache hit: %s", playList.suppliedURL)
+			return rules
+	if responseCache is not None:
+		rules = responseCache.loadRules(playList.suppliedURL)
+		if rules is not None:
+			return rules
+	start = time.perf_counter()
+	rules = ValidationEngine(playList.master).run(playList.content(), playList.tagCodes)
+	seconds = time.perf_counter() - start
+	if responseCache is not None:
+		responseCache.saveRules(playList.suppliedURL, rules)
+	if key is not None:
+		resultCache.put(key, rules, seconds)
+	return rules
+#
+# End of engineRules
+####################################
+
+####################################
+#
+# This function runs all of the checks on a playlist.  The lines are read once by
+# runRules(), and then the visitors turn the rule results into the check attributes
+# and checkResults used by screenPrint() and createPDF().
+def runChecks(playList):
+	logging.info("++------------------------->> Entering runChecks")
+	runRules(playList)
+	for check in CHECK_ORDER:
+		playList.accept(check())
+	logging.info("<<-------------------------++ Leaving runChecks")
+#
+# End of runChecks
+####################################
+
 ####################################
 #
 # This funtion clears out playlist variables that are left over when
-# multiple iterations are run successively.
+# multiple iterations are run successively.  Every check result is removed and
+# the per-instance lists start empty; the Variant objects are let go with the list.
 def clearMaster(playL):
 	logging.info("++----------------------------------->> Entering clearMaster")
-	#PlayList generic attributes are zero-d out
-	del playL.suppliedURL
-	playL.checkResults.clear()
-	del playL.playVersion
-	
-	# Address Master specific attributes and zero out
-	del playL.mVersionCk # Text results of VersionCheck()
-	del playL.compService # Text results of SERVICE values for INSTREAM-ID attribute of EXT-X-MEDIA in VerCompatCheck()
-	del playL.compProgram # Text results of PROGRAM-ID attribute for EXT-X-STREAM-INF removed
-	del playL.compCache # Text results of Version 7+ EXT-X-ALLOW-CACHE removed
-	del playL.mTagsResult # Text results of MixTagsCheck
-	del playL.mResultLine # Text result of EXT-X-STREAM-INF tag followed by URI
-	del playL.mResultBW # Text result of BANDWIDTH attribute present in tag EXT-X-STREAM-INF
-	del playL.mBWidth # Text result of Bandwidth attribute present for IFrameCheck()
-	del playL.mURI # Text result of URI attribute present for IFrameCheck()
-	del playL.mIDCheck # Text result of EXT-X-SESSION-DATA tag DATA-ID attribute from SessionDataCheck()
-	del playL.mJSONCk # Text result of URI attribute JSON formatted from SessionDataCheck()
-	del playL.mURICk # Text result of both VALUE and URI attribute from SessionDataCheck()
-	del playL.mMultCk # Text result of LANGUAGE attribute from SessionDataCheck()
-	del playL.mMissCk # Text result of URI - JSON & VALUE (missing) from SessionDataCheck()
-	del playL.mSegTag # Text result of INDEPENDENT-SEGMENTS tags check in MediaMasterCheck()
-	del playL.mStartTag # Text result of START tags check in MediaMasterCheck()
-	del playL.mTimeTag # Text result of REQUIRED TIME-OFFSET tag check in MediaMasterCheck()
-	
-	playL.variantList.clear()
-	playL.variantURLs.clear()
-	playL.mContent.clear()
-	playL.verCkErrorLines.clear #Tracks which lines were errors for VersionCheck()
-	playL.verCompCkErrorLines.clear #Tracks which lines were errors for VerCompatCheck()
-	playL.mTagsErrorLines.clear  #List of error lines from MixTagsCheck()
-	playL.mStreamInfLines.clear  #List of error lines from StreamInfCheck()
-	playL.mIFrameLines.clear  #List of error lines from IFrameCheck()
-	playL.mSessionDataLines.clear #List of error lines from SessionDataCheck()
-	playL.mMediaMasterLines.clear #List of error lines from MediaMasterCheck()
+	playL.reset()
 	logging.info("++----------------------------------->> Leaving clearMaster")
 	return playL
 #
@@ -1308,46 +2150,7 @@ def clearMaster(playL):
 # multiple iterations are run successively.
 def clearVariant(playL):
 	logging.info("++----------------------------------->> Entering clearVariant")
-	#PlayList generic attributes are zero-d out
-	del playL.suppliedURL
-	playL.checkResults.clear()
-	del playL.playVersion
-	
-	#Now Variant specific attributes are zero-d out
-	#playL.type.clear()     - turn on when implemented
-	del playL.vVersionCk # Text results of VersionCheck()
-	del playL.compCheckV2 # Text results Version 2+ if EXT-X-KEY:IV tag
-	del playL.compCheckV3 # Text results Version 3+ if floating point EXTINF values
-	del playL.compCheckV4 # Text results Version 4+ EXT-X-BYTERANGE or EXT-X-I-FRAMES-ONLY tags
-	del playL.compCheckV5 # Text results Version 5+ using EXT-X-MAP
-	del playL.compCheckV6 # Text results Version 6 ->EXT-X-MAP using EXT-X-I-FRAMES-ONLY
-	del playL.compCheckV7 # Text results Version 7+ EXT-X-ALLOW-CACHE removed
-	del playL.vTagsResult # Text result from MixTagsCheck()
-	del playL.vResultTag # Text result from StreamInfCheck()
-	del playL.vSegTag # Text result of INDEPENDENT-SEGMENTS tags check in MediaMasterCheck()
-	del playL.vStartTag # Text result of START tags check in MediaMasterCheck()
-	del playL.vTimeTag # Text result of REQUIRED TIME-OFFSET tag check in MediaMasterCheck()
-	del playL.vTagCheck # Text result for EXT-X-TARGETDURATION Tag in TargetDurationCheck()
-	del playL.vMultiTag # Text result for Multiple EXT-X-TARGETDURATION Tags in TargetDurationCheck()
-	del playL.vDurCheck # Text result for EXTINF duration values in TargetDurationCheck()
-	#del playL.vTCount # Text result (exists if) EXT-X-MEDIA-SEQUENCE is NOT present for MediaSequenceCheck()
-	del playL.vMedTagCheck # Text result of EXT-X-MEDIA-SEQUENCE appears before media segments in MediaSequenceCheck()
-	#del playL.vMultiSeqTag # Text result (exists if) Multiple EXT-X-MEDIA-SEQUENCE tags found in MediaSequenceCheck()
-	#del playL.vDSTCount # Text result (exists if) EXT-X-DISCONTINUITY-SEQUENCE is NOT present from DiscontinuitySequenceCheck()
-	#del playL.vDSTagCheck # Text result EXT-X-DISCONTINUITY-SEQUENCE appears before media segments from DiscontinuitySequenceCheck()
-	#del playL.vDSMultiCheck # Text result (exists if) Multiple EXT-X-DISCONTINUITY-SEQUENCE tags from DiscontinuitySequenceCheck()
-	#del playL.vFrameCheck # Text result (exists if) EXT-X-I-FRAMES-ONLY tag NOT used from IFramesOnlyCheck()
-	#del playL.vMediaSeg # Text result for EXT-X-MAP tag in IFramesOnlyCheck()
-	playL.vContent.clear()
-	playL.verCkErrorLines.clear()  #Lists the lines tags were found for VersionCheck()
-	playL.verCompCkErrorLines.clear() #Tracks which lines were errors for VerCompatCheck()
-	playL.vTagsErrorLines.clear()   #Tracks which lines were errors for MixTagsCheck()
-	playL.vStreamInfLines.clear()   #Tracks which lines were errors for StreamInfCheck()
-	playL.vMediaMasterLines.clear() #Tracks which lines were errors for MediaMasterCheck()
-	playL.vTargetDurationLines.clear() #Tracks which lines were errors for TargetDurationCheck()
-	playL.vMediaSequenceLines.clear() #Tracks which lines were errors for MediaSequenceCheck()
-	playL.vDiscSequenceLines.clear()  #Tracks which lines were errors for DiscontinuitySequenceCheck()
-	playL.vIFramesOnlyLines.clear()  #Tracks which lines were errors for IFramesOnlyCheck()
+	playL.reset()
 	logging.info("++----------------------------------->> Leaving clearVariant")
 	return playL
 
@@ -1357,73 +2160,444 @@ def clearVariant(playL):
 
 ####################################
 #
-# This function is used to open a URL or file
-def openURL(url):
-	# valid = whether the URL given is in a valid format to access
-	# web = keeps track of whether we have a web/URL or file/URL (local)
-	# output is returned if it is a web/URL and fileHandle is returned if a file
-	logging.info("++----------------------------------->> Entering openURL")
-	logging.info("++---------->> Passed in URL: %s", url)
-	# First test if the url has a valid extension .m3u8
-	if url.endswith(".m3u8"):
-			logging.info("++---------->> openURL Valid(m3u8) YES")
-			valid = True
-	elif url.endswith(".m3u"):
-			logging.info("++---------->> openURL Valid(m3u) YES")
-			valid = True
+# Logging Functions
+#
+# The program logs through a QueueHandler, and a QueueListener thread does the
+# formatting and writing, so the log file is kept off the validation path.
+# Worker processes (--jobs) send their records to the parent's listener.
+logListener = None  #QueueListener writing the records of this process
+logHandler = None   #File (or stderr) handler used by the listener
+
+def setupLogging(level='warning', logFile='Hlsv3.log'):
+	global logListener, logHandler, traceLines
+	stopLogging()
+	root = logging.getLogger()
+	if LOG_LEVELS[level] is None:
+		root.setLevel(logging.CRITICAL + 1)   #--log-level off
+		traceLines = False
+		return
+	if logFile == '-':
+		logHandler = logging.StreamHandler(sys.stderr)
 	else:
-		logging.info("++---------->> openURL Valid(m3u8/m3u) NO")
-		valid = False
-	# If the given url starts with http:// then process as a web site
-	web = False
-	if url.startswith("http://") or url.startswith("https://"):
-		logging.info("++---------->> Attempting openURL using http")
-		try:
-			response = requests.get(url)
-			response.raise_for_status()
-			if response.headers.get('content-type') == 'application/vnd.apple.mpegurl':
-				valid = True
-				logging.info("++---------->> openURL Valid via content-type= application/vnd.apple.mpegurl")
-			elif response.headers.get('content-type') == 'audio/mpegurl':
-				valid = True
-				logging.info("++---------->> openURL Valid via content-type= audio/mpegurl")
-			output = response.text.encode('ascii', 'ignore')
-			web = True
-			logging.info("++---------->> openURL: %s", url)
-			logging.info("++---------->> The returned output= %s", output)
-			logging.info("++---------->> The returned valid= %s", valid)
-			logging.info("++---------->> The returned web= %s", web)
-			return output, valid, web
-		except requests.exceptions.HTTPError as e:
-			print ("Error: ", e)
-			logging.info("++---------->> openURL Error: %s", e)
-			sys.exit(1)
-	# If the given url does not start with http:// then presumably the
-	# url is a local file so we will open with filehandle
+		logHandler = logging.FileHandler(logFile, delay=True)   #Only created if something is logged
+	logHandler.setFormatter(logging.Formatter(LOG_FORMAT))
+	logQueue = queue.Queue()
+	root.handlers = [logging.handlers.QueueHandler(logQueue)]
+	root.setLevel(LOG_LEVELS[level])
+	logListener = logging.handlers.QueueListener(logQueue, logHandler)
+	logListener.start()
+	traceLines = root.isEnabledFor(logging.DEBUG)
+
+def stopLogging():
+	#Writes out the records still in the queue and stops the listener thread
+	global logListener, logHandler
+	if logListener is not None:
+		logListener.stop()
+		logListener = None
+	if logHandler is not None:
+		logHandler.close()
+		logHandler = None
+
+def listenToWorkers():
+	#Returns a queue for --jobs worker processes and a listener that hands their
+	#records to this process' log handler (None, None if logging is off)
+	if logHandler is None:
+		return None, None
+	workerQueue = multiprocessing.Queue()
+	workerListener = logging.handlers.QueueListener(workerQueue, logHandler)
+	workerListener.start()
+	return workerQueue, workerListener
+
+def initWorker(poolSize, timeout, workerQueue, level, cacheDir=None, resultSize=RESULT_CACHE_SIZE, resultDB=None, detailLines=None):
+	#Initializer of the --jobs worker processes
+	global traceLines
+	configureSession(poolSize, timeout)
+	configurePDF(detailLines)
+	openCache(cacheDir)
+	openResultCache(resultSize, resultDB)
+	root = logging.getLogger()
+	if workerQueue is None:
+		root.handlers = []
+		root.setLevel(logging.CRITICAL + 1)
+		traceLines = False
 	else:
+		root.handlers = [logging.handlers.QueueHandler(workerQueue)]
+		root.setLevel(LOG_LEVELS[level])
+		traceLines = root.isEnabledFor(logging.DEBUG)
+
+atexit.register(stopLogging)   #sys.exit() paths still write out the queued records
+#
+# End of Logging Functions
+####################################
+
+####################################
+#
+# FetchError is raised by fetchURL() when a URL or file cannot be retrieved, so the
+# caller can decide whether to report it (a Variant) or end the program (openURL).
+class FetchError(Exception):
+	pass
+#
+# End of FetchError
+####################################
+
+####################################
+#
+# One requests.Session is shared by every fetch (command, batch and the Variants
+# of a Master), so connections to a host are kept alive and reused instead of
+# paying a new TCP/TLS handshake for each playlist.
+requests = None      #Imported by getSession() for the first web URL
+httpSession = None
+httpLock = threading.Lock()   #createMaster() fetches from several threads
+
+def getSession():
+	global httpSession, requests
+	with httpLock:
+		if httpSession is None:
+			if requests is None:
+				import requests
+			logging.info("++---------->> Creating HTTP session: hosts= %s size= %s timeout= %s", HTTP_POOL_HOSTS, HTTP_POOL_SIZE, HTTP_TIMEOUT)
+			session = requests.Session()
+			adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_SIZE)
+			session.mount('http://', adapter)
+			session.mount('https://', adapter)
+			session.headers['Connection'] = 'keep-alive'
+			httpSession = session
+		return httpSession
+
+def configureSession(poolSize=None, timeout=None):
+	#Changes the pool settings.  The session is created again on the next fetch.
+	global HTTP_POOL_SIZE, HTTP_TIMEOUT
+	closeSession()
+	if poolSize is not None:
+		HTTP_POOL_SIZE = poolSize
+	if timeout is not None:
+		HTTP_TIMEOUT = timeout
+
+def closeSession():
+	global httpSession
+	with httpLock:
+		if httpSession is not None:
+			httpSession.close()
+			httpSession = None
+#
+# End of getSession
+####################################
+
+####################################
+#
+# ResponseCache keeps the playlists retrieved from web URLs on disk (--cache DIR), so
+# a playlist that has not changed since the last run is revalidated with a conditional
+# GET (If-None-Match / If-Modified-Since) instead of being downloaded again.  When the
+# server answers 304 Not Modified, or sends the same body again, the stored body is
+# used and runRules() reuses the rule results stored for that body.
+# Every URL has three files named by the SHA-1 of the URL: .meta (JSON validators,
+# content-type and body hash), .body and .rules (a "RESULT_VERSION body-hash" line,
+# then the pickled ValidationEngine rules).  Loading a pickle can run code, so DIR
+# must only be writable by users trusted to run this program.
+responseCache = None   #Set by openCache() from --cache DIR
+
+class ResponseCache(object):
+	def __init__(self, directory):
+		self.directory = directory
+		os.makedirs(directory, exist_ok=True)
+		self.lock = threading.Lock()   #createMaster() fetches from several threads
+		self.bodyHashes = {}     #Body hash of every URL retrieved from the web this run
+		self.unchanged = set()   #URLs whose stored body was still current this run
+		self.notModified = 0     #Number of 304 answers
+		self.downloaded = 0      #Number of full downloads
+		self.savedBytes = 0      #Body bytes that did not have to be downloaded
+
+	def path(self, url, suffix):
+		return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + suffix)
+
+	def write(self, url, suffix, data):
+		#The file is replaced in one step, so other threads/processes never see half of it
+		fileName = self.path(url, suffix)
+		tmpName = '%s.%s.%s.tmp' % (fileName, os.getpid(), threading.get_ident())
+		with open(tmpName, 'wb') as tmpFile:
+			tmpFile.write(data)
+		os.replace(tmpName, fileName)
+
+	def lookup(self, url):
+		#Returns the stored meta of url, or None if there is no usable entry
+		try:
+			with open(self.path(url, '.meta')) as metaFile:
+				meta = json.load(metaFile)
+		except (OSError, ValueError):
+			return None
+		if meta.get('url') != url or not os.path.exists(self.path(url, '.body')):
+			return None
+		return meta
+
+	def conditionalHeaders(self, meta):
+		headers = {}
+		if meta is not None:
+			if meta.get('etag'):
+				headers['If-None-Match'] = meta['etag']
+			if meta.get('lastModified'):
+				headers['If-Modified-Since'] = meta['lastModified']
+		return headers
+
+	def reuse(self, url, meta):
+		#Called for a 304 answer: returns the stored body
+		with open(self.path(url, '.body'), 'rb') as bodyFile:
+			body = bodyFile.read()
+		with self.lock:
+			self.bodyHashes[url] = meta['bodyHash']
+			self.unchanged.add(url)
+			self.notModified += 1
+			self.savedBytes += len(body)
+		logging.info("++---------->> ResponseCache not modified: %s", url)
+		return body
+
+	def store(self, url, meta, headers, body):
+		#Called for a full download: keeps the new validators and, if it changed, the body
+		bodyHash = hashlib.sha256(body).hexdigest()
+		same = meta is not None and meta.get('bodyHash') == bodyHash
+		newMeta = {'url': url, 'etag': headers.get('etag'), 'lastModified': headers.get('last-modified'),
+			'contentType': headers.get('content-type'), 'bodyHash': bodyHash}
+		if not same:
+			self.write(url, '.body', body)
+			try:
+				os.remove(self.path(url, '.rules'))
+			except OSError:
+				pass
+		self.write(url, '.meta', json.dumps(newMeta).encode('utf-8'))
+		with self.lock:
+			self.bodyHashes[url] = bodyHash
+			if same:
+				self.unchanged.add(url)
+			self.downloaded += 1
+		logging.info("++---------->> ResponseCache stored: %s unchanged= %s", url, same)
+
+	def rulesHeader(self, bodyHash):
+		#First line of a .rules file: the RESULT_VERSION and body hash the rules belong to
+		return ('%s %s\n' % (RESULT_VERSION, bodyHash)).encode('ascii')
+
+	def loadRules(self, url):
+		#Returns the stored rules of url if its body was still current this run, else None.
+		#The header is checked before anything is unpickled, so rules stored for another
+		#body or by another RESULT_VERSION (or not by this program at all) are a miss.
+		with self.lock:
+			if url not in self.unchanged:
+				return None
+			bodyHash = self.bodyHashes[url]
+		try:
+			with open(self.path(url, '.rules'), 'rb') as rulesFile:
+				if rulesFile.readline() != self.rulesHeader(bodyHash):
+					return None
+				rules = pickle.load(rulesFile)
+		except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, IndexError, TypeError, ValueError):
+			return None
+		logging.info("++---------->> ResponseCache reused rules: %s", url)
+		return rules
+
+	def saveRules(self, url, rules):
+		#Stores the rules of a playlist retrieved from the web this run
+		with self.lock:
+			bodyHash = self.bodyHashes.get(url)
+		if bodyHash is not None:
+			self.write(url, '.rules', self.rulesHeader(bodyHash) + pickle.dumps(rules, pickle.HIGHEST_PROTOCOL))
+
+def openCache(directory):
+	global responseCache
+	responseCache = None if directory is None else ResponseCache(directory)
+#
+# End of ResponseCache
+####################################
+
+####################################
+#
+# This function is used to open a URL or file
+def fetchURL(url, stream=False):
+	# valid = whether the URL given is in a valid format to access
+	# web = keeps track of whether we have a web/URL or file/URL (local)
+	# output is returned if it is a web/URL and fileHandle is returned if a file
+	# stream = return the open response for a web/URL instead of its output (see iterLines)
+	logging.info("++----------------------------------->> Entering fetchURL")
+	logging.info("++---------->> Passed in URL: %s", url)
+	# First test if the url has a valid extension .m3u8
+	if url.endswith(".m3u8"):
+			logging.info("++---------->> fetchURL Valid(m3u8) YES")
+			valid = True
+	elif url.endswith(".m3u"):
+			logging.info("++---------->> fetchURL Valid(m3u) YES")
+			valid = True
+	else:
+		logging.info("++---------->> fetchURL Valid(m3u8/m3u) NO")
+		valid = False
+	# If the given url starts with http:// then process as a web site
+	web = False
+	if url.startswith("http://") or url.startswith("https://"):
+		logging.info("++---------->> Attempting fetchURL using http")
+		session = getSession()
+		#Streamed responses are read line by line and are not kept in the cache
+		cache = responseCache if not stream else None
+		meta = cache.lookup(url) if cache is not None else None
 		try:
-			logging.info("++---------->> Attempting openURL using file-handle")
+			if meta is not None:
+				response = session.get(url, stream=stream, timeout=HTTP_TIMEOUT, headers=cache.conditionalHeaders(meta))
+			else:
+				response = session.get(url, stream=stream, timeout=HTTP_TIMEOUT)
+			response.raise_for_status()
+			notModified = meta is not None and response.status_code == 304
+			contentType = response.headers.get('content-type')
+			if notModified and contentType is None:
+				contentType = meta.get('contentType')
+			if contentType == 'application/vnd.apple.mpegurl':
+				valid = True
+				logging.info("++---------->> fetchURL Valid via content-type= application/vnd.apple.mpegurl")
+			elif contentType == 'audio/mpegurl':
+				valid = True
+				logging.info("++---------->> fetchURL Valid via content-type= audio/mpegurl")
+			web = True
+			if stream:
+				logging.info("++---------->> fetchURL streaming: %s", url)
+				return response, valid, web
+			if notModified:
+				output = cache.reuse(url, meta)
+			else:
+				output = response.text.encode('ascii', 'ignore')
+				if cache is not None:
+					cache.store(url, meta, response.headers, output)
+			logging.info("++---------->> fetchURL: %s", url)
+			if traceLines:
+				logging.debug("++---------->> The returned output= %s", output)
+			logging.info("++---------->> The returned valid= %s", valid)
+			logging.info("++---------->> The returned web= %s", web)
+			return output, valid, web
+		except requests.exceptions.RequestException as e:
+			logging.warning("++---------->> fetchURL Error: %s", e)
+			raise FetchError(e)
+		except OSError as e:
+			logging.warning("++---------->> fetchURL cache Error: %s", e)
+			raise FetchError(e)
+	# If the given url does not start with http:// then presumably the
+	# url is a local file so we will open with filehandle
+	else:
+		try:
+			logging.info("++---------->> Attempting fetchURL using file-handle")
 			fileHandle = open(url,'r+')
 			logging.info("++---------->> The returned file handle= %s", fileHandle)
 			logging.info("++---------->> The returned valid= %s", valid)
 			logging.info("++---------->> The returned web= %s", web)
 			return fileHandle, valid, web
 		except FileNotFoundError as e:
-			print("Error: ", e)
-			logging.info("++--------->> The user gave a bad File: %s", e)
-			sys.exit(1)
-		except sys.OSError as e:
-			print("Error: ", e)
-			logging.info("++---------->> openURL OSError: %s", e)
-			sys.exit(1)
+			logging.warning("++--------->> The user gave a bad File: %s", e)
+			raise FetchError(e)
+		except OSError as e:
+			logging.warning("++---------->> fetchURL OSError: %s", e)
+			raise FetchError(e)
+#
+# End of fetchURL
+####################################
+
+####################################
+#
+# This function is used to open the URL or file given by the user.  The program
+# cannot go on without it, so a FetchError ends the program.
+def openURL(url, stream=False):
+	logging.info("++----------------------------------->> Entering openURL")
+	try:
+		return fetchURL(url, stream)
+	except FetchError as e:
+		print("Error: ", e)
+		logging.error("++---------->> openURL Error: %s", e)
+		sys.exit(1)
 #
 # End of openURL
 ####################################
 
+####################################
+#
+# This function resolves a URI found in a playlist against the URL of that playlist,
+# with urljoin() semantics: a web playlist resolves it with urljoin(), and a local
+# playlist against its own directory (an absolute path or web URL is kept as is).
+def resolveURI(baseURL, uri):
+	if uri.startswith("http://") or uri.startswith("https://"):
+		return uri
+	if baseURL.startswith("http://") or baseURL.startswith("https://"):
+		return urllib.parse.urljoin(baseURL, uri)
+	if os.path.isabs(uri):
+		return uri
+	return os.path.normpath(os.path.join(os.path.dirname(baseURL), uri))
+#
+# End of resolveURI
+####################################
+
+####################################
+#
+# This generator yields the Variant URIs of the lines of a Master playlist, in
+# order and as written: every URI line naming a .m3u8, and the URI attribute of a
+# tag line (EXT-X-MEDIA, EXT-X-I-FRAME-STREAM-INF) when it names one.  createMaster()
+# and the monitor's variantLines() both read the Variants from it.
+def variantURIs(lines):
+	for line in lines:
+		if '.m3u8' in line:
+			uri = line.strip()
+			if uri.startswith('#'):
+				uri = attributeList(uri).get('URI', '')
+				if '.m3u8' not in uri:
+					continue
+			yield uri
+#
+# End of variantURIs
+####################################
+
+####################################
+#
+# This function tokenizes the playlist content once.  It returns the TAG_* code
+# of every line, one byte per line, so the ValidationEngine only has to feed
+# each line to the rules that want it.
+def tokenizeContent(content):
+	tagCodes = bytearray(len(content))
+	for num, line in enumerate(content):
+		tagCodes[num] = lineCode(line)[1]
+	return tagCodes
+#
+# End of tokenizeContent
+####################################
+
+####################################
+#
+# This function returns the tag name and TAG_* code of one playlist line.  The
+# name is URI_KEY for a URI line and None for blank and comment lines.
+def lineCode(line):
+	if line.startswith('#EXT'):
+		name = line[1:].split(':', 1)[0].rstrip()
+		return name, TAG_CODES.get(name, TAG_UNKNOWN)
+	elif line.startswith('#'):
+		return None, TAG_COMMENT
+	elif line.strip():
+		return URI_KEY, TAG_URI
+	return None, TAG_BLANK
+#
+# End of lineCode
+####################################
+
+####################################
+#
+# This generator yields the lines of a resource from openURL() one at a time, so a
+# playlist can be validated without reading all of it into memory.  A web resource
+# must be the streamed response from openURL(url, stream=True).
+def iterLines(rsrc, webFlag):
+	try:
+		if webFlag:
+			for line in rsrc.iter_lines():
+				yield line.decode('ascii', 'ignore')
+		else:
+			for line in rsrc:
+				yield line.rstrip('\n')
+	finally:
+		rsrc.close()
+#
+# End of iterLines
+####################################
+
 ####################################
 #
 # This function creates MasterPlaylist objects
-def createMaster(conList, uRL):
+def createMaster(conList, uRL, stream=False, workers=FETCH_WORKERS, loadVariants=True):
 	logging.info("++------------------------->> Entering createMaster")
 	logging.info("++--------------->> Master URL: %s", uRL)
 	pList = MasterPlaylist()
@@ -1432,59 +2606,130 @@ def createMaster(conList, uRL):
 	pList.suppliedURL = uRL
 	for i in range(0, len(conList)):
 		pList.mContent.append(conList[i]) #Initialize raw content in Master.content[]
-	for i in range(0, len(pList.mContent)):
-		#logging to verify the Master object has the correct content
-		logging.info("++---------->> pList.content = %s", pList.mContent[i])
-	for i in range(0, len(conList)):
-		if '.m3u8' in conList[i]:  
-			logging.info("++---------->> Found variant %s", conList[i])
-			pList.variantURLs.append(conList[i])  #Collect list of variants
-			#Before creating the variant we must open a connection to 
-			#the variant URL and retrieve contents.
+	pList.tagCodes = tokenizeContent(pList.mContent)
+	if traceLines:
+		for i in range(0, len(pList.mContent)):
+			#logging to verify the Master object has the correct content
+			logging.debug("++---------->> pList.content = %s", pList.mContent[i])
+	#Each variant URI is resolved against the Master URL once (resolved caches it
+	#for the URIs listed more than once), and variantURLs keeps the resolved URLs.
+	#A tag line (EXT-X-MEDIA, EXT-X-I-FRAME-STREAM-INF) gives its URI attribute.
+	resolved = {}
+	for uri in variantURIs(conList):
+		logging.info("++---------->> Found variant %s", uri)
+		if uri not in resolved:
+			resolved[uri] = resolveURI(str(uRL), uri)
+		pList.variantURLs.append(resolved[uri])  #Collect list of variants
+		#Before creating the variant we must open a connection to 
+		#the variant URL and retrieve contents.
 	for j in range(0, len(pList.variantURLs)):
 		logging.info("++---------->> pList variantURLs: %s", pList.variantURLs[j])
-	for i in range(0, len(pList.variantURLs)):		
-		varRsc, validURL, web = openURL(pList.variantURLs[i])
-		#Now if/else block for createPlaylist:
-		if web == True:
-			# Variant Resource can be loaded into an object, but must be decoded
-			logging.info("++---------->> Web variant from createMaster:")
-			varContents = varRsc.decode('utf-8')
-			varContentList = list(varContents.splitlines())
-			#Now we have the contents of the URL
-			logging.info("++---------->> Created variant contentList of length: %s", len(varContentList))
-			for k in range(0, len(varContentList)):
-				logging.info("++---------->> varContentList: %s", varContentList[k])
-			newVariant = createVariant(varContentList, pList.variantURLs[i])
-			for z in range(0, len(newVariant.vContent)):
-				logging.info("++---------->> newVariant vContent: %s", newVariant.vContent[z])
-			pList.variantList.insert(i,newVariant)
-		else:
-			# Resource is the filehandle we got from openURL, and the lines can be read
-			logging.info("++---------->> File variant from createMaster:")
-			varContents = varRsc.read()
-			varContentList = list(varContents.split("\n"))
-			varRsc.close()
-			logging.info("++---------->> Created contentList of length: %s", len(varContentList))
-			for l in range(0, len(varContentList)):
-				logging.info("++---------->> varContentList: %s", varContentList[l])
-			newVariant = createVariant(varContentList, pList.variantURLs[i])
-			for z in range(0, len(newVariant.vContent)):
-				logging.info("++---------->> newVariant vContent: %s", newVariant.vContent[z])
+	#The variants are retrieved at the same time (up to workers at once), but are
+	#added to variantList in the order of variantURLs.  A variant that cannot be
+	#retrieved or read (a fetch, decode or mid-stream error) is recorded in
+	#variantErrors and kept as an empty VariantPlaylist marked notRetrieved().
+	#Each distinct URL is fetched once; a variant listed again gets a copyVariant().
+	#The crawl mode validates the variants on their own (loadVariants=False).
+	pList.variantErrors = []
+	if not loadVariants:
+		logging.info("++------------------------->> Leaving createMaster, variants not loaded")
+		return pList
+	with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+		futures = {}
+		for variantURL in pList.variantURLs:
+			if variantURL not in futures:
+				futures[variantURL] = pool.submit(loadVariant, variantURL, stream)
+		loaded = set()
+		for i in range(0, len(pList.variantURLs)):
+			try:
+				newVariant = futures[pList.variantURLs[i]].result()
+				if pList.variantURLs[i] in loaded:
+					newVariant = copyVariant(newVariant)
+				loaded.add(pList.variantURLs[i])
+			except Exception as e:
+				reason = str(e) if isinstance(e, FetchError) else '%s: %s' % (type(e).__name__, e)
+				logging.warning("++---------->> Variant could not be retrieved: %s %s", pList.variantURLs[i], reason)
+				pList.variantErrors.append((pList.variantURLs[i], reason))
+				newVariant = createVariant([], pList.variantURLs[i])
+				newVariant.notRetrieved(reason)
 			pList.variantList.insert(i,newVariant)
 	for i in range(0, len(pList.variantList)):
 		logging.info("++---------->> contents of pList.variantList: %s", pList.variantList[i])
-	for j in range(0, len(pList.variantList)):
-		logging.info("++---------->> variantObject: %s", j)
-		variantObject = pList.variantList[j]
-		for k in range(0, len(variantObject.vContent)):
-			logging.info("++---------->> variantObject contents: %s", variantObject.vContent[k])
+	if traceLines:
+		for j in range(0, len(pList.variantList)):
+			logging.debug("++---------->> variantObject: %s", j)
+			variantObject = pList.variantList[j]
+			for k in range(0, len(variantObject.vContent)):
+				logging.debug("++---------->> variantObject contents: %s", variantObject.vContent[k])
 	logging.info("++------------------------->> Leaving createMaster")
 	return pList
 #
 # End of createMaster
 ####################################
 
+####################################
+#
+# This function retrieves one Variant listed in a Master and creates its
+# VariantPlaylist object.  It runs on the createMaster() worker threads and
+# raises FetchError if the Variant cannot be retrieved (or the decode/requests
+# error met while reading it, which createMaster() records the same way).
+def loadVariant(variantURL, stream=False):
+	logging.info("++------------------------->> Entering loadVariant")
+	varRsc, validURL, web = fetchURL(variantURL, stream)
+	if stream:
+		logging.info("++---------->> Streamed variant from createMaster:")
+		newVariant = streamVariant(iterLines(varRsc, web), variantURL)
+	elif web == True:
+		# Variant Resource can be loaded into an object, but must be decoded
+		logging.info("++---------->> Web variant from createMaster:")
+		varContents = varRsc.decode('utf-8')
+		varContentList = list(varContents.splitlines())
+		#Now we have the contents of the URL
+		logging.info("++---------->> Created variant contentList of length: %s", len(varContentList))
+		if traceLines:
+			for k in range(0, len(varContentList)):
+				logging.debug("++---------->> varContentList: %s", varContentList[k])
+		newVariant = createVariant(varContentList, variantURL)
+	else:
+		# Resource is the filehandle we got from fetchURL, and the lines can be read
+		logging.info("++---------->> File variant from createMaster:")
+		try:
+			varContents = varRsc.read()
+		finally:
+			varRsc.close()
+		varContentList = list(varContents.split("\n"))
+		logging.info("++---------->> Created contentList of length: %s", len(varContentList))
+		if traceLines:
+			for l in range(0, len(varContentList)):
+				logging.debug("++---------->> varContentList: %s", varContentList[l])
+		newVariant = createVariant(varContentList, variantURL)
+	if traceLines:
+		for z in range(0, len(newVariant.vContent)):
+			logging.debug("++---------->> newVariant vContent: %s", newVariant.vContent[z])
+	logging.info("++------------------------->> Leaving loadVariant")
+	return newVariant
+#
+# End of loadVariant
+####################################
+
+####################################
+#
+# This function returns a new VariantPlaylist with the content (or, if streamed, the
+# rule results) of a Variant already retrieved, for a Variant a Master lists more
+# than once.  Each listing gets its own check results without another fetch.
+def copyVariant(variant):
+	varList = VariantPlaylist()
+	varList.master = False
+	varList.vContent = variant.vContent   #Only read by the checks
+	varList.tagCodes = variant.tagCodes
+	varList.streamed = variant.streamed
+	varList.rules = variant.rules if variant.streamed else None
+	varList.suppliedURL = variant.suppliedURL
+	return varList
+#
+# End of copyVariant
+####################################
+
 ####################################
 #
 # This function creates VariantPlaylist objects
@@ -1494,11 +2739,14 @@ def createVariant(contenList, urL):
 	varList = VariantPlaylist()
 	varList.master = False
 	varList.vContent = []
-	for i in range(0, len(contenList)):
-		logging.info("++--------------->> Adding contents: %s", contenList[i])
-		varList.vContent.append(contenList[i])
-	for i in range(0, len(varList.vContent)):
-		logging.info("++--------------->> Variant contents: %s", varList.vContent[i])
+	varList.vContent.extend(contenList)
+	if traceLines:
+		for i in range(0, len(contenList)):
+			logging.debug("++--------------->> Adding contents: %s", contenList[i])
+	varList.tagCodes = tokenizeContent(varList.vContent)
+	if traceLines:
+		for i in range(0, len(varList.vContent)):
+			logging.debug("++--------------->> Variant contents: %s", varList.vContent[i])
 	varList.suppliedURL = str(urL)
 	logging.info("++--------------->> Setting varURL: %s", varList.suppliedURL)
 	logging.info("++------------------------->> Leaving createVariant")
@@ -1507,6 +2755,26 @@ def createVariant(contenList, urL):
 # End of createVariant
 ####################################
 
+####################################
+#
+# This function creates a VariantPlaylist object by running the validation rules
+# over the lines as they are read.  The lines themselves are not kept.
+def streamVariant(lines, urL):
+	logging.info("++------------------------->> Entering streamVariant")
+	logging.info("++--------------->> Handed-in URL: %s", urL)
+	varList = VariantPlaylist()
+	varList.master = False
+	varList.vContent = []
+	varList.tagCodes = bytearray()
+	varList.streamed = True
+	varList.suppliedURL = str(urL)
+	varList.rules = ValidationEngine(False).run(lines)
+	logging.info("++------------------------->> Leaving streamVariant")
+	return varList
+#
+# End of streamVariant
+####################################
+
 ####################################
 #
 # This function is used to create Playlist Objects.  A MasterPlaylist
@@ -1514,8 +2782,30 @@ def createVariant(contenList, urL):
 # only have media files listed.  Both are subclasses of Playlist.
 # This function creates both types.
 #
-def createPlaylist(rsrc, urlFlag, webFlag, URL):
+def createPlaylist(rsrc, urlFlag, webFlag, URL, stream=False, workers=FETCH_WORKERS):
 	logging.info("++------------------------->> Entering createPlaylist")
+	if stream:
+	# Lines are read until the playlist type is known: a .m3u8 line before the first
+	# media segment makes it a Master (small, so it is read in full), otherwise the
+	# Variant is validated while the rest of the lines stream in.
+		logging.info("++---------->> Entered createPlaylist for streaming:")
+		lines = iterLines(rsrc, webFlag)
+		head = []
+		master = False
+		for line in lines:
+			head.append(line)
+			if '.m3u8' in line:
+				master = True
+				break
+			if line.startswith('#EXTINF'):
+				break
+		logging.info("++------------>> The playlist object was tested to be Master: %s", str(master))
+		if master:
+			playList = createMaster(head + list(lines), URL, stream, workers)
+		else:
+			playList = streamVariant(itertools.chain(head, lines), URL)
+		logging.info("++------------------------->> Leaving createPlaylist")
+		return playList
 	if webFlag == True:
 	# Resource can be loaded into an object, but must be decoded
 		logging.info("++---------->> Entered createPlaylist for Web URL:")
@@ -1548,13 +2838,15 @@ def createPlaylist(rsrc, urlFlag, webFlag, URL):
 	
 	if master:
 		logging.info("++--------------->> Master contentList")
-		for i in range(0, len(contentList)):
-			logging.info("++--------------->> contentList:" + contentList[i])
-		playList = createMaster(contentList, URL)
+		if traceLines:
+			for i in range(0, len(contentList)):
+				logging.debug("++--------------->> contentList: %s", contentList[i])
+		playList = createMaster(contentList, URL, stream, workers)
 	else:
 		logging.info("++--------------->> Variant contentList")
-		for i in range(0, len(contentList)):
-			logging.info("++--------------->> contentList:" + contentList[i])
+		if traceLines:
+			for i in range(0, len(contentList)):
+				logging.debug("++--------------->> contentList: %s", contentList[i])
 		playList = createVariant(contentList, URL)
 	logging.info("++------------------------->> Leaving createPlaylist")
 	return playList
@@ -1575,6 +2867,11 @@ def screenPrint (playList):
 		for i in range(0, len(playList.variantList)):
 			print(playList.variantURLs[i])
 		print('')
+		if len(playList.variantErrors) > 0:
+			print('Variants that could not be retrieved:')
+			for variantURL, reason in playList.variantErrors:
+				print(variantURL, ' \t', reason)
+			print('')
 	print('')
 	print('-----<<HEADER CHECK>>-----')
 	print('For the given URL: ', playList.suppliedURL, ' \t', playList.ckHeader)
@@ -1618,7 +2915,7 @@ def screenPrint (playList):
 			print('\t\t\t', playList.variantList[i].compCheckV6)
 			print('\t\t\t', playList.variantList[i].compCheckV7)
 		if len(playList.verCompCkErrorLines) > 0:
-			print(playLIst.suppliedURL, ' compatibility errors on lines: ', playList.verCompCkErrorLines)
+			print(playList.suppliedURL, ' compatibility errors on lines: ', playList.verCompCkErrorLines)
 		for i in range(0, len(playList.variantList)):
 			if len(playList.variantList[i].verCompCkErrorLines) > 0:
 				print(playList.variantURLs[i], ' compatibility errors on lines: ')
@@ -1632,7 +2929,7 @@ def screenPrint (playList):
 		print('\t\t\t', playList.compCheckV6)
 		print('\t\t\t', playList.compCheckV7)
 		if len(playList.verCompCkErrorLines) > 0:
-			print(playLIst.suppliedURL, ' compatibility errors on lines: ')
+			print(playList.suppliedURL, ' compatibility errors on lines: ')
 			for i in range(0, len(playList.verCompCkErrorLines)):
 				print('\t', playList.verCompCkErrorLines[i])
 	print('')
@@ -1737,7 +3034,7 @@ def screenPrint (playList):
 			print('\t\t\t', playList.variantList[i].vStartTag)
 			print('\t\t\t', playList.variantList[i].vTimeTag)
 		if len(playList.mMediaMasterLines) > 0:
-			print(playLIst.suppliedURL, ' Media-Master errors on lines: ')
+			print(playList.suppliedURL, ' Media-Master errors on lines: ')
 			for i in range(0, len(playList.mMediaMasterLines)):
 				print(playList.mMediaMasterLines[i])
 		for i in range(0, len(playList.variantList)):
@@ -1768,6 +3065,8 @@ def screenPrint (playList):
 			print('\t\t\t', playList.variantList[i].vTagCheck)
 			print('\t\t\t', playList.variantList[i].vMultiTag)
 			print('\t\t\t', playList.variantList[i].vDurCheck)
+			print('\t\t\t', playList.variantList[i].vRoundCheck)
+			print('\t\t\t', playList.variantList[i].vDurStats)
 			print('')
 		print('----------')
 		for j in range(0, len(playList.variantList)):
@@ -1775,16 +3074,27 @@ def screenPrint (playList):
 				print(playList.variantURLs[j], ' Target-Duration errors on lines: ')
 				for k in range(0, len(playList.variantList[j].vTargetDurationLines)):
 					print('\t', playList.variantList[j].vTargetDurationLines[k])
+			if len(playList.variantList[j].vRoundingLines) > 0:
+				print(playList.variantURLs[j], ' Rounded duration errors on lines: ')
+				for k in range(0, len(playList.variantList[j].vRoundingLines)):
+					print('\t', playList.variantList[j].vRoundingLines[k])
 	else:
 		print('\t\t\t', playList.vTagCheck)
 		print('\t\t\t', playList.vMultiTag)
 		print('\t\t\t', playList.vDurCheck)
+		print('\t\t\t', playList.vRoundCheck)
+		print('\t\t\t', playList.vDurStats)
 		print('')
 		if len(playList.vTargetDurationLines) > 0:
 			print(playList.suppliedURL, ' Target-Duration errors on lines: ')
 			print('----------')
 			for i in range(0, len(playList.vTargetDurationLines)):
 				print('\t', playList.vTargetDurationLines[i])
+		if len(playList.vRoundingLines) > 0:
+			print(playList.suppliedURL, ' Rounded duration errors on lines: ')
+			print('----------')
+			for i in range(0, len(playList.vRoundingLines)):
+				print('\t', playList.vRoundingLines[i])
 	print('')
 	print('-----<<MEDIA SEQUENCE CHECKS>>-----')
 	print('For the given URL: ', playList.suppliedURL)
@@ -1874,6 +3184,11 @@ def screenPrint (playList):
 			for i in range(0, len(playList.vIFramesOnlyLines)):
 				print('\t', playList.vIFramesOnlyLines[i])
 	print('')
+	if resultCache is not None:
+		print('-----<<RESULT CACHE STATS>>-----')
+		for line in resultCache.stats():
+			print('\t\t\t', line)
+		print('')
 	print('<<##--------------- End of Report ---------------##>>')
 	print('')
 	print('')
@@ -1886,13 +3201,26 @@ def screenPrint (playList):
 ####################################
 # PDF Generation Functions
 #
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.rl_config import defaultPageSize
-from reportlab.lib.units import inch
-PAGE_HEIGHT=defaultPageSize[1]; PAGE_WIDTH=defaultPageSize[0]
-styles = getSampleStyleSheet()
+styles = None   #Set by loadReportlab() along with the reportlab names below
+
+def loadReportlab():
+	#reportlab is only imported when the first PDF is made, so command mode and
+	#--format json|ndjson never pay for it
+	global SimpleDocTemplate, Paragraph, Spacer, Table, inch, blue, PAGE_HEIGHT, PAGE_WIDTH, styles
+	if styles is None:
+		logging.info("++---------->> Importing reportlab")
+		from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+		from reportlab.lib.styles import getSampleStyleSheet
+		from reportlab.rl_config import defaultPageSize
+		from reportlab.lib.units import inch
+		from reportlab.lib.colors import blue
+		PAGE_HEIGHT=defaultPageSize[1]; PAGE_WIDTH=defaultPageSize[0]
+		styles = getSampleStyleSheet()
 
+def pdfText(value):
+	#Paragraph reads its text as markup, and URLs and error messages (a requests
+	#ConnectionError names '<urllib3.connection... object at 0x...>') are not
+	return xml.sax.saxutils.escape(str(value))
 
 def myFirstPage(canvas, doc):
 	canvas.saveState()
@@ -1911,17 +3239,81 @@ def myLaterPages(canvas, doc):
 	#canvas.setFillColor(blue)
 	pageinfo = 'Validation Report'
 	canvas.setFont('Times-Roman', 9)
-	canvas.drawString(inch, 0.75 * inch, "Page %d %s" % (doc.page, pageinfo))
+	canvas.drawString(inch, 0.75 * inch, "Page %d %s" % (doc.page + getattr(doc, 'pageOffset', 0), pageinfo))
 	canvas.restoreState()
 	
+##createPDF() builds its document PDF_CHUNK flowables at a time (see PDFStory), and
+##lists at most PDF_DETAIL_LINES error lines per check (--detail-lines, 0 for all)
+PDF_CHUNK = 2000
+PDF_DETAIL_LINES = 50
+
+def configurePDF(detailLines=None):
+	global PDF_DETAIL_LINES
+	if detailLines is not None:
+		PDF_DETAIL_LINES = detailLines
+
+def detailLines(errorLines):
+	#Yields the text of the error lines of a check for the report (a run of the same
+	#finding is one line range, see Findings).  After PDF_DETAIL_LINES lines the rest
+	#are only counted.
+	for index in range(0, len(errorLines)):
+		if PDF_DETAIL_LINES and index == PDF_DETAIL_LINES:
+			if isinstance(errorLines, Findings):
+				rest = sum(errorLines.counts[index:])
+			else:
+				rest = len(errorLines) - index
+			yield '... %d more error lines not listed' % rest
+			return
+		yield str(errorLines[index])
+
+class PDFStory(object):
+	#The Story of createPDF().  Every PDF_CHUNK flowables are built into a part file
+	#and let go, so a report with thousands of error lines never holds them all; the
+	#parts (each starts on a new page) are stitched together with PyPDF2.  A report
+	#of one part is written straight to fileName.
+	def __init__(self, fileName):
+		self.fileName = fileName
+		self.flowables = []
+		self.parts = []
+		self.pages = 0
+
+	def append(self, flowable):
+		self.flowables.append(flowable)
+		if len(self.flowables) >= PDF_CHUNK:
+			self.flush()
+
+	def flush(self, fileName=None):
+		partFile = fileName or '%s.part%d' % (self.fileName, len(self.parts))
+		doc = SimpleDocTemplate(partFile)
+		doc.pageOffset = self.pages   #Page numbers carry on from the last part
+		doc.build(self.flowables, onFirstPage = myFirstPage if self.pages == 0 else myLaterPages, onLaterPages = myLaterPages)
+		self.pages += doc.page
+		self.flowables = []
+		if fileName is None:
+			self.parts.append(partFile)
+			logging.info("++--------------->> %s: part %s written, %s pages", self.fileName, len(self.parts), self.pages)
+
+	def close(self):
+		if not self.parts:
+			self.flush(self.fileName)
+			return
+		try:
+			if self.flowables:
+				self.flush()
+			loadPyPDF2()
+			AggregateReport.merge(self.parts, self.fileName)
+		finally:
+			for partFile in self.parts:
+				if os.path.exists(partFile):
+					os.remove(partFile)
+
 def createPDF(header, playList, fileName):
 	logging.info("++---------->> Entered createPDF:")
 	logging.info("++--------------->> Filename passed in: %s", fileName)
 	## fileName is then used to set pdf below and both calling cases already
 	## set the string to '.pdf'
-	doc = SimpleDocTemplate(fileName)
-	Story = [Spacer(1,2*inch)]
-	Story.clear()
+	loadReportlab()
+	Story = PDFStory(fileName)
 	style = styles["Normal"]
 	style.textColor = blue
 	## First add the Header to the 'Story'
@@ -1938,6 +3330,13 @@ def createPDF(header, playList, fileName):
 			p = Paragraph(playList.variantURLs[i], style)
 			Story.append(p)
 		Story.append(Spacer(1, 0.2*inch))
+		if len(playList.variantErrors) > 0:
+			p = Paragraph('Variants that could not be retrieved:', style)
+			Story.append(p)
+			for variantURL, reason in playList.variantErrors:
+				p = Paragraph(pdfText(variantURL) + '----->' + pdfText(reason), style)
+				Story.append(p)
+			Story.append(Spacer(1, 0.2*inch))
 	Story.append(Spacer(1, 0.2*inch))
 	line = '-----<=HEADER CHECK=>-----'
 	p = Paragraph(line, style)
@@ -2038,7 +3437,7 @@ def createPDF(header, playList, fileName):
 			Story.append(p)
 			Story.append(Spacer(1, 0.2*inch))
 		if len(playList.verCompCkErrorLines) > 0:
-			line = str(playLIst.suppliedURL) + ' compatibility errors on lines: ' + str(playList.verCompCkErrorLines)
+			line = str(playList.suppliedURL) + ' compatibility errors on lines: ' + str(playList.verCompCkErrorLines)
 			p = Paragraph(line, style)
 			Story.append(p)
 			Story.append(Spacer(1, 0.2*inch))
@@ -2047,8 +3446,8 @@ def createPDF(header, playList, fileName):
 				line = str(playList.variantURLs[i]) + ' compatibility errors on lines: '
 				p = Paragraph(line, style)
 				Story.append(p)
-				for k in range(0, len(playList.variantList[i].verCompCkErrorLines)):
-					line = '----->' + str(playList.variantList[i].verCompCkErrorLines[k])
+				for line in detailLines(playList.variantList[i].verCompCkErrorLines):
+					line = '----->' + line
 					p = Paragraph(line, style)
 					Story.append(p)
 				Story.append(Spacer(1, 0.2*inch))
@@ -2072,11 +3471,11 @@ def createPDF(header, playList, fileName):
 		p = Paragraph(line, style)
 		Story.append(p)
 		if len(playList.verCompCkErrorLines) > 0:
-			line = str(playLIst.suppliedURL) + ' compatibility errors on lines: '
+			line = str(playList.suppliedURL) + ' compatibility errors on lines: '
 			p = Paragraph(line, style)
 			Story.append(p)
-			for i in range(0, len(playList.verCompCkErrorLines)):
-				line = '----->' + str(playList.verCompCkErrorLines[i])
+			for line in detailLines(playList.verCompCkErrorLines):
+				line = '----->' + line
 				p = Paragraph(line, style)
 				Story.append(p)
 	Story.append(Spacer(1, 0.2*inch))
@@ -2109,8 +3508,8 @@ def createPDF(header, playList, fileName):
 			line = str(playList.suppliedURL) + ' mixed tags errors on lines: '
 			p = Paragraph(line, style)
 			Story.append(p)
-			for i in range(0, len(playList.mTagsErrorLines)):
-				line = '----->' + str(playList.mTagsErrorLines[i])
+			for line in detailLines(playList.mTagsErrorLines):
+				line = '----->' + line
 				p = Paragraph(line, style)
 				Story.append(p)
 			Story.append(Spacer(1, 0.2*inch))
@@ -2119,8 +3518,8 @@ def createPDF(header, playList, fileName):
 				line = str(playList.variantURLs[i]) + ' mixed tags errors on lines: '
 				p = Paragraph(line, style)
 				Story.append(p)
-				for k in range(0, len(playList.variantList[i].vTagsErrorLines)):
-					line = '----->' + str(playList.variantList[i].vTagsErrorLines[k])
+				for line in detailLines(playList.variantList[i].vTagsErrorLines):
+					line = '----->' + line
 					p = Paragraph(line, style)
 					Story.append(p)
 				Story.append(Spacer(1, 0.2*inch))
@@ -2136,8 +3535,8 @@ def createPDF(header, playList, fileName):
 			line = '----------'
 			p = Paragraph(line, style)
 			Story.append(p)
-			for i in range(0, len(playList.vTagsErrorLines)):
-				line = '----->' + str(playList.vTagsErrorLines[i])
+			for line in detailLines(playList.vTagsErrorLines):
+				line = '----->' + line
 				p = Paragraph(line, style)
 				Story.append(p)
 	Story.append(Spacer(1, 0.2*inch))
@@ -2173,8 +3572,8 @@ def createPDF(header, playList, fileName):
 			line = str(playList.suppliedURL) + ' stream INF errors on lines: '
 			p = Paragraph(line, style)
 			Story.append(p)
-			for i in range(0, len(playList.mStreamInfLines)):
-				line = '----->' + str(playList.mStreamInfLines[i])
+			for line in detailLines(playList.mStreamInfLines):
+				line = '----->' + line
 				p = Paragraph(line, style)
 				Story.append(p)
 		for i in range(0, len(playList.variantList)):
@@ -2182,8 +3581,8 @@ def createPDF(header, playList, fileName):
 				line = str(playList.variantURLs[i]) + ' stream INF errors on lines: '
 				p = Paragraph(line, style)
 				Story.append(p)
-				for k in range(0, len(playList.variantList[i].vStreamInfLines)):
-					line = '----->' + str(playList.variantList[i].vStreamInfLines[k])
+				for line in detailLines(playList.variantList[i].vStreamInfLines):
+					line = '----->' + line
 					p = Paragraph(line, style)
 					Story.append(p)
 				Story.append(Spacer(1, 0.2*inch))
@@ -2199,8 +3598,8 @@ def createPDF(header, playList, fileName):
 			line = '----------'
 			p = Paragraph(line, style)
 			Story.append(p)
-			for i in range(0, len(playList.vStreamInfLines)):
-				line = '----->' + str(playList.vStreamInfLines[i])
+			for line in detailLines(playList.vStreamInfLines):
+				line = '----->' + line
 				p = Paragraph(line, style)
 				Story.append(p)
 	Story.append(Spacer(1, 0.2*inch))
@@ -2225,8 +3624,8 @@ def createPDF(header, playList, fileName):
 			line = 'EXT-X-I-FRAME-STREAM-INF errors on lines: '
 			p = Paragraph(line, style)
 			Story.append(p)
-			for i in range(0, len(playList.mIFrameLines)):
-				line = '----->' + str(playList.mIFrameLines[i])
+			for line in detailLines(playList.mIFrameLines):
+				line = '----->' + line
 				p = Paragraph(line, style)
 				Story.append(p)
 		Story.append(Spacer(1, 0.2*inch))
@@ -2260,8 +3659,8 @@ def createPDF(header, playList, fileName):
 			line = 'EXT-X-SESSION-DATA errors on lines: '
 			p = Paragraph(line, style)
 			Story.append(p)
-			for i in range(0, len(playList.mSessionDataLines)):
-				line = '----->' + str(playList.mSessionDataLines[i])
+			for line in detailLines(playList.mSessionDataLines):
+				line = '----->' + line
 				p = Paragraph(line, style)
 				Story.append(p)
 		Story.append(Spacer(1, 0.2*inch))
@@ -2304,20 +3703,19 @@ def createPDF(header, playList, fileName):
 			Story.append(p)
 			Story.append(Spacer(1, 0.2*inch))
 		if len(playList.mMediaMasterLines) > 0:
-			line = str(playLIst.suppliedURL) + ' Media-Master errors on lines: '
+			line = str(playList.suppliedURL) + ' Media-Master errors on lines: '
 			p = Paragraph(line, style)
 			Story.append(p)
-			for i in range(0, len(playList.mMediaMasterLines)):
-				line = str(playList.mMediaMasterLines[i])
+			for line in detailLines(playList.mMediaMasterLines):
 				p = Paragraph(line, style)
-			Story.append(p)
+				Story.append(p)
 		for i in range(0, len(playList.variantList)):
 			if len(playList.variantList[i].vMediaMasterLines) > 0:
-				line + str(playList.variantURLs[i]) + ' Media-Master errors on lines: '
+				line = str(playList.variantURLs[i]) + ' Media-Master errors on lines: '
 				p = Paragraph(line, style)
 				Story.append(p)
-				for k in range(0, len(playList.variantList[i].vMediaMasterLines)):
-					line = '----->' + str(playList.variantList[i].vMediaMasterLines[k])
+				for line in detailLines(playList.variantList[i].vMediaMasterLines):
+					line = '----->' + line
 					p = Paragraph(line, style)
 					Story.append(p)
 	else:
@@ -2339,8 +3737,8 @@ def createPDF(header, playList, fileName):
 			p = Paragraph(line, style)
 			Story.append(p)
 			Story.append(Spacer(1, 0.2*inch))
-			for i in range(0, len(playList.vMediaMasterLines)):
-				line = '----->' + str(playList.vMediaMasterLines[i])
+			for line in detailLines(playList.vMediaMasterLines):
+				line = '----->' + line
 				p = Paragraph(line, style)
 				Story.append(p)
 			Story.append(Spacer(1, 0.2*inch))
@@ -2374,6 +3772,12 @@ def createPDF(header, playList, fileName):
 			line = '---------->' + str(playList.variantList[i].vDurCheck)
 			p = Paragraph(line, style)
 			Story.append(p)
+			line = '---------->' + str(playList.variantList[i].vRoundCheck)
+			p = Paragraph(line, style)
+			Story.append(p)
+			line = '---------->' + str(playList.variantList[i].vDurStats)
+			p = Paragraph(line, style)
+			Story.append(p)
 			Story.append(Spacer(1, 0.2*inch))
 		line = '----------'
 		p = Paragraph(line, style)
@@ -2384,8 +3788,16 @@ def createPDF(header, playList, fileName):
 				line = str(playList.variantURLs[j]) + ' Target-Duration errors on lines: '
 				p = Paragraph(line, style)
 				Story.append(p)
-				for k in range(0, len(playList.variantList[j].vTargetDurationLines)):
-					line = '----->' + str(playList.variantList[j].vTargetDurationLines[k])
+				for line in detailLines(playList.variantList[j].vTargetDurationLines):
+					line = '----->' + line
+					p = Paragraph(line, style)
+					Story.append(p)
+			if len(playList.variantList[j].vRoundingLines) > 0:
+				line = str(playList.variantURLs[j]) + ' Rounded duration errors on lines: '
+				p = Paragraph(line, style)
+				Story.append(p)
+				for line in detailLines(playList.variantList[j].vRoundingLines):
+					line = '----->' + line
 					p = Paragraph(line, style)
 					Story.append(p)
 			Story.append(Spacer(1, 0.2*inch))
@@ -2399,6 +3811,12 @@ def createPDF(header, playList, fileName):
 		line = '---------->' + str(playList.vDurCheck)
 		p = Paragraph(line, style)
 		Story.append(p)
+		line = '---------->' + str(playList.vRoundCheck)
+		p = Paragraph(line, style)
+		Story.append(p)
+		line = '---------->' + str(playList.vDurStats)
+		p = Paragraph(line, style)
+		Story.append(p)
 		Story.append(Spacer(1, 0.2*inch))
 		if len(playList.vTargetDurationLines) > 0:
 			line = str(playList.suppliedURL) + ' Target-Duration errors on lines: '
@@ -2407,8 +3825,16 @@ def createPDF(header, playList, fileName):
 			line = '----------'
 			p = Paragraph(line, style)
 			Story.append(p)
-			for i in range(0, len(playList.vTargetDurationLines)):
-				line = '----->' + str(playList.vTargetDurationLines[i])
+			for line in detailLines(playList.vTargetDurationLines):
+				line = '----->' + line
+				p = Paragraph(line, style)
+				Story.append(p)
+		if len(playList.vRoundingLines) > 0:
+			line = str(playList.suppliedURL) + ' Rounded duration errors on lines: '
+			p = Paragraph(line, style)
+			Story.append(p)
+			for line in detailLines(playList.vRoundingLines):
+				line = '----->' + line
 				p = Paragraph(line, style)
 				Story.append(p)
 	Story.append(Spacer(1, 0.2*inch))
@@ -2450,8 +3876,8 @@ def createPDF(header, playList, fileName):
 				line = str(playList.variantURLs[j]) + ' Media Sequence errors on lines: '
 				p = Paragraph(line, style)
 				Story.append(p)
-				for k in range(0, len(playList.variantList[j].vMediaSequenceLines)):
-					line = '----->' + str(playList.variantList[j].vMediaSequenceLines[k])
+				for line in detailLines(playList.variantList[j].vMediaSequenceLines):
+					line = '----->' + line
 					p = Paragraph(line, style)
 					Story.append(p)
 	else:
@@ -2472,8 +3898,8 @@ def createPDF(header, playList, fileName):
 			line = '----------'
 			p = Paragraph(line, style)
 			Story.append(p)
-			for i in range(0, len(playList.vMediaSequenceLines)):
-				line = '----->' + str(playList.vMediaSequenceLines[i])
+			for line in detailLines(playList.vMediaSequenceLines):
+				line = '----->' + line
 				p = Paragraph(line, style)
 				Story.append(p)
 	Story.append(Spacer(1, 0.2*inch))
@@ -2516,8 +3942,8 @@ def createPDF(header, playList, fileName):
 				line = str(playList.variantURLs[j]) + ' Discontinuity Sequence errors on lines: '
 				p = Paragraph(line, style)
 				Story.append(p)
-				for k in range(0, len(playList.variantList[j].vDiscSequenceLines)):
-					line = '----->' + str(playList.variantList[j].vDiscSequenceLines[k])
+				for line in detailLines(playList.variantList[j].vDiscSequenceLines):
+					line = '----->' + line
 					p = Paragraph(line, style)
 					Story.append(p)
 	else:
@@ -2538,8 +3964,8 @@ def createPDF(header, playList, fileName):
 			line = '----------'
 			p = Paragraph(line, style)
 			Story.append(p)
-			for i in range(0, len(playList.vDiscSequenceLines)):
-				line = '----->' + str(playList.vDiscSequenceLines[i])
+			for line in detailLines(playList.vDiscSequenceLines):
+				line = '----->' + line
 				p = Paragraph(line, style)
 				Story.append(p)
 	Story.append(Spacer(1, 0.2*inch))
@@ -2578,8 +4004,8 @@ def createPDF(header, playList, fileName):
 				line = str(playList.variantURLs[j]) + ' IFrame Only errors on lines: '
 				p = Paragraph(line, style)
 				Story.append(p)
-				for k in range(0, len(playList.variantList[j].vIFramesOnlyLines)):
-					line = '----->' + str(playList.variantList[j].vIFramesOnlyLines[k])
+				for line in detailLines(playList.variantList[j].vIFramesOnlyLines):
+					line = '----->' + line
 					p = Paragraph(line, style)
 					Story.append(p)
 	else:
@@ -2598,96 +4024,1301 @@ def createPDF(header, playList, fileName):
 			p = Paragraph(line, style)
 			Story.append(p)
 			Story.append(Spacer(1, 0.2*inch))
-			for i in range(0, len(playList.vIFramesOnlyLines)):
-				line = '----->' + str(playList.vIFramesOnlyLines[i])
+			for line in detailLines(playList.vIFramesOnlyLines):
+				line = '----->' + line
 				p = Paragraph(line, style)
 				Story.append(p)
 			Story.append(Spacer(1, 0.2*inch))
 	Story.append(Spacer(1, 0.2*inch))
+	if resultCache is not None:
+		line = '-----<=RESULT CACHE STATS=>-----'
+		p = Paragraph(line, style)
+		Story.append(p)
+		for stat in resultCache.stats():
+			line = '---------->' + stat
+			p = Paragraph(line, style)
+			Story.append(p)
+		Story.append(Spacer(1, 0.2*inch))
 	p = Paragraph('<<##--------------- End of Report ---------------##>>', style)
 	Story.append(p)
 	Story.append(Spacer(1, 0.2*inch))
-	doc.build(Story, onFirstPage = myFirstPage, onLaterPages = myLaterPages)
+	Story.close()
 	logging.info("<<----------++ Leaving createPDF:")
 
 #
 # End of PDF Generation Functions
 ####################################
 
+####################################
+#
+# Aggregate Report Functions
+#
+# With --report FILE a batch file makes one PDF.  Every playlist is still written
+# by createPDF(), as a section file in a work directory next to the report (the
+# --jobs processes write them too), and main() adds each finished section to the
+# AggregateReport.  Only the check tallies and the REPORT_WORST worst playlists are
+# kept; every REPORT_CHUNK sections are stitched into one chunk PDF with PyPDF2 and
+# deleted.  close() writes the summary and stitches it in front of the chunks.
+REPORT_CHUNK = 100   #Sections stitched into one chunk PDF
+REPORT_WORST = 20    #Playlists listed in the worst offenders table
+PdfMerger = None     #Set by loadPyPDF2()
+
+def loadPyPDF2():
+	#PyPDF2 is only imported for --report
+	global PdfMerger
+	if PdfMerger is None:
+		logging.info("++---------->> Importing PyPDF2")
+		try:
+			from PyPDF2 import PdfMerger
+		except ImportError:   #PyPDF2 before 2.0
+			from PyPDF2 import PdfFileMerger as PdfMerger
+
+def failedValue(value):
+	#True for a check result that reports a failure
+	return str(value).startswith(('FAILED', 'ERROR'))
+
+def checkTally(record):
+	#Returns (check name, failed) for every check of a playlistRecord() and its Variants
+	tally = []
+	for playList in [record] + [variant for variant in record.get('variants', []) if isinstance(variant, dict)]:
+		for name, value in playList.get('checks', {}).items():
+			tally.append((name, failedValue(value)))
+	return tally
+
+class AggregateReport(object):
+	def __init__(self, fileName):
+		self.fileName = fileName
+		self.workDir = tempfile.mkdtemp(prefix='.report-', dir=os.path.dirname(os.path.abspath(fileName)))
+		self.checks = collections.defaultdict(lambda: [0, 0])   #Check name -> [passed, failed]
+		self.worst = []      #Heap of (failed checks, url) of the REPORT_WORST worst playlists
+		self.failures = []   #(url, kind, message) of the playlists that could not be reported
+		self.sections = []   #Section files not yet stitched into a chunk
+		self.chunks = []
+		self.count = 0
+
+	def add(self, url, sectionFile, tally):
+		self.count += 1
+		failed = 0
+		for name, checkFailed in tally:
+			self.checks[name][checkFailed] += 1
+			failed += checkFailed
+		if failed:
+			if len(self.worst) < REPORT_WORST:
+				heapq.heappush(self.worst, (failed, url))
+			else:
+				heapq.heappushpop(self.worst, (failed, url))
+		self.sections.append(sectionFile)
+		if len(self.sections) >= REPORT_CHUNK:
+			self.stitch()
+
+	def failed(self, url, kind, message):
+		self.failures.append((url, kind, message))
+
+	def stitch(self):
+		#Stitches the waiting sections into the next chunk PDF
+		if not self.sections:
+			return
+		loadPyPDF2()
+		chunkFile = os.path.join(self.workDir, 'chunk%05d.pdf' % len(self.chunks))
+		self.merge(self.sections, chunkFile)
+		for sectionFile in self.sections:
+			os.remove(sectionFile)
+		self.chunks.append(chunkFile)
+		self.sections = []
+
+	@staticmethod
+	def merge(inputFiles, outputFile):
+		merger = PdfMerger()
+		for inputFile in inputFiles:
+			merger.append(inputFile)
+		with open(outputFile, 'wb') as output:
+			merger.write(output)
+		merger.close()
+
+	def summary(self, summaryFile, batchURL):
+		loadReportlab()
+		doc = SimpleDocTemplate(summaryFile)
+		style = styles["Normal"]
+		style.textColor = blue
+		Story = []
+		Story.append(Paragraph('<<##--------------------- Batch Report ------------------------##>>', style))
+		Story.append(Paragraph('The given file was: ' + pdfText(batchURL), style))
+		Story.append(Paragraph('Playlists= %d Reported= %d Failed= %d' %
+			(self.count + len(self.failures), self.count, len(self.failures)), style))
+		Story.append(Spacer(1, 0.2*inch))
+		Story.append(Paragraph('-----<=CHECK SUMMARY=>-----', style))
+		rows = [['Check', 'Passed', 'Failed']]
+		for name, (passed, failed) in sorted(self.checks.items(), key=lambda item: (-item[1][1], item[0])):
+			rows.append([name, passed, failed])
+		Story.append(Table(rows, hAlign='LEFT'))
+		Story.append(Spacer(1, 0.2*inch))
+		if self.worst:
+			Story.append(Paragraph('-----<=WORST OFFENDERS=>-----', style))
+			rows = [['Playlist', 'Failed checks']]
+			for failed, url in sorted(self.worst, key=lambda item: (-item[0], item[1])):
+				rows.append([url, failed])
+			Story.append(Table(rows, hAlign='LEFT'))
+			Story.append(Spacer(1, 0.2*inch))
+		if self.failures:
+			Story.append(Paragraph('-----<=FAILED PLAYLISTS=>-----', style))
+			for url, kind, message in self.failures:
+				Story.append(Paragraph('FAILED (' + pdfText(kind) + '): ' + pdfText(url) + '----->' + pdfText(message), style))
+			Story.append(Spacer(1, 0.2*inch))
+		Story.append(Paragraph('<<##--------------- End of Summary ---------------##>>', style))
+		doc.build(Story, onFirstPage = myFirstPage, onLaterPages = myLaterPages)
+
+	def close(self, batchURL):
+		logging.info("++---------->> Writing the batch report %s: %s sections", self.fileName, self.count)
+		try:
+			self.stitch()
+			summaryFile = os.path.join(self.workDir, 'summary.pdf')
+			try:
+				self.summary(summaryFile, batchURL)
+				summaryFiles = [summaryFile]
+			except Exception as e:
+				#The stitched sections are still written, just without the summary
+				logging.error("++---------->> Could not write the summary of %s: %s: %s", self.fileName, type(e).__name__, e)
+				summaryFiles = []
+			loadPyPDF2()
+			self.merge(summaryFiles + self.chunks, self.fileName)
+		except Exception:
+			#The sections and chunks are kept so the report can be stitched by hand
+			logging.error("++---------->> Could not write the batch report %s, its sections are kept in %s", self.fileName, self.workDir)
+			raise
+		shutil.rmtree(self.workDir, ignore_errors=True)
+#
+# End of Aggregate Report Functions
+####################################
+
+####################################
+#
+# JSON / NDJSON Output Functions (--format json|ndjson)
+#
+# These write the check results without reportlab.  Every check attribute and
+# error line list that screenPrint() and createPDF() report is copied into a
+# record: json writes one array of playlist records (Variants nested under their
+# Master), ndjson writes one line per playlist and one per Variant.
+
+##Check attributes reported for each kind of playlist, in report order
+MASTER_CHECKS = ('ckHeader', 'mVersionCk', 'compService', 'compProgram', 'compCache',
+	'mTagsResult', 'mResultLine', 'mResultBW', 'mBWidth', 'mURI', 'mIDCheck', 'mJSONCk',
+	'mURICk', 'mMultCk', 'mMissCk', 'mSegTag', 'mStartTag', 'mTimeTag')
+MASTER_LINES = ('verCkErrorLines', 'verCompCkErrorLines', 'mTagsErrorLines', 'mStreamInfLines',
+	'mIFrameLines', 'mSessionDataLines', 'mMediaMasterLines')
+VARIANT_CHECKS = ('ckHeader', 'vVersionCk', 'compCheckV2', 'compCheckV3', 'compCheckV4',
+	'compCheckV5', 'compCheckV6', 'compCheckV7', 'vTagsResult', 'vResultTag', 'vSegTag',
+	'vStartTag', 'vTimeTag', 'vTagCheck', 'vMultiTag', 'vDurCheck', 'vRoundCheck', 'vDurStats',
+	'vTCount', 'vMedTagCheck',
+	'vMultiSeqTag', 'DSTagCheck', 'vDSTCount', 'vDSMultiCheck', 'vFrameCheck', 'vMediaSeg')
+VARIANT_LINES = ('verCkErrorLines', 'verCompCkErrorLines', 'vTagsErrorLines', 'vStreamInfLines',
+	'vMediaMasterLines', 'vTargetDurationLines', 'vMediaSequenceLines', 'vDiscSequenceLines',
+	'vIFramesOnlyLines', 'vRoundingLines')
+
+def playlistRecord(playList):
+	#Returns a dictionary of the results of one playlist (and its Variants)
+	if playList.master:
+		checkNames, lineNames = MASTER_CHECKS, MASTER_LINES
+	else:
+		checkNames, lineNames = VARIANT_CHECKS, VARIANT_LINES
+	record = {
+		'type': 'master' if playList.master else 'media',
+		'url': str(playList.suppliedURL),
+		'version': getattr(playList, 'playVersion', 0),
+		'checks': {},
+		'errorLines': {},
+	}
+	for name in checkNames:
+		value = getattr(playList, name, None)   #Some results only exist if the check fails
+		if value is not None:
+			record['checks'][name] = value
+	for name in lineNames:
+		lines = getattr(playList, name, None)
+		if lines:
+			record['errorLines'][name] = list(lines)
+	if playList.master:
+		record['variants'] = [playlistRecord(variant) for variant in playList.variantList]
+		record['variantErrors'] = [{'url': variantURL, 'error': reason} for variantURL, reason in playList.variantErrors]
+	elif playList.fetchError is not None:
+		record['fetchError'] = playList.fetchError
+	else:
+		table = playList.segmentTable()
+		record['segments'] = {'count': len(table), 'duration': table.totalDuration(),
+			'mediaSequence': table.mediaSequence, 'discontinuities': sum(table.discontinuity)}
+		stats = playList.durationStats
+		if stats is not None:
+			record['segments'].update({'mean': stats.mean, 'p99': stats.p99, 'maxDrift': stats.maxDrift,
+				'overTarget': len(stats.overLines), 'roundedOverTarget': len(stats.roundLines)})
+	return record
+
+class RecordWriter(object):
+	#Streams playlist records to an open file (or sys.stdout) as they are produced
+	def __init__(self, outputFormat, output, closeOutput=False):
+		self.outputFormat = outputFormat
+		self.output = output
+		self.closeOutput = closeOutput   #True if close() should also close output
+		self.count = 0
+
+	def write(self, record):
+		if self.outputFormat == 'ndjson':
+			variants = record.get('variants', [])
+			if record['type'] == 'master':
+				record = dict(record, variants=[variant['url'] for variant in variants])
+			self.output.write(json.dumps(record, default=str) + '\n')
+			for variant in variants:
+				self.output.write(json.dumps(dict(variant, master=record['url']), default=str) + '\n')
+		else:
+			self.output.write('[\n' if self.count == 0 else ',\n')
+			self.output.write(json.dumps(record, default=str))
+		self.count += 1
+		self.output.flush()
+
+	def close(self):
+		if self.outputFormat == 'json':
+			self.output.write('[]\n' if self.count == 0 else '\n]\n')
+		self.output.flush()
+		if self.closeOutput:
+			self.output.close()
+#
+# End of JSON / NDJSON Output Functions
+####################################
+
+####################################
+#
+# Live Monitor Functions
+#
+# A LiveMonitor follows one live Media playlist across reloads.  Each reload only
+# parses the lines after the newest segment seen before: that segment's URI line is
+# found with one rfind() over the new body, and its position is checked against the
+# new EXT-X-MEDIA-SEQUENCE with a count() of the EXTINF tags before it.  The header
+# and the new lines are fed to the variant rules (see appendedPlaylist()), so a new
+# segment is held to the same checks as in the other modes.  The checks that span
+# reloads are kept as state:
+#   - EXT-X-MEDIA-SEQUENCE continuity (no decrease, no skipped or renumbered segments)
+#   - EXT-X-DISCONTINUITY-SEQUENCE increments by the discontinuities that left the window
+#   - EXT-X-TARGETDURATION must not change
+#   - the playlist must change within 1.5 x the target duration
+# Reloads follow RFC 8216 section 6.3.4: one target duration after a change, half
+# of it when the playlist was unchanged.
+MONITOR_RELOAD = 5.0       #Seconds between reloads until a target duration is known
+MONITOR_CONCURRENCY = 64   #Reloads in progress at the same time (--concurrency)
+MONITOR_PER_HOST = 8       #Reloads in progress at the same time per host (--per-host)
+asyncio = None             #Imported by monitorPlaylists()
+
+def loadBody(url):
+	#Returns the text of a web URL or local file (raises FetchError)
+	rsrc, valid, web = fetchURL(url)
+	if web:
+		return rsrc.decode('utf-8', 'ignore')
+	try:
+		return rsrc.read()
+	finally:
+		rsrc.close()
+
+def appendedPlaylist(url, body, start):
+	#Returns a streamed VariantPlaylist checked by runChecks() whose rules were fed the
+	#header of body (the lines before the first EXTINF) and the lines from offset
+	#start on, each with its line number in body
+	engine = ValidationEngine(False)
+	first = body.find('#EXTINF')
+	if first < 0 or start <= first:
+		engine.run(body.splitlines())
+	else:
+		engine.run(body[:first].splitlines(), end=False)
+		engine.run(body[start:].splitlines(), firstLine=body.count('\n', 0, start))
+	playList = VariantPlaylist()
+	playList.suppliedURL = url
+	playList.streamed = True
+	playList.rules = engine.rules
+	runChecks(playList)
+	return playList
+
+class LiveMonitor(object):
+	def __init__(self, url):
+		self.url = url
+		self.loads = 0               #Successful reloads
+		self.failures = 0            #Reloads that could not be retrieved
+		self.targetDuration = None   #EXT-X-TARGETDURATION of the first reload
+		self.mediaSequence = None    #EXT-X-MEDIA-SEQUENCE of the last reload
+		self.discSequence = 0        #EXT-X-DISCONTINUITY-SEQUENCE of the last reload
+		self.lastSequence = None     #Media sequence number of the newest segment seen
+		self.lastURI = None          #URI line of the newest segment seen
+		self.window = collections.deque()   #(sequence, discontinuity) of the segments in the window
+		self.newSegments = 0         #Segments found by the last reload
+		self.ended = False           #True once EXT-X-ENDLIST is seen
+		self.changed = None          #Time of the last reload that found new segments
+		self.stale = False           #True while the playlist is not changing in time
+		self.nextLoad = 0.0          #time.monotonic() of the next reload
+
+	def lastSegment(self, body):
+		#Returns the offset of the newline before the URI line of the newest segment
+		#seen, or -1 if it is no longer in the body
+		needle = '\n' + self.lastURI
+		pos = body.rfind(needle)
+		while pos >= 0:
+			end = pos + len(needle)
+			if end == len(body) or body[end] in '\r\n':
+				return pos
+			pos = body.rfind(needle, 0, pos)
+		return -1
+
+	def header(self, body, findings):
+		#Reads the playlist tags before the first segment
+		first = body.find('#EXTINF')
+		mediaSequence, discSequence, target = 0, 0, None
+		for line in (body if first < 0 else body[:first]).splitlines():
+			try:
+				if line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+					mediaSequence = int(tagValue(line))
+				elif line.startswith('#EXT-X-DISCONTINUITY-SEQUENCE:'):
+					discSequence = int(tagValue(line))
+				elif line.startswith('#EXT-X-TARGETDURATION:'):
+					target = int(tagValue(line))
+			except ValueError:
+				findings.append('Tag value is not a whole number: ' + line)
+		return mediaSequence, discSequence, target
+
+	def refresh(self, now, body=None):
+		#Reloads the playlist (unless its body is given), validates what changed and
+		#returns the findings
+		findings = []
+		try:
+			if body is None:
+				body = loadBody(self.url)
+		except FetchError as e:
+			return self.failed(now, e)
+		self.loads += 1
+		mediaSequence, discSequence, target = self.header(body, findings)
+		if target is None:
+			if self.loads > 1 and '#EXT-X-TARGETDURATION:' not in body:   #The first load reports it from the rules
+				findings.append('EXT-X-TARGETDURATION tag is REQUIRED')
+		elif self.targetDuration is None:
+			self.targetDuration = target
+		elif target != self.targetDuration:
+			findings.append('EXT-X-TARGETDURATION changed from %d to %d' % (self.targetDuration, target))
+		if self.mediaSequence is not None and mediaSequence < self.mediaSequence:
+			findings.append('EXT-X-MEDIA-SEQUENCE decreased from %d to %d' % (self.mediaSequence, mediaSequence))
+		start = 0                  #Offset of the first line not seen before
+		sequence = mediaSequence   #Media sequence number of the next segment parsed
+		if self.lastURI is not None:
+			pos = self.lastSegment(body)
+			if pos >= 0:
+				expected = mediaSequence + body.count('\n#EXTINF', 0, pos) - 1
+				if expected != self.lastSequence:
+					findings.append('Segment %s was sequence %d and is now %d (EXT-X-MEDIA-SEQUENCE %d)' %
+						(self.lastURI, self.lastSequence, expected, mediaSequence))
+				start = pos + 1 + len(self.lastURI)
+				sequence = self.lastSequence + 1
+			elif mediaSequence > self.lastSequence + 1:
+				findings.append('Segments %d to %d were removed before they were loaded' %
+					(self.lastSequence + 1, mediaSequence - 1))
+			elif mediaSequence <= self.lastSequence:
+				findings.append('Segment %d (%s) is gone but EXT-X-MEDIA-SEQUENCE is %d' %
+					(self.lastSequence, self.lastURI, mediaSequence))
+				self.window.clear()
+		removed = 0   #Discontinuities of the segments that left the window
+		while self.window and self.window[0][0] < mediaSequence:
+			removed += self.window.popleft()[1]
+		if self.mediaSequence is not None and discSequence != self.discSequence + removed:
+			findings.append('EXT-X-DISCONTINUITY-SEQUENCE is %d, expected %d (%d discontinuities left the window)' %
+				(discSequence, self.discSequence + removed, removed))
+		self.mediaSequence = mediaSequence
+		self.discSequence = discSequence
+		self.newSegments = 0
+		firstLine = body.count('\n', 0, start)   #Line number of body[start:]
+		self.ruleFindings(appendedPlaylist(self.url, body, start), 0 if start == 0 else firstLine + 1, findings)
+		discontinuity = False
+		for line in body[start:].splitlines():
+			if line.rstrip() == '#EXT-X-DISCONTINUITY':
+				discontinuity = True
+			elif line.startswith('#EXT-X-ENDLIST'):
+				self.ended = True
+			elif line.startswith('#') or not line.strip():
+				continue
+			else:
+				self.window.append((sequence, 1 if discontinuity else 0))
+				self.lastSequence = sequence
+				self.lastURI = line.rstrip('\r')
+				self.newSegments += 1
+				sequence += 1
+				discontinuity = False
+		reload = self.targetDuration or MONITOR_RELOAD
+		if self.newSegments > 0 or self.changed is None:
+			self.changed = now
+			self.stale = False
+			self.nextLoad = now + reload
+		else:
+			if not self.ended and not self.stale and now - self.changed > 1.5 * reload:
+				findings.append('Playlist has not changed for %.1f seconds (1.5 x target duration is %.1f)' %
+					(now - self.changed, 1.5 * reload))
+				self.stale = True
+			self.nextLoad = now + reload / 2.0
+		return findings
+
+	def ruleFindings(self, playList, oldLines, findings):
+		#Adds the findings of the variant rules: the failed checks of the first load,
+		#and the error and warning lines after the first oldLines lines of the body
+		if self.loads == 1:
+			for name in VARIANT_CHECKS:
+				value = getattr(playList, name, None)
+				if value is not None and failedValue(value):
+					findings.append(value)
+		for name in VARIANT_LINES:
+			lines = getattr(playList, name)
+			if isinstance(lines, Findings):   #Not the VersionRule line list
+				for index, (code, severity, first, last, count) in enumerate(lines.runs()):
+					if severity > SEVERITY_INFO and last > oldLines:
+						findings.append(lines.format(index))
+
+	def failed(self, now, error):
+		#Called when a reload could not be retrieved, returns the findings
+		self.failures += 1
+		self.nextLoad = now + (self.targetDuration or MONITOR_RELOAD) / 2.0
+		return ['Reload failed: ' + str(error)]
+
+	def done(self, refreshes):
+		#True once the playlist has ended or has been reloaded refreshes times
+		return self.ended or (refreshes > 0 and self.loads + self.failures > refreshes)
+
+	def record(self, findings):
+		#Returns the JSON record of the last reload
+		return {'type': 'refresh', 'url': self.url, 'load': self.loads, 'mediaSequence': self.mediaSequence,
+			'lastSequence': self.lastSequence, 'newSegments': self.newSegments, 'ended': self.ended,
+			'findings': findings}
+
+def variantLines(body, baseURL):
+	#Returns the distinct Variant URLs of a Master playlist body (the renditions of
+	#EXT-X-MEDIA too), resolved against the Master URL (none for a Media playlist)
+	uris = dict.fromkeys(variantURIs(body.splitlines()))
+	return list(dict.fromkeys(resolveURI(baseURL, uri) for uri in uris))
+
+def reportRefresh(monitor, findings, writer):
+	if writer is not None:
+		writer.write(monitor.record(findings))
+	else:
+		print('%s reload %d: %d new segments, EXT-X-MEDIA-SEQUENCE= %s' %
+			(monitor.url, monitor.loads, monitor.newSegments, monitor.mediaSequence))
+		for finding in findings:
+			print('\t', finding)
+
+class MonitorScheduler(object):
+	#Runs the LiveMonitors of one process on an asyncio event loop.  A heap keyed by
+	#nextLoad holds the monitors that are waiting, and the dispatcher starts a reload
+	#task for each one that is due.  A reload waits for the global and the per-host
+	#semaphore and fetches in a thread of a pool the size of the global limit (requests
+	#is blocking).  LiveMonitor.refresh() then feeds the new lines to the variant rules
+	#in a thread of the same pool, so the loop is never blocked by a traversal.  A
+	#monitor has one reload in progress at a time, so its state is not shared.
+	#A Media playlist URL is monitored itself; a Master is replaced by its Variants.
+	def __init__(self, urls, refreshes=0, writer=None, concurrency=MONITOR_CONCURRENCY, perHost=MONITOR_PER_HOST):
+		self.refreshes = refreshes
+		self.writer = writer
+		self.concurrency = concurrency
+		self.perHost = perHost
+		self.heap = []          #(nextLoad, serial, monitor, master) of the waiting monitors
+		self.serial = 0         #Keeps the heap order stable and monitors uncompared
+		for url in urls:
+			self.schedule(LiveMonitor(url), True)
+		self.active = set()     #Reload tasks in progress (keeps them referenced)
+		self.running = 0        #Reloads not finished yet
+		self.hostLimits = {}    #Host -> asyncio.Semaphore(perHost)
+		self.playlists = 0      #Media playlists monitored
+		self.reloads = 0
+		self.totalJitter = 0.0  #Seconds the reloads started after their nextLoad
+		self.maxJitter = 0.0
+
+	def schedule(self, monitor, master=False):
+		#master=True while a URL may still turn out to be a Master playlist
+		heapq.heappush(self.heap, (monitor.nextLoad, self.serial, monitor, master))
+		self.serial += 1
+
+	async def run(self):
+		self.limit = asyncio.Semaphore(self.concurrency)
+		self.wake = asyncio.Event()
+		loop = asyncio.get_running_loop()
+		with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+			while self.heap or self.running:
+				now = time.monotonic()
+				while self.heap and self.heap[0][0] <= now:
+					nextLoad, serial, monitor, master = heapq.heappop(self.heap)
+					self.running += 1
+					task = loop.create_task(self.reload(loop, executor, monitor, master))
+					self.active.add(task)
+					task.add_done_callback(self.active.discard)
+				delay = self.heap[0][0] - now if self.heap else None
+				self.wake.clear()
+				try:
+					await asyncio.wait_for(self.wake.wait(), delay)
+				except asyncio.TimeoutError:
+					pass
+
+	async def reload(self, loop, executor, monitor, master):
+		try:
+			host = urllib.parse.urlsplit(monitor.url).netloc
+			if host not in self.hostLimits:
+				self.hostLimits[host] = asyncio.Semaphore(self.perHost)
+			async with self.limit:
+				async with self.hostLimits[host]:
+					start = time.monotonic()
+					try:
+						body = await loop.run_in_executor(executor, loadBody, monitor.url)
+					except FetchError as e:
+						body = e
+			if master and not isinstance(body, FetchError):
+				variantURLs = variantLines(body, monitor.url)
+				if variantURLs:
+					logging.info("++---------->> Monitoring %s Variants of %s", len(variantURLs), monitor.url)
+					for variantURL in variantURLs:
+						self.schedule(LiveMonitor(variantURL))
+					return
+			if monitor.loads + monitor.failures == 0:
+				self.playlists += 1
+			else:
+				jitter = max(0.0, start - monitor.nextLoad)
+				self.totalJitter += jitter
+				self.maxJitter = max(self.maxJitter, jitter)
+			self.reloads += 1
+			now = time.monotonic()
+			if isinstance(body, FetchError):
+				findings = monitor.failed(now, body)
+			else:
+				findings = await loop.run_in_executor(executor, monitor.refresh, now, body)
+			reportRefresh(monitor, findings, self.writer)
+			if monitor.done(self.refreshes):
+				logging.info("++---------->> Stopped monitoring: %s", monitor.url)
+			else:
+				self.schedule(monitor, master and monitor.loads == 0)
+		except Exception as e:
+			#An unexpected error is counted as a failed reload, and the playlist is
+			#reloaded again rather than dropped
+			logging.error("++---------->> Reload of %s failed: %s: %s", monitor.url, type(e).__name__, e)
+			monitor.failed(time.monotonic(), e)
+			if monitor.done(self.refreshes):
+				logging.info("++---------->> Stopped monitoring: %s", monitor.url)
+			else:
+				self.schedule(monitor, master and monitor.loads == 0)
+		finally:
+			self.running -= 1
+			self.wake.set()
+
+def monitorPlaylists(url, refreshes=0, writer=None, concurrency=MONITOR_CONCURRENCY, perHost=MONITOR_PER_HOST):
+	#Monitors the live playlists of url (a playlist, or a file listing one playlist URL
+	#per line) until every playlist has ended (EXT-X-ENDLIST), has been reloaded
+	#refreshes times, or Ctrl-C
+	global asyncio
+	logging.info("++------------------------->> Entering monitorPlaylists")
+	if asyncio is None:
+		import asyncio
+	urls = [url]
+	if not url.startswith('http://') and not url.startswith('https://') and not url.endswith(('.m3u8', '.m3u')):
+		try:
+			urls = [line.strip() for line in loadBody(url).splitlines() if line.strip()]
+		except FetchError as e:
+			print("Error: ", e)
+			logging.error("++---------->> monitorPlaylists Error: %s", e)
+			return
+	loop = asyncio.new_event_loop()
+	asyncio.set_event_loop(loop)
+	scheduler = MonitorScheduler(urls, refreshes, writer, concurrency, perHost)
+	try:
+		loop.run_until_complete(scheduler.run())
+	except KeyboardInterrupt:
+		logging.info("++---------->> Monitoring interrupted")
+	finally:
+		loop.close()
+	if scheduler.reloads > 0:
+		again = max(1, scheduler.reloads - scheduler.playlists)   #Reloads after the first load
+		print('Monitored %d playlists: %d reloads, reload jitter mean= %.1f ms max= %.1f ms' %
+			(scheduler.playlists, scheduler.reloads, 1000.0 * scheduler.totalJitter / again,
+			1000.0 * scheduler.maxJitter))
+	logging.info("<<-------------------------++ Leaving monitorPlaylists")
+#
+# End of Live Monitor Functions
+####################################
+
+####################################
+#
+# This function returns the kind of a batch failure: 'timeout', 'fetch' (the
+# playlist could not be retrieved), or 'parse' (it could not be validated).
+def failureKind(error):
+	fetch = isinstance(error, FetchError)
+	if fetch and error.args:
+		error = error.args[0]   #The requests or OS error fetchURL() wrapped
+	if requests is not None and isinstance(error, requests.exceptions.Timeout):
+		return 'timeout'
+	if fetch or (requests is not None and isinstance(error, requests.exceptions.RequestException)):
+		return 'fetch'
+	return 'parse'
+#
+# End of failureKind
+####################################
+
+####################################
+#
+# This function validates one line of a batch file and writes its PDF report.
+# It is a module level function so --jobs can run it in a worker process, and
+# it returns the playlist file, the report name and an error for main() to print
+# in order.  With --format json|ndjson no PDF is made and the playlistRecord() is
+# returned in place of the report name.  A playlist that cannot be retrieved or
+# validated does not end the batch: the error is (kind, message) and Name is None.
+# The last result is the batchDigest() of the playlist for the journal; when it
+# equals knownContent (--verify-content) the playlist is not validated again and
+# Name and the error are both None.  With --report the PDF is the section file
+# named by reportDir and Name is (section file, checkTally()).
+def batchPlaylist(line, batchURL, validBatch, stream=False, workers=FETCH_WORKERS, outputFormat='report', knownContent=None, reportDir=None):
+	logging.info("++---------->> Entered batchPlaylist: %s", line)
+	Header = []
+	Header.clear()
+	#Create a Header in the output file
+	Header.append('<<##--------------------- Report ------------------------##>>')
+	secondLine = 'The valid m3u8 check for the URL was: ' + str(validBatch)
+	s2 = str(secondLine)
+	Header.append(s2)
+	nextLine = 'The given file was: ' + str(batchURL)
+	Header.append(nextLine)
+	Header.append(' ')
+	inputLine = line.strip()
+	try:
+		playListFile, valPlayL, wURL = fetchURL(inputLine, stream)
+	except FetchError as e:
+		logging.error("++---------->> batchPlaylist could not retrieve %s: %s", inputLine, e)
+		return inputLine, None, (failureKind(e), str(e)), None
+	### IN this case, the playListFile refers to the filehandle for the 
+	#current object.  It is a good Name candidate but must be extracted:
+	#(a web playlist is named after the last part of its URL path and a hash of the
+	#URL, since CDN playlists are nearly all index.m3u8 or playlist.m3u8)
+	if wURL:
+		fileName = inputLine
+	else:
+		fileName = str(playListFile)
+	try:
+		playlist = createPlaylist(playListFile, valPlayL, wURL, inputLine, stream, workers)
+		digest = batchDigest(playlist)
+		if knownContent is not None and digest == knownContent:
+			logging.info("<<----------++ Leaving batchPlaylist, unchanged: %s", inputLine)
+			return fileName, None, None, digest
+		
+		#Add formatting to the output file so we know about the file
+		Header.append('<<----------Playlist Report---------->>')
+		thirdLine = 'The playlist was a Master =' + str(playlist.master)
+		s3 = str(thirdLine)
+		Header.append(s3)
+		Header.append(' ')
+		fourthLine = 'The given URL was =' + str(playlist.suppliedURL)
+		s4 = str(fourthLine)
+		Header.append(s4)
+		Header.append(' ')
+		
+		#We have a playlist, so run our checks in order
+		runChecks(playlist)
+	except Exception as e:
+		logging.error("++---------->> batchPlaylist could not validate %s: %s: %s", inputLine, type(e).__name__, e)
+		return inputLine, None, (failureKind(e), '%s: %s' % (type(e).__name__, e)), None
+	finally:
+		if not wURL or stream:   #A web playlist read in full is already a bytes object
+			playListFile.close()
+	
+	if outputFormat == 'report':
+		if reportDir is not None:
+			Name = os.path.join(reportDir, BatchJournal.lineHash(inputLine) + '.pdf')
+		elif wURL:
+			Name = (os.path.basename(urllib.parse.urlsplit(inputLine).path).replace('.m3u8', '') + '_' +
+				BatchJournal.lineHash(inputLine)[:8] + '.pdf')
+		else:
+			nameList = fileName.split(' ')
+			Name1 = nameList[1].split("'")
+			Name = Name1[1].replace('.m3u8', '.pdf')
+		
+		###### Second batch file block has been upgraded for PDF output
+		try:
+			createPDF(Header, playlist, Name)
+		except Exception as e:
+			logging.error("++---------->> batchPlaylist could not write %s: %s: %s", Name, type(e).__name__, e)
+			return fileName, None, ('report', '%s: %s' % (type(e).__name__, e)), None
+		if reportDir is not None:
+			Name = (Name, checkTally(playlistRecord(playlist)))
+	else:
+		Name = playlistRecord(playlist)
+	
+	#Now clear out the current playlist
+	if playlist.master:
+		playlist = clearMaster(playlist)
+	else:
+		playlist = clearVariant(playlist)
+	logging.info("<<----------++ Leaving batchPlaylist: %s", inputLine)
+	return fileName, Name, None, digest
+#
+# End of batchPlaylist
+####################################
+
+####################################
+#
+# This function runs batchPlaylist() for a (line, knownContent) entry of
+# BatchJournal.entries(); it is what the --jobs worker processes are mapped over.
+def batchEntry(entry, **options):
+	line, knownContent = entry
+	return batchPlaylist(line, knownContent=knownContent, **options)
+#
+# End of batchEntry
+####################################
+
+####################################
+#
+# This function returns the content hash of a batch playlist for the journal: the
+# contentHash() of a Media playlist, or of a Master and each of its Variants.  It
+# is None if a part was streamed (its lines were not kept).
+def batchDigest(playList):
+	if not playList.master:
+		return contentHash(playList)
+	digest = hashlib.sha256(contentHash(playList).encode('ascii'))
+	for variant in playList.variantList:
+		variantHash = contentHash(variant)
+		if variantHash is None:
+			return None
+		digest.update(variantHash.encode('ascii'))
+	return digest.hexdigest()
+#
+# End of batchDigest
+####################################
+
+####################################
+#
+# BatchJournal is the checkpoint journal of a batch run (--journal FILE).  One JSON
+# line is appended (and flushed to disk) for every batch line once its playlist
+# was validated and reported, or failed:
+#   {"line": <SHA-1 of the batch line>, "url": ..., "status": "ok"|"failed",
+#    "content": <batchDigest() or null>, "kind": <failure kind or null>}
+# With --resume the lines whose last record is "ok" are skipped, or with
+# --verify-content fetched again and only validated if their content changed.
+class BatchJournal(object):
+	def __init__(self, fileName, resume=False, verifyContent=False):
+		self.verifyContent = verifyContent
+		self.completed = {}   #Line hash -> content hash (or None) of the finished lines
+		self.skipped = 0      #Lines skipped by entries()
+		self.unchanged = 0    #Lines fetched again that had not changed
+		if resume:
+			self.load(fileName)
+		self.output = open(fileName, 'a')
+
+	@staticmethod
+	def lineHash(line):
+		return hashlib.sha1(line.encode('utf-8')).hexdigest()
+
+	def load(self, fileName):
+		try:
+			journalFile = open(fileName)
+		except FileNotFoundError:
+			return
+		with journalFile:
+			for text in journalFile:
+				try:
+					entry = json.loads(text)
+				except ValueError:
+					continue   #The last line of a run that was stopped while writing
+				if entry.get('status') == 'ok':
+					self.completed[entry['line']] = entry.get('content')
+				else:
+					self.completed.pop(entry.get('line'), None)
+		logging.info("++---------->> Journal %s: %s lines done", fileName, len(self.completed))
+
+	def entries(self, lines):
+		#Yields the (line, knownContent) of the lines that still have to be run
+		for line in lines:
+			key = self.lineHash(line)
+			if key not in self.completed:
+				yield line, None
+			elif self.verifyContent and self.completed[key] is not None:
+				yield line, self.completed[key]
+			else:
+				logging.info("++---------->> Journal: skipping %s", line)
+				self.skipped += 1
+
+	def record(self, line, status, content=None, kind=None):
+		entry = {'line': self.lineHash(line), 'url': line, 'status': status, 'content': content, 'kind': kind}
+		self.output.write(json.dumps(entry) + '\n')
+		self.output.flush()
+		os.fsync(self.output.fileno())
+
+	def close(self):
+		self.output.close()
+#
+# End of BatchJournal
+####################################
+
+####################################
+#
+# This function prints the summary at the end of a batch file, with every
+# playlist that could not be retrieved or validated.
+def batchSummary(count, failures, journal=None):
+	unchanged = journal.unchanged if journal is not None else 0
+	print('')
+	print('<<------------------Batch Summary---------------------->>')
+	print('Playlists= %d Validated= %d Failed= %d' % (count, count - len(failures) - unchanged, len(failures)))
+	if journal is not None and (journal.skipped or journal.unchanged):
+		print('Resumed from the journal: Skipped= %d Unchanged= %d' % (journal.skipped, journal.unchanged))
+	for fileName, (kind, message) in failures:
+		print('\t', 'FAILED (' + kind + '):', fileName, '->', message)
+	print('')
+	logging.info("++---------->> Batch summary: %s playlists, %s failed", count, len(failures))
+#
+# End of batchSummary
+####################################
+
+####################################
+#
+# This function returns True if a batch file line is in shard K of N (--shard K/N).
+# The shard is picked by the SHA-1 of the URL, so every machine splits a batch file
+# the same way, whatever the order of its lines.
+def inShard(line, shard):
+	index, count = shard
+	return int(hashlib.sha1(line.strip().encode('utf-8')).hexdigest(), 16) % count == index - 1
+#
+# End of inShard
+####################################
+
+####################################
+#
+# Merge Functions
+#
+# The merge mode reads the json/ndjson result files of several runs (the shards of
+# a batch) and puts their records back together: ndjson Variant lines are put back
+# in their Master's record, a URL found in more than one file keeps its record from
+# the last file, and the records are sorted by URL so the result does not depend on
+# the order the shards finished in.  A truncated or corrupt result file does not
+# end the merge: its unreadable lines are listed in the report and the rest of its
+# records are merged.
+def readRecords(fileName, problems=None):
+	#Returns the playlist records of a json or ndjson result file, with the Variants
+	#of a Master in its 'variants' list as --format json writes them.  A line that is
+	#not a record is skipped and added to problems as (file, line number, reason).
+	#--format json also writes one record per line, so a truncated json file is read
+	#a line at a time like ndjson.
+	if problems is None:
+		problems = []
+	with open(fileName) as resultFile:
+		text = resultFile.read()
+	if text.lstrip().startswith('['):
+		try:
+			records = json.loads(text)
+		except ValueError as e:
+			logging.warning("++---------->> %s is not a complete json file: %s", fileName, e)
+		else:
+			if isinstance(records, list) and all(isinstance(record, dict) and 'url' in record for record in records):
+				return records
+	records = []
+	masters = {}   #Master URL -> its record, for the Variant lines that follow it
+	for num, line in enumerate(text.splitlines()):
+		line = line.strip()
+		if line.endswith(','):   #json separator
+			line = line[:-1]
+		if line in ('', '[', ']'):
+			continue
+		try:
+			record = json.loads(line)
+		except ValueError as e:
+			record = e
+		if not isinstance(record, dict) or 'url' not in record:
+			reason = 'not a record: %s' % record if isinstance(record, ValueError) else 'not a playlist record'
+			logging.warning("++---------->> %s line %s %s", fileName, num + 1, reason)
+			problems.append((fileName, num + 1, reason))
+			continue
+		if 'master' in record and record['master'] in masters:
+			record = dict(record)
+			master = masters[record.pop('master')]
+			for index in range(0, len(master['variants'])):
+				if master['variants'][index] == record['url']:   #Still the URL written by ndjson
+					master['variants'][index] = record
+					break
+			continue
+		if record.get('type') == 'master':
+			masters[record['url']] = record
+		records.append(record)
+	return records
+
+def mergeResults(fileNames, writer=None):
+	#Merges the result files and returns the problems (file, line number or None,
+	#reason) of the records that could not be read
+	records = {}
+	problems = []
+	for fileName in fileNames:
+		try:
+			fileRecords = readRecords(fileName, problems)
+		except (OSError, ValueError) as e:
+			logging.warning("++---------->> Result file could not be read: %s %s", fileName, e)
+			problems.append((fileName, None, str(e)))
+			continue
+		for record in fileRecords:
+			records[record['url']] = record
+	merged = [records[url] for url in sorted(records)]
+	if writer is not None:
+		for record in merged:
+			writer.write(record)
+	mergeSummary(fileNames, merged, problems)
+	return problems
+
+def mergeSummary(fileNames, records, problems=()):
+	#Prints the aggregate report of the merged records
+	kinds = collections.Counter(record.get('type') for record in records)
+	failures = [record for record in records if record.get('type') == 'error']
+	failedChecks = collections.Counter()
+	for record in records:
+		for playList in [record] + [variant for variant in record.get('variants', []) if isinstance(variant, dict)]:
+			for name, value in playList.get('checks', {}).items():
+				if failedValue(value):
+					failedChecks[(name, value)] += 1
+	print('')
+	print('<<------------------Merged Report---------------------->>')
+	print('Result files= %d Playlists= %d (Master= %d Media= %d) Failed= %d' %
+		(len(fileNames), len(records), kinds['master'], kinds['media'], len(failures)))
+	print('')
+	print('-----<<FAILED CHECKS>>-----')
+	for (name, value), count in sorted(failedChecks.items(), key=lambda item: (-item[1], item[0])):
+		print('\t', '%6d  %s: %s' % (count, name, value))
+	print('')
+	if failures:
+		print('-----<<FAILED PLAYLISTS>>-----')
+		for record in failures:
+			print('\t', 'FAILED (' + str(record.get('kind')) + '):', record['url'], '->', record.get('error'))
+		print('')
+	if problems:
+		print('-----<<UNREADABLE RECORDS>>-----')
+		for fileName, num, reason in problems:
+			print('\t', fileName if num is None else '%s line %d' % (fileName, num), '->', reason)
+		print('')
+	logging.info("++---------->> Merged %s records from %s files", len(records), len(fileNames))
+#
+# End of Merge Functions
+####################################
+
+####################################
+#
+# Crawl Functions
+#
+# The crawl mode walks the resource graph of a playlist breadth first.  Every
+# resource is fetched once: its resolved URL goes into the visited set when it is
+# first referenced, and the resources of one depth are fetched on a pool of
+# --workers threads.  A playlist is validated on its own (a Master without its
+# Variants, which are crawled as playlists of the next depth), a JSON session data
+# file must parse, and a key or segment only has to be there: a web one is probed
+# with HEAD (see probeResource()).
+CRAWL_PLAYLIST_TAGS = ('EXT-X-MEDIA', 'EXT-X-I-FRAME-STREAM-INF')   #URI= is a playlist
+CRAWL_RESOURCE_TAGS = {'EXT-X-SESSION-DATA': 'json', 'EXT-X-KEY': 'key', 'EXT-X-SESSION-KEY': 'key', 'EXT-X-MAP': 'segment'}
+
+def resourceLinks(lines, baseURL):
+	#Returns the (kind, resolved URL) of every resource the playlist lines reference,
+	#in file order.  A URI line is a playlist after EXT-X-STREAM-INF, else a segment.
+	links = []
+	streamInf = False
+	for line in lines:
+		name, code = lineCode(line)
+		if code == TAG_URI:
+			links.append(('playlist' if streamInf else 'segment', resolveURI(baseURL, line.strip())))
+			streamInf = False
+		elif name is not None:
+			streamInf = name == 'EXT-X-STREAM-INF'
+			if name in CRAWL_PLAYLIST_TAGS or name in CRAWL_RESOURCE_TAGS:
+				uri = attributeList(line.strip()).get('URI')
+				if uri:
+					kind = 'playlist' if name in CRAWL_PLAYLIST_TAGS else CRAWL_RESOURCE_TAGS[name]
+					links.append((kind, resolveURI(baseURL, uri)))
+	return links
+
+def readResource(url):
+	#Returns the text of a fetched playlist or JSON file
+	rsrc, valid, web = fetchURL(url)
+	if web:
+		return rsrc.decode('utf-8', 'ignore')
+	try:
+		return rsrc.read()
+	finally:
+		rsrc.close()
+
+def probeResource(url):
+	#Raises FetchError if a key or segment cannot be retrieved.  A web one is asked for
+	#with HEAD, or a GET of its first byte where HEAD is not allowed.  Neither is
+	#streamed, so the (empty or one byte) body is read and the connection goes back
+	#to the keep-alive pool of the shared session.
+	if url.startswith("http://") or url.startswith("https://"):
+		session = getSession()
+		try:
+			response = session.head(url, timeout=HTTP_TIMEOUT, allow_redirects=True)
+			if response.status_code in (405, 501):   #Method Not Allowed / Not Implemented
+				response = session.get(url, timeout=HTTP_TIMEOUT, headers={'Range': 'bytes=0-0'})
+			response.raise_for_status()
+		except requests.exceptions.RequestException as e:
+			raise FetchError(e)
+	elif not os.path.isfile(url):
+		raise FetchError('No such file: ' + url)
+
+def crawlResource(kind, url):
+	#Fetches one resource of a crawl.  Returns the playlistRecord() of a playlist (or
+	#None) and the links it references.
+	if kind == 'json':
+		json.loads(readResource(url))
+		return None, []
+	if kind != 'playlist':
+		probeResource(url)
+		return None, []
+	lines = readResource(url).splitlines()
+	if any('.m3u8' in line for line in lines):   #The same test as createPlaylist()
+		playList = createMaster(lines, url, loadVariants=False)
+	else:
+		playList = createVariant(lines, url)
+	runChecks(playList)
+	return playlistRecord(playList), resourceLinks(lines, url)
+
+def crawlPlaylists(url, writer=None, workers=FETCH_WORKERS):
+	visited = {url}
+	level = [('playlist', url, None)]   #(kind, URL, referring playlist) of one depth
+	depth = 0
+	counts = collections.Counter()
+	failures = []
+	with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+		while level:
+			logging.info("++---------->> Crawl depth %s: %s resources", depth, len(level))
+			futures = [pool.submit(crawlResource, kind, resource) for kind, resource, referrer in level]
+			nextLevel = []
+			for (kind, resource, referrer), future in zip(level, futures):
+				counts[kind] += 1
+				try:
+					record, links = future.result()
+					error = None
+				except FetchError as e:
+					error = (failureKind(e), str(e))
+				except Exception as e:   #A playlist or JSON file that could not be read
+					error = (failureKind(e), '%s: %s' % (type(e).__name__, e))
+				if error is not None:
+					failures.append((kind, resource, referrer, error))
+					print('FAILED (' + error[0] + '):', kind, resource, '->', error[1])
+					if writer is not None:
+						writer.write({'type': 'error', 'url': resource, 'kind': error[0], 'error': error[1], 'resource': kind, 'referrer': referrer})
+					continue
+				if record is not None:
+					failed = sum(1 for value in record['checks'].values() if failedValue(value))
+					print('Depth', depth, record['type'], resource, ' Failed checks=', failed)
+					if writer is not None:
+						writer.write(record)
+				for linkKind, link in links:
+					if link not in visited:
+						visited.add(link)
+						nextLevel.append((linkKind, link, resource))
+			level = nextLevel
+			depth += 1
+	crawlSummary(counts, failures, depth)
+
+def crawlSummary(counts, failures, depth):
+	print('')
+	print('<<------------------Crawl Summary---------------------->>')
+	print('Resources= %d Depth= %d Failed= %d' % (sum(counts.values()), depth, len(failures)))
+	print('\t', '  '.join('%s= %d' % (kind, counts[kind]) for kind in sorted(counts)))
+	for kind, resource, referrer, (errorKind, message) in failures:
+		print('\t', 'FAILED (' + errorKind + '):', kind, resource, '(from ' + str(referrer) + ') ->', message)
+	print('')
+	logging.info("++---------->> Crawl summary: %s resources, %s failed", sum(counts.values()), len(failures))
+#
+# End of Crawl Functions
+####################################
+
 ####################################
 #
 # This is the main program function
 def main(argv):
 	outputFile = 'output.pdf'  #Used for batch mode output to local disk
+	stream = False  #--stream validates Media playlists while they are read
+	workers = FETCH_WORKERS  #--workers N sets how many Variants are retrieved at once
+	poolSize = None  #--pool-size N sets the connections kept per host (default: workers)
+	timeout = None   #--timeout S or C,R sets the HTTP connect and read timeouts
+	refreshes = 0    #--refreshes N stops monitor mode after N reloads of each playlist
+	concurrency = MONITOR_CONCURRENCY  #--concurrency N reloads at once in monitor mode
+	perHost = MONITOR_PER_HOST         #--per-host N reloads at once to one host
+	journalName = None     #--journal FILE checkpoints batch mode
+	resume = False         #--resume skips the lines the journal says are done
+	verifyContent = False  #--verify-content checks their content hash first
+	shard = None           #--shard K/N as (K, N)
+	reportName = None      #--report FILE writes one PDF for a batch file
+	detailLines = None     #--detail-lines N error lines listed per check in a PDF
+	report = None
+	journal = None
+	jobs = 1         #--jobs N validates the lines of a batch file in N processes
+	outputFormat = 'report'  #--format json|ndjson writes records instead of the PDF/screen report
+	outputName = '-'         #--output FILE for the records, '-' is stdout
+	logLevel = 'warning'     #--log-level off|error|warning|info|debug
+	logFile = 'Hlsv3.log'    #--log-file FILE, '-' is stderr
+	cacheDir = None          #--cache DIR keeps web playlists for conditional GETs
+	resultSize = RESULT_CACHE_SIZE  #--result-cache N playlist results kept in memory
+	resultDB = None          #--result-db FILE keeps the results in SQLite
+	writer = None
 	
-	## First check to see if there are enough inputs, if not provide syntax
-	if len(sys.argv) < 3:
-		print ("python3.6 HLSv1.py <format: batch> <batch-file-name>")
-		print ("python3.6 HLSv1.py <format: command> <valid-URL>")
+	## First check the options and see if there are enough inputs, if not provide syntax
+	try:
+		opts, args = getopt.gnu_getopt(argv, '', ['stream', 'workers=', 'pool-size=', 'timeout=', 'jobs=', 'format=', 'output=', 'log-level=', 'log-file=', 'cache=', 'result-cache=', 'result-db=', 'refreshes=', 'concurrency=', 'per-host=', 'journal=', 'resume', 'verify-content', 'shard=', 'report=', 'detail-lines='])
+	except getopt.GetoptError as e:
+		print("Error: ", e)
+		opts, args = [], []
+	for opt, value in opts:
+		if opt == '--stream':
+			stream = True
+		elif opt == '--workers':
+			if not value.isdigit() or int(value) < 1:
+				print("Error: --workers must be a whole number of at least 1")
+				sys.exit(-1)
+			workers = int(value)
+		elif opt == '--pool-size':
+			if not value.isdigit() or int(value) < 1:
+				print("Error: --pool-size must be a whole number of at least 1")
+				sys.exit(-1)
+			poolSize = int(value)
+		elif opt == '--timeout':
+			try:
+				seconds = [float(part) for part in value.split(',')]
+			except ValueError:
+				seconds = []
+			if len(seconds) not in (1, 2) or min(seconds) <= 0:
+				print("Error: --timeout must be SECONDS or CONNECT,READ seconds")
+				sys.exit(-1)
+			timeout = (seconds[0], seconds[-1])
+		elif opt == '--jobs':
+			if not value.isdigit() or int(value) < 1:
+				print("Error: --jobs must be a whole number of at least 1")
+				sys.exit(-1)
+			jobs = int(value)
+		elif opt == '--format':
+			if value not in ('report', 'json', 'ndjson'):
+				print("Error: --format must be report, json or ndjson")
+				sys.exit(-1)
+			outputFormat = value
+		elif opt == '--output':
+			outputName = value
+		elif opt == '--log-level':
+			if value.lower() not in LOG_LEVELS:
+				print("Error: --log-level must be one of", ', '.join(LOG_LEVELS))
+				sys.exit(-1)
+			logLevel = value.lower()
+		elif opt == '--log-file':
+			logFile = value
+		elif opt == '--cache':
+			cacheDir = value
+		elif opt == '--result-cache':
+			if not value.isdigit():
+				print("Error: --result-cache must be a whole number")
+				sys.exit(-1)
+			resultSize = int(value)
+		elif opt == '--result-db':
+			resultDB = value
+		elif opt == '--refreshes':
+			if not value.isdigit():
+				print("Error: --refreshes must be a whole number")
+				sys.exit(-1)
+			refreshes = int(value)
+		elif opt == '--concurrency':
+			if not value.isdigit() or int(value) < 1:
+				print("Error: --concurrency must be a whole number of at least 1")
+				sys.exit(-1)
+			concurrency = int(value)
+		elif opt == '--per-host':
+			if not value.isdigit() or int(value) < 1:
+				print("Error: --per-host must be a whole number of at least 1")
+				sys.exit(-1)
+			perHost = int(value)
+		elif opt == '--journal':
+			journalName = value
+		elif opt == '--resume':
+			resume = True
+		elif opt == '--verify-content':
+			verifyContent = True
+		elif opt == '--shard':
+			index, slash, count = value.partition('/')
+			if not index.isdigit() or not count.isdigit() or not 1 <= int(index) <= int(count):
+				print("Error: --shard must be K/N with K from 1 to N")
+				sys.exit(-1)
+			shard = (int(index), int(count))
+		elif opt == '--report':
+			reportName = value
+		elif opt == '--detail-lines':
+			if not value.isdigit():
+				print("Error: --detail-lines must be a whole number")
+				sys.exit(-1)
+			detailLines = int(value)
+	if (resume or verifyContent) and journalName is None:
+		print("Error: --resume and --verify-content need --journal FILE")
+		sys.exit(-1)
+	if reportName is not None and outputFormat != 'report':
+		print("Error: --report writes a PDF, it cannot be used with --format json|ndjson")
+		sys.exit(-1)
+	setupLogging(logLevel, logFile)
+	if poolSize is None:
+		poolSize = max(workers, perHost, HTTP_POOL_SIZE)   #Every worker can keep its connection
+	configureSession(poolSize, timeout)
+	configurePDF(detailLines)
+	try:
+		openCache(cacheDir)
+	except OSError as e:
+		print("Error: --cache", e)
 		sys.exit(-1)
+	try:
+		openResultCache(resultSize, resultDB)
+	except Exception as e:   #sqlite3.Error, sqlite3 is only imported for --result-db
+		print("Error: --result-db", e)
+		sys.exit(-1)
+	if len(args) < 2:
+		print ("python3.6 HLSv3.py [options] <format: batch> <batch-file-name>")
+		print ("python3.6 HLSv3.py [options] <format: command> <valid-URL>")
+		print ("python3.6 HLSv3.py [options] <format: monitor> <live-playlist-URL>")
+		print ("python3.6 HLSv3.py [options] <format: merge> <result-file> [<result-file> ...]")
+		print ("python3.6 HLSv3.py [options] <format: crawl> <playlist-URL>")
+		print ("options: --stream --workers N --pool-size N --timeout SECONDS|CONNECT,READ --jobs N")
+		print ("         --format report|json|ndjson --output FILE")
+		print ("         --log-level off|error|warning|info|debug --log-file FILE --cache DIR")
+		print ("         --result-cache N --result-db FILE --refreshes N --concurrency N --per-host N")
+		print ("         --journal FILE --resume --verify-content --shard K/N --report FILE")
+		print ("         --detail-lines N")
+		sys.exit(-1)
+	mode = args[0]
+	target = args[1]
+	savedStdout = sys.stdout
+	if outputFormat != 'report':
+		if outputName == '-':
+			#The records own stdout, so the progress messages are sent to stderr
+			writer = RecordWriter(outputFormat, sys.stdout)
+			sys.stdout = sys.stderr
+		else:
+			#A resumed ndjson run adds its records to those of the run it continues
+			writer = RecordWriter(outputFormat, open(outputName, 'a' if resume and outputFormat == 'ndjson' else 'w'), True)
 
 	print('')
 	print('')
 	print('<<------------------Program Execution---------------------->>')
 	print("++-------->> File Program:", sys.argv[0])
-	print("++-------->> File FORMAT:", sys.argv[1])
-	print("++-------->> File File/URL:", sys.argv[2])
+	print("++-------->> File FORMAT:", mode)
+	print("++-------->> File File/URL:", target)
 	print('')
 	print('')
 	logging.info("++-------->> File Program: %s", sys.argv[0])
-	logging.info("++-------->> File FORMAT: %s", sys.argv[1])
-	logging.info("++-------->> File File/URL: %s", sys.argv[2])
+	logging.info("++-------->> File FORMAT: %s", mode)
+	logging.info("++-------->> File File/URL: %s", target)
+	logging.info("++-------->> Streaming: %s", stream)
+	logging.info("++-------->> Variant workers: %s", workers)
+	logging.info("++-------->> HTTP pool size: %s timeout: %s", HTTP_POOL_SIZE, HTTP_TIMEOUT)
+	logging.info("++-------->> Batch jobs: %s", jobs)
+	logging.info("++-------->> Output format: %s to %s", outputFormat, outputName)
+	logging.info("++-------->> Response cache: %s", cacheDir)
+	logging.info("++-------->> Result cache: %s in memory, database %s", resultSize, resultDB)
 	
 	## Batch mode execution block
-	if (sys.argv[1] == "batch"):
+	if (mode == "batch"):
 		logging.info("++---------->> Entered Batch mode:")
 		validPlayL = False
 		webURL = False
 		#so, I need to try and open the file given which contains playlists
-		url = sys.argv[2]
-		batchFile, validPlayL, webURL = openURL(url)
+		url = target
+		batchFile, validPlayL, webURL = openURL(url, stream)
 		
 		#If the user gave us a playlist then we only do this once
 		if validPlayL:
 			logging.info("++--------------->> Batch mode with a valid playlist file:")
-			playlist = createPlaylist(batchFile, validPlayL, webURL, url)
+			playlist = createPlaylist(batchFile, validPlayL, webURL, url, stream, workers)
 			
 			#We have a playlist, so run our checks in order
-			hCheck = HeaderCheck()
-			playlist.accept(hCheck)
-			
-			vCheck = VersionCheck()
-			playlist.accept(vCheck)
-			
-			vCompCheck = VerCompatCheck()
-			playlist.accept(vCompCheck)
-			
-			mixCheck = MixTagsCheck()
-			playlist.accept(mixCheck)
-			
-			streamInf = StreamInfCheck()
-			playlist.accept(streamInf)
-			
-			iFrame = IFrameCheck()
-			playlist.accept(iFrame)
-			
-			sessDataCheck = SessionDataCheck()
-			playlist.accept(sessDataCheck)
-			
-			mediaMasterCheck = MediaMasterCheck()
-			playlist.accept(mediaMasterCheck)
-			
-			targetDurCheck = TargetDurationCheck()
-			playlist.accept(targetDurCheck)
-			
-			medSeqCheck = MediaSequenceCheck()
-			playlist.accept(medSeqCheck)
-			
-			discontinuitySequenceCheck = DiscontinuitySequenceCheck()
-			playlist.accept(discontinuitySequenceCheck)
-			
-			iFrameOnlyCheck = IFramesOnlyCheck()
-			playlist.accept(iFrameOnlyCheck)
+			runChecks(playlist)
 			
 			######### This block has been upgraded for HLSv3.py
 			#Create a Header to send to createPDF():
@@ -2706,108 +5337,93 @@ def main(argv):
 			
 			## In this case, this was a valid playlist file, so convert that to 
 			## the Name for the output report:
-			nameList = str(playlist.suppliedURL).split('.')
-			Name = nameList[0] + '.pdf'
-			logging.info('++--------------->> Name passed to createPDF = %s', Name)
-			createPDF(Header, playlist, Name)
+			if writer is not None:
+				writer.write(playlistRecord(playlist))
+			else:
+				nameList = str(playlist.suppliedURL).split('.')
+				Name = nameList[0] + '.pdf'
+				logging.info('++--------------->> Name passed to createPDF = %s', Name)
+				createPDF(Header, playlist, Name)
 			
 			########### End of upgrade block for HLSv3.py
 		#Case where the user supplied a text file of playlist files
 		else:
 			logging.info("++--------------->> Batch mode with a text file:")
 			###### Block has been upgraded for HLSv3.py to PDF output:
-			#Now process each line in the batch file containing playlist file URLs
-			for line in batchFile:
-				Header = []
-				Header.clear()
-				#Create a Header in the output file
-				Header.append('<<##--------------------- Report ------------------------##>>')
-				secondLine = 'The valid m3u8 check for the URL was: ' + str(validPlayL)
-				s2 = str(secondLine)
-				Header.append(s2)
-				nextLine = 'The given file was: ' + str(url)
-				Header.append(nextLine)
-				Header.append(' ')
-				inputLine = line.strip('\n')
-				playListFile, valPlayL, wURL = openURL(inputLine)
-				playlist = createPlaylist(playListFile, valPlayL, wURL, inputLine)
-				
-				#Add formatting to the output file so we know about the file
-				Header.append('<<----------Playlist Report---------->>')
-				thirdLine = 'The playlist was a Master =' + str(playlist.master)
-				s3 = str(thirdLine)
-				Header.append(s3)
-				Header.append(' ')
-				fourthLine = 'The given URL was =' + str(playlist.suppliedURL)
-				s4 = str(fourthLine)
-				Header.append(s4)
-				Header.append(' ')
-				
-				#We have a playlist, so run our checks in order
-				hCheck = HeaderCheck()
-				playlist.accept(hCheck)
-				
-				vCheck = VersionCheck()
-				playlist.accept(vCheck)
-				
-				vCompCheck = VerCompatCheck()
-				playlist.accept(vCompCheck)
-				
-				mixCheck = MixTagsCheck()
-				playlist.accept(mixCheck)
-				
-				streamInf = StreamInfCheck()
-				playlist.accept(streamInf)
-				
-				iFrame = IFrameCheck()
-				playlist.accept(iFrame)
-				
-				sessDataCheck = SessionDataCheck()
-				playlist.accept(sessDataCheck)
-				
-				mediaMasterCheck = MediaMasterCheck()
-				playlist.accept(mediaMasterCheck)
-				
-				targetDurCheck = TargetDurationCheck()
-				playlist.accept(targetDurCheck)
-				
-				medSeqCheck = MediaSequenceCheck()
-				playlist.accept(medSeqCheck)
-				
-				discontinuitySequenceCheck = DiscontinuitySequenceCheck()
-				playlist.accept(discontinuitySequenceCheck)
-				
-				iFrameOnlyCheck = IFramesOnlyCheck()
-				playlist.accept(iFrameOnlyCheck)
-				
-				### IN this case, the playListFile refers to the filehandle for the 
-				#current object.  It is a good Name candidate but must be extracted:
-				print('playListFile = ', playListFile)
-				nameList = str(playListFile).split(' ')
-				Name1 = nameList[1].split("'")
-				Name = Name1[1].replace('.m3u8', '.pdf')
-				print('The name of the output file is: ', Name)
-				
-				###### Second batch file block has been upgraded for PDF output
-				createPDF(Header, playlist, Name)
-				
-				
-				#Now close the playlist file handle
-				playListFile.close()
-				
-				#Now clear out the current playlist
-				if playlist.master:
-					playlist = clearMaster(playlist)
+			if stream:
+				batchFile = iterLines(batchFile, webURL)
+			#Now process each line in the batch file containing playlist file URLs.
+			#With --jobs N the lines are spread over N processes, and the results
+			#come back in the order of the batch file.
+			if reportName is not None:
+				report = AggregateReport(reportName)
+			runLine = functools.partial(batchEntry, batchURL=url, validBatch=validPlayL, stream=stream, workers=workers,
+				outputFormat=outputFormat, reportDir=report.workDir if report is not None else None)
+			inputLines = (line.strip() for line in batchFile if line.strip())
+			if shard is not None:
+				logging.info("++--------------->> Batch shard %s of %s", shard[0], shard[1])
+				inputLines = (line for line in inputLines if inShard(line, shard))
+			if journalName is not None:
+				journal = BatchJournal(journalName, resume, verifyContent)
+				entries = journal.entries(inputLines)
+			else:
+				entries = ((line, None) for line in inputLines)
+			if jobs > 1:
+				entries = list(entries)
+				logging.info("++--------------->> Batch of %s playlists on %s processes", len(entries), jobs)
+				workerQueue, workerListener = listenToWorkers()
+				pool = concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=initWorker,
+					initargs=(HTTP_POOL_SIZE, HTTP_TIMEOUT, workerQueue, logLevel, cacheDir, resultSize, resultDB, PDF_DETAIL_LINES))
+				results = zip(entries, pool.map(runLine, entries, chunksize=max(1, len(entries) // (jobs * 4))))
+			else:
+				pool = None
+				results = ((entry, runLine(entry)) for entry in entries)
+			count = 0
+			failures = []   #(playlist, (kind, message)) of the lines that failed
+			for (line, knownContent), (fileName, Name, error, digest) in results:
+				count += 1
+				print('playListFile = ', fileName)
+				if error is not None:
+					failures.append((fileName, error))
+					print('FAILED (' + error[0] + '): ', error[1])
+					if writer is not None:
+						writer.write({'type': 'error', 'url': fileName, 'kind': error[0], 'error': error[1]})
+					if report is not None:
+						report.failed(line, error[0], error[1])
+				elif Name is None:
+					journal.unchanged += 1
+					print('Unchanged since the journal, not validated again')
+				elif writer is not None:
+					writer.write(Name)   #Name is the playlistRecord() for --format json|ndjson
+				elif report is not None:
+					report.add(line, *Name)   #Name is (section file, checkTally()) for --report
+					print('Added to the report: ', reportName)
 				else:
-					playlist = clearVariant(playlist)
+					print('The name of the output file is: ', Name)
+				#The checkpoint is written once the playlist has been reported
+				if journal is not None:
+					if error is not None:
+						journal.record(line, 'failed', kind=error[0])
+					else:
+						journal.record(line, 'ok', digest)
+			batchSummary(count, failures, journal)
+			if journal is not None:
+				journal.close()
+			if report is not None:
+				report.close(url)
+				print('The name of the output file is: ', reportName)
+			if pool is not None:
+				pool.shutdown()
+				if workerListener is not None:
+					workerListener.stop()
 			
 			batchFile.close()
 			    ###### End of second batch file block to upgrade HLSv3.py
 	
 	## Command line execution block
-	elif (sys.argv[1] == "command"):
+	elif (mode == "command"):
 		execute = True
-		url = sys.argv[2]
+		url = target
 		logging.info("++---------->> Entered Command Line mode:")
 		while execute:
 			#Here is where the command line interaction goes.
@@ -2816,7 +5432,7 @@ def main(argv):
 			#if this check fails the player has the right to reject the playlist.
 			#webCheck(boolean) tells wheter the URL begins with http/https
 			# 1) open the URL
-			resource, urlCheck, webCheck = openURL(url)
+			resource, urlCheck, webCheck = openURL(url, stream)
 			#print('<<##--------------------- Report ------------------------##>>')
 			print("The valid check for URL was: ", urlCheck)
 			
@@ -2825,7 +5441,7 @@ def main(argv):
 			# resource is populated.  If webCheck is False this
 			# is a file on the computer, and we need to read lines.
 			
-			playlist = createPlaylist(resource, urlCheck, webCheck, url)
+			playlist = createPlaylist(resource, urlCheck, webCheck, url, stream, workers)
 			
 			## The visitor needs to decide what to do with the playlist, and main just 
 			## needs to call the checks.  So, the check definition in Playlist() will
@@ -2833,43 +5449,12 @@ def main(argv):
 			
 			## Here is where the checks go in order:
 				
-			hCheck = HeaderCheck()
-			playlist.accept(hCheck)
-			
-			vCheck = VersionCheck()
-			playlist.accept(vCheck)
-			
-			vCompCheck = VerCompatCheck()
-			playlist.accept(vCompCheck)
-			
-			mixCheck = MixTagsCheck()
-			playlist.accept(mixCheck)
-			
-			streamInf = StreamInfCheck()
-			playlist.accept(streamInf)
-			
-			iFrame = IFrameCheck()
-			playlist.accept(iFrame)
+			runChecks(playlist)
 			
-			sessDataCheck = SessionDataCheck()
-			playlist.accept(sessDataCheck)
-			
-			mediaMasterCheck = MediaMasterCheck()
-			playlist.accept(mediaMasterCheck)
-			
-			targetDurCheck = TargetDurationCheck()
-			playlist.accept(targetDurCheck)
-			
-			medSeqCheck = MediaSequenceCheck()
-			playlist.accept(medSeqCheck)
-			
-			discontinuitySequenceCheck = DiscontinuitySequenceCheck()
-			playlist.accept(discontinuitySequenceCheck)
-			
-			iFrameOnlyCheck = IFramesOnlyCheck()
-			playlist.accept(iFrameOnlyCheck)
-			
-			screenPrint(playlist)
+			if writer is not None:
+				writer.write(playlistRecord(playlist))
+			else:
+				screenPrint(playlist)
 			
 			###### End of block to edit for command line pretty-print
 			
@@ -2890,10 +5475,41 @@ def main(argv):
 				playlist = clearVariant(playlist)
 		#End of the while execute: block, and end of command line block
 	
+	## Merge mode execution block
+	elif (mode == "merge"):
+		logging.info("++---------->> Entered Merge mode:")
+		try:
+			mergeResults(args[1:], writer)
+		except (OSError, ValueError) as e:
+			print("Error: ", e)
+			logging.error("++---------->> Merge Error: %s", e)
+			sys.exit(1)
+	
+	## Crawl mode execution block
+	elif (mode == "crawl"):
+		logging.info("++---------->> Entered Crawl mode:")
+		crawlPlaylists(target, writer, workers)
+	
+	## Monitor mode execution block
+	elif (mode == "monitor"):
+		logging.info("++---------->> Entered Monitor mode:")
+		monitorPlaylists(target, refreshes, writer, concurrency, perHost)
+	
 	## Case where the Format specified is wrong
 	else:
-		print("++-------->> File FORMAT:", sys.argv[1] + " should be either command or batch")
+		print("++-------->> File FORMAT:", mode + " should be command, batch, monitor, merge or crawl")
 		sys.exit(-1)
+	if writer is not None:
+		writer.close()
+		sys.stdout = savedStdout
+	if responseCache is not None:
+		logging.info("++-------->> Response cache: %s not modified, %s downloaded, %s bytes saved",
+			responseCache.notModified, responseCache.downloaded, responseCache.savedBytes)
+	if resultCache is not None:
+		logging.info("++-------->> Result cache: %s", ' '.join(resultCache.stats()))
+		resultCache.close()
+	closeSession()
+	stopLogging()
 #
 # End of the main program function
 ####################################
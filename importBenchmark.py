@@ -0,0 +1,100 @@
+####################################
+#
+# Import-time benchmark for the HLSv3.py validator
+#
+# Measures the cold start of a command mode validation of a local playlist
+# file (a new interpreter for every run, the way packaging hooks call it),
+# and lists which of the heavy packages were imported on the way.
+#
+# Running the Program:
+#   >python importBenchmark.py [runs]
+#
+# The report is printed and also written to bench_output.txt.
+#
+####################################
+
+import sys
+import os
+import subprocess
+import tempfile
+import time
+import statistics
+
+HEAVY = ['requests', 'reportlab', 'PyPDF2', 'numpy']   #Packages HLSv3.py only loads when needed
+SAMPLE = '''#EXTM3U
+#EXT-X-VERSION:3
+#EXT-X-TARGETDURATION:10
+#EXT-X-MEDIA-SEQUENCE:0
+#EXTINF:9.009,
+segment0.ts
+#EXTINF:9.009,
+segment1.ts
+#EXTINF:3.003,
+segment2.ts
+#EXT-X-ENDLIST
+'''
+
+####################################
+#
+# This function runs one command mode validation and returns the wall time
+def timeCommand(script, playlist, workDir):
+	start = time.perf_counter()
+	subprocess.run([sys.executable, script, 'command', playlist], input='end\n',
+		cwd=workDir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, universal_newlines=True, check=True)
+	return time.perf_counter() - start
+#
+# End of timeCommand
+####################################
+
+####################################
+#
+# This function runs the validation once under -X importtime and returns the
+# cumulative import time (in ms) of every top level module that was imported
+def importTimes(script, playlist, workDir):
+	result = subprocess.run([sys.executable, '-X', 'importtime', script, 'command', playlist], input='end\n',
+		cwd=workDir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+	times = {}
+	for line in result.stderr.splitlines():
+		if not line.startswith('import time:') or '|' not in line:
+			continue
+		fields = line[len('import time:'):].split('|')
+		name = fields[2][1:].rstrip()   #One space after the bar, more for nested imports
+		if fields[1].strip().isdigit() and not name.startswith(' '):
+			times[name.strip()] = int(fields[1]) / 1000.0
+	return times
+#
+# End of importTimes
+####################################
+
+def main(argv):
+	runs = int(argv[0]) if argv else 10
+	here = os.path.dirname(os.path.abspath(__file__))
+	script = os.path.join(here, 'HLSv3.py')
+	report = []
+	with tempfile.TemporaryDirectory() as workDir:
+		playlist = os.path.join(workDir, 'sample.m3u8')
+		with open(playlist, 'w') as sample:
+			sample.write(SAMPLE)
+		timeCommand(script, playlist, workDir)   #Warm the file system cache and __pycache__
+		times = [timeCommand(script, playlist, workDir) for run in range(runs)]
+		imports = importTimes(script, playlist, workDir)
+	report.append('HLSv3.py command <local file>, %d cold starts' % runs)
+	report.append('  min    %7.1f ms' % (min(times) * 1000))
+	report.append('  median %7.1f ms' % (statistics.median(times) * 1000))
+	report.append('  max    %7.1f ms' % (max(times) * 1000))
+	report.append('Heavy packages imported:')
+	for name in HEAVY:
+		if name in imports:
+			report.append('  %-10s %7.1f ms' % (name, imports[name]))
+		else:
+			report.append('  %-10s not imported' % name)
+	slowest = sorted(imports.items(), key=lambda item: item[1], reverse=True)[:5]
+	report.append('Slowest top level imports:')
+	for name, ms in slowest:
+		report.append('  %-20s %7.1f ms' % (name, ms))
+	print('\n'.join(report))
+	with open(os.path.join(here, 'bench_output.txt'), 'w') as output:
+		output.write('\n'.join(report) + '\n')
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
@@ -0,0 +1,11 @@
+####################################
+#
+# pytest setup for the HLSv3.py tests: HLSv3.py is a single module at the top of
+# the repository, so that directory is put on sys.path.
+#
+####################################
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
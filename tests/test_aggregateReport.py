@@ -0,0 +1,47 @@
+####################################
+#
+# Tests of the --report AggregateReport: failure text is escaped for reportlab's
+# markup, and the stitched sections are not lost when the summary cannot be built.
+#
+####################################
+
+import os
+
+import pytest
+
+import HLSv3
+
+def testPdfTextEscapesMarkup():
+	message = "HTTPSConnectionPool: <urllib3.connection.HTTPSConnection object at 0x7f> & retries"
+	assert HLSv3.pdfText(message) == "HTTPSConnectionPool: &lt;urllib3.connection.HTTPSConnection object at 0x7f&gt; &amp; retries"
+	assert HLSv3.pdfText(None) == 'None'
+
+def chunkedReport(tmp_path, monkeypatch):
+	#An AggregateReport with one chunk, and merge() recording what it is given
+	report = HLSv3.AggregateReport(str(tmp_path / 'report.pdf'))
+	chunkFile = os.path.join(report.workDir, 'chunk00000.pdf')
+	open(chunkFile, 'w').close()
+	report.chunks.append(chunkFile)
+	merged = []
+	monkeypatch.setattr(HLSv3, 'loadPyPDF2', lambda: None)
+	monkeypatch.setattr(HLSv3.AggregateReport, 'merge', staticmethod(lambda inputFiles, outputFile: merged.append(inputFiles)))
+	return report, chunkFile, merged
+
+def testChunksAreWrittenWhenTheSummaryFails(tmp_path, monkeypatch):
+	report, chunkFile, merged = chunkedReport(tmp_path, monkeypatch)
+	def summary(summaryFile, batchURL):
+		raise ValueError('paragraph text could not be parsed')
+	monkeypatch.setattr(report, 'summary', summary)
+	report.close('batch.txt')
+	assert merged == [[chunkFile]]
+	assert not os.path.exists(report.workDir)
+
+def testChunksAreKeptWhenTheReportCannotBeWritten(tmp_path, monkeypatch):
+	report, chunkFile, merged = chunkedReport(tmp_path, monkeypatch)
+	monkeypatch.setattr(report, 'summary', lambda summaryFile, batchURL: open(summaryFile, 'w').close())
+	def merge(inputFiles, outputFile):
+		raise OSError('disk full')
+	monkeypatch.setattr(HLSv3.AggregateReport, 'merge', staticmethod(merge))
+	with pytest.raises(OSError):
+		report.close('batch.txt')
+	assert os.path.exists(chunkFile)
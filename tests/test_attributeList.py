@@ -0,0 +1,43 @@
+####################################
+#
+# Tests of attributeList(), the RFC 8216 attribute-list parser the rules share.
+#
+####################################
+
+import HLSv3
+
+def testQuotedValuesMayHoldCommas():
+	attributes = HLSv3.attributeList('#EXT-X-STREAM-INF:BANDWIDTH=1280000,CODECS="avc1.4d401f,mp4a.40.2",RESOLUTION=640x360')
+	assert attributes == {'BANDWIDTH': '1280000', 'CODECS': 'avc1.4d401f,mp4a.40.2', 'RESOLUTION': '640x360'}
+
+def testQuotedValuesMayHoldNamesAndEquals():
+	attributes = HLSv3.attributeList('#EXT-X-KEY:METHOD=AES-128,URI="https://keys.example.com/k?IV=1,BANDWIDTH=2"')
+	assert attributes == {'METHOD': 'AES-128', 'URI': 'https://keys.example.com/k?IV=1,BANDWIDTH=2'}
+	assert 'IV' not in attributes
+
+def testAverageBandwidthIsNotBandwidth():
+	attributes = HLSv3.attributeList('#EXT-X-STREAM-INF:AVERAGE-BANDWIDTH=900000,CODECS="avc1.4d401f"')
+	assert 'BANDWIDTH' not in attributes
+	attributes = HLSv3.attributeList('#EXT-X-STREAM-INF:AVERAGE-BANDWIDTH=900000,BANDWIDTH=1280000')
+	assert (attributes['AVERAGE-BANDWIDTH'], attributes['BANDWIDTH']) == ('900000', '1280000')
+
+def testUnterminatedQuoteDoesNotTakeTheRestOfTheLine():
+	#The unterminated value is empty, and the attributes after it are still read
+	attributes = HLSv3.attributeList('#EXT-X-STREAM-INF:BANDWIDTH=1000,CODECS="avc1,RESOLUTION=640x360')
+	assert attributes == {'BANDWIDTH': '1000', 'CODECS': '', 'RESOLUTION': '640x360'}
+	assert HLSv3.attributeList('#EXT-X-MEDIA:NAME="English') == {'NAME': ''}
+
+def testTagWithoutAttributes():
+	assert HLSv3.attributeList('#EXT-X-INDEPENDENT-SEGMENTS') == {}
+	assert HLSv3.attributeList('#EXT-X-STREAM-INF:') == {}
+
+def testStreamInfRuleReadsTheParsedAttributes():
+	#Only the tag without a BANDWIDTH attribute is reported
+	rule = HLSv3.MasterStreamInfRule()
+	rule.feed(1, '#EXT-X-STREAM-INF:AVERAGE-BANDWIDTH=900000')
+	rule.feed(3, '#EXT-X-STREAM-INF:BANDWIDTH=1280000,CODECS="avc1.4d401f,mp4a.40.2",NAME="no BANDWIDTH"')
+	rule.feed(5, '#EXT-X-STREAM-INF:CODECS="BANDWIDTH=1"')
+	nextLine, bwAttr, lineNums = rule.result(None)
+	assert not bwAttr
+	assert list(lineNums) == ['EXT-X-STREAM-INF tag does NOT have BANDWIDTH attribute line= 2',
+		'EXT-X-STREAM-INF tag does NOT have BANDWIDTH attribute line= 6']
@@ -0,0 +1,87 @@
+####################################
+#
+# Tests of the batch checkpoint journal (--journal FILE, --resume and
+# --verify-content).
+#
+####################################
+
+import json
+
+import HLSv3
+
+MEDIA = '#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:10\n#EXTINF:9.009,\ns0.ts\n#EXT-X-ENDLIST\n'
+
+def writeBatch(tmp_path, names):
+	#Writes a media playlist for each name and a batch file listing them
+	lines = []
+	for name in names:
+		playlist = tmp_path / (name + '.m3u8')
+		playlist.write_text(MEDIA)
+		lines.append(str(playlist))
+	batch = tmp_path / 'batch.txt'
+	batch.write_text('\n'.join(lines) + '\n')
+	return str(batch), lines
+
+def runBatch(tmp_path, batch, name, *options):
+	#Runs a batch file with ndjson output and returns the records written
+	output = tmp_path / name
+	HLSv3.main(['--log-level', 'off', '--format', 'ndjson', '--output', str(output)] + list(options) + ['batch', batch])
+	return [json.loads(line) for line in output.read_text().splitlines()]
+
+def testResumeSkipsFinishedLines(tmp_path):
+	journalName = str(tmp_path / 'journal')
+	journal = HLSv3.BatchJournal(journalName)
+	journal.record('a.m3u8', 'ok', 'digest-a')
+	journal.record('b.m3u8', 'failed', kind='fetch')
+	journal.record('c.m3u8', 'failed', kind='timeout')
+	journal.record('c.m3u8', 'ok', None)   #c passed when it was run again
+	journal.close()
+	with open(journalName, 'a') as journalFile:
+		journalFile.write('{"line": "stopped while writi')
+	resumed = HLSv3.BatchJournal(journalName, resume=True)
+	assert list(resumed.entries(['a.m3u8', 'b.m3u8', 'c.m3u8', 'd.m3u8'])) == [('b.m3u8', None), ('d.m3u8', None)]
+	assert resumed.skipped == 2
+	resumed.close()
+
+def testVerifyContentGivesTheStoredDigest(tmp_path):
+	journalName = str(tmp_path / 'journal')
+	journal = HLSv3.BatchJournal(journalName)
+	journal.record('a.m3u8', 'ok', 'digest-a')
+	journal.record('b.m3u8', 'ok', None)   #A streamed playlist has no digest
+	journal.close()
+	resumed = HLSv3.BatchJournal(journalName, resume=True, verifyContent=True)
+	assert list(resumed.entries(['a.m3u8', 'b.m3u8'])) == [('a.m3u8', 'digest-a')]
+	resumed.close()
+
+def testNoResumeRunsEveryLine(tmp_path):
+	journalName = str(tmp_path / 'journal')
+	journal = HLSv3.BatchJournal(journalName)
+	journal.record('a.m3u8', 'ok', 'digest-a')
+	journal.close()
+	again = HLSv3.BatchJournal(journalName)
+	assert list(again.entries(['a.m3u8'])) == [('a.m3u8', None)]
+	again.close()
+
+def testBatchResumesFromTheJournal(tmp_path, monkeypatch, capsys):
+	monkeypatch.chdir(tmp_path)
+	batch, lines = writeBatch(tmp_path, ['one', 'two', 'three'])
+	journalName = str(tmp_path / 'journal')
+	first = runBatch(tmp_path, batch, 'first.ndjson', '--journal', journalName)
+	assert sorted(record['url'] for record in first) == sorted(lines)
+	(tmp_path / 'four.m3u8').write_text(MEDIA)
+	with open(batch, 'a') as batchFile:
+		batchFile.write(str(tmp_path / 'four.m3u8') + '\n')
+	capsys.readouterr()
+	second = runBatch(tmp_path, batch, 'second.ndjson', '--journal', journalName, '--resume')
+	assert [record['url'] for record in second] == [str(tmp_path / 'four.m3u8')]
+	assert 'Skipped= 3' in capsys.readouterr().out
+
+def testVerifyContentRevalidatesChangedPlaylists(tmp_path, monkeypatch):
+	monkeypatch.chdir(tmp_path)
+	batch, lines = writeBatch(tmp_path, ['one', 'two'])
+	journalName = str(tmp_path / 'journal')
+	runBatch(tmp_path, batch, 'first.ndjson', '--journal', journalName)
+	with open(lines[1], 'a') as playlist:
+		playlist.write('#EXT-X-VERSION:4\n')
+	second = runBatch(tmp_path, batch, 'second.ndjson', '--journal', journalName, '--resume', '--verify-content')
+	assert [record['url'] for record in second] == [lines[1]]
@@ -0,0 +1,22 @@
+####################################
+#
+# Tests of batchPlaylist(): the PDF report of each web playlist in a batch file
+# gets its own name, though CDN playlists are nearly all named index.m3u8.
+#
+####################################
+
+import HLSv3
+
+MEDIA = b'#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:10\n#EXTINF:9.009,\ns0.ts\n#EXT-X-ENDLIST\n'
+
+def testWebReportsWithTheSameFileNameDoNotCollide(monkeypatch):
+	monkeypatch.setattr(HLSv3, 'fetchURL', lambda url, stream=False: (MEDIA, True, True))
+	written = []
+	monkeypatch.setattr(HLSv3, 'createPDF', lambda header, playlist, name: written.append(name))
+	urls = ['https://cdn1.example.com/live/a/index.m3u8', 'https://cdn1.example.com/live/b/index.m3u8',
+		'https://cdn2.example.com/live/a/index.m3u8?token=1']
+	names = [HLSv3.batchPlaylist(url, 'batch.txt', True)[1] for url in urls]
+	assert names == written
+	assert len(set(names)) == len(urls)
+	for url, name in zip(urls, names):
+		assert name == 'index_' + HLSv3.BatchJournal.lineHash(url)[:8] + '.pdf'
@@ -0,0 +1,75 @@
+####################################
+#
+# Tests of the crawl mode: every playlist, key, map and segment a playlist refers
+# to is visited once, and a web key or segment is probed with HEAD.
+#
+####################################
+
+import types
+
+import pytest
+
+import HLSv3
+
+MASTER = ['#EXTM3U', '#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="aud",NAME="en",URI="audio.m3u8"',
+	'#EXT-X-STREAM-INF:BANDWIDTH=100000,AUDIO="aud"', 'media.m3u8',
+	'#EXT-X-STREAM-INF:BANDWIDTH=200000,AUDIO="aud"', 'media.m3u8']
+MEDIA = ['#EXTM3U', '#EXT-X-VERSION:6', '#EXT-X-TARGETDURATION:10', '#EXT-X-MAP:URI="init.mp4"',
+	'#EXT-X-KEY:METHOD=AES-128,URI="key.bin"', '#EXTINF:9.0,', 's0.ts', '#EXTINF:9.0,', 's1.ts', '#EXT-X-ENDLIST']
+AUDIO = ['#EXTM3U', '#EXT-X-TARGETDURATION:10', '#EXTINF:9,', 'a0.ts', '#EXTINF:9,', 's0.ts', '#EXT-X-ENDLIST']
+
+def testCrawlVisitsEveryResourceOnce(tmp_path, capsys):
+	for name, lines in (('master.m3u8', MASTER), ('media.m3u8', MEDIA), ('audio.m3u8', AUDIO)):
+		(tmp_path / name).write_text('\n'.join(lines) + '\n')
+	for name in ('init.mp4', 'key.bin', 's0.ts', 'a0.ts'):
+		(tmp_path / name).write_bytes(b'\0')
+	links = HLSv3.resourceLinks(MEDIA, str(tmp_path / 'media.m3u8'))
+	assert links == [('segment', str(tmp_path / 'init.mp4')), ('key', str(tmp_path / 'key.bin')),
+		('segment', str(tmp_path / 's0.ts')), ('segment', str(tmp_path / 's1.ts'))]
+	HLSv3.crawlPlaylists(str(tmp_path / 'master.m3u8'), workers=2)
+	output = capsys.readouterr().out
+	#master, media, audio, init.mp4, key.bin, s0.ts, s1.ts, a0.ts; only s1.ts is missing
+	assert 'Resources= 8 Depth= 3 Failed= 1' in output
+	assert 'FAILED (fetch): segment ' + str(tmp_path / 's1.ts') in output
+
+class ProbeSession(object):
+	def __init__(self, headStatus):
+		self.headStatus = headStatus
+		self.calls = []
+
+	def response(self, status):
+		def raiseForStatus():
+			if status >= 400:
+				raise RequestException('%d error' % status)
+		return types.SimpleNamespace(status_code=status, raise_for_status=raiseForStatus)
+
+	def head(self, url, **options):
+		self.calls.append(('HEAD', url, options.get('headers')))
+		return self.response(self.headStatus)
+
+	def get(self, url, **options):
+		self.calls.append(('GET', url, options.get('headers')))
+		return self.response(206)
+
+class RequestException(Exception):
+	pass
+
+def probe(monkeypatch, headStatus, url='https://cdn.example.com/s0.ts'):
+	session = ProbeSession(headStatus)
+	monkeypatch.setattr(HLSv3, 'getSession', lambda: session)
+	monkeypatch.setattr(HLSv3, 'requests', types.SimpleNamespace(exceptions=types.SimpleNamespace(RequestException=RequestException)))
+	HLSv3.probeResource(url)
+	return session.calls
+
+def testProbeUsesHead(monkeypatch):
+	assert probe(monkeypatch, 200) == [('HEAD', 'https://cdn.example.com/s0.ts', None)]
+
+def testProbeFallsBackToARangedGet(monkeypatch):
+	assert probe(monkeypatch, 405) == [('HEAD', 'https://cdn.example.com/s0.ts', None),
+		('GET', 'https://cdn.example.com/s0.ts', {'Range': 'bytes=0-0'})]
+
+def testProbeOfAMissingResource(monkeypatch, tmp_path):
+	with pytest.raises(HLSv3.FetchError):
+		probe(monkeypatch, 404)
+	with pytest.raises(HLSv3.FetchError):
+		HLSv3.probeResource(str(tmp_path / 'missing.ts'))
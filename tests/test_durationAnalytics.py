@@ -0,0 +1,61 @@
+####################################
+#
+# Tests of durationAnalytics(): the plain Python pass and the NumPy pass (when
+# NumPy is installed) give the same DurationStats for one SegmentTable.
+#
+####################################
+
+import pytest
+
+import HLSv3
+
+#Three EXT-X-TARGETDURATION tags (4, 6 then 2) and three EXTINF durations that are not
+#valid numbers
+PLAYLIST = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:4',
+	'#EXTINF:3.6,', 's0.ts', '#EXTINF:4.4,', 's1.ts', '#EXTINF:abc,', 's2.ts',
+	'#EXT-X-TARGETDURATION:6',
+	'#EXTINF:5.5,', 's3.ts', '#EXTINF:6.6,', 's4.ts', '#EXTINF:-1,', 's5.ts',
+	'#EXT-X-TARGETDURATION:2',
+	'#EXTINF:2.5,', 's6.ts', '#EXTINF:nan,', 's7.ts']
+
+def playlistStats(lines):
+	rules = HLSv3.ValidationEngine(False).run(lines)
+	return HLSv3.durationAnalytics(rules['segments'].result(None), rules['vTargetDuration'].targets)
+
+def statsFields(stats):
+	return dict((name, getattr(stats, name)) for name in HLSv3.DurationStats.__slots__)
+
+def pythonStats(monkeypatch, lines):
+	with monkeypatch.context() as patch:
+		patch.setattr(HLSv3, 'loadNumpy', lambda: None)
+		return playlistStats(lines)
+
+def testPythonStats(monkeypatch):
+	stats = pythonStats(monkeypatch, PLAYLIST)
+	assert stats.overLines == [5, 12, 17]
+	assert stats.roundLines == [12, 17]
+	assert stats.invalidLines == [7, 14, 19]
+	assert stats.count == 5
+	assert stats.total == pytest.approx(22.6)
+	assert stats.mean == pytest.approx(4.52)
+	assert stats.p99 == pytest.approx(6.556)
+	assert stats.maxDrift == pytest.approx(-1.4)
+	assert stats.driftLine == 17
+
+def testNumpyStatsEqualPythonStats(monkeypatch):
+	pytest.importorskip('numpy')
+	segments = list(PLAYLIST)
+	for segment in range(8, 2000):   #Enough rows for the percentile and drift to differ
+		segments += ['#EXTINF:%s,' % ('x' if segment % 97 == 0 else 1.0 + (segment * 7 % 23) / 10.0), 's%d.ts' % segment]
+		if segment % 500 == 0:
+			segments.append('#EXT-X-TARGETDURATION:%d' % (2 + segment % 3))
+	for lines in (PLAYLIST, segments, PLAYLIST[:3]):
+		expected = statsFields(pythonStats(monkeypatch, lines))
+		monkeypatch.setattr(HLSv3, 'numpyLoaded', False)
+		stats = playlistStats(lines)
+		assert HLSv3.numpy is not None
+		for name, value in statsFields(stats).items():
+			if isinstance(value, float):
+				assert value == pytest.approx(expected[name]), name
+			else:
+				assert value == expected[name], name
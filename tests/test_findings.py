@@ -0,0 +1,111 @@
+####################################
+#
+# Tests of Findings, the compact (finding code, line range) results of the checks.
+#
+####################################
+
+import HLSv3
+
+def testConsecutiveLinesMakeOneRange():
+	findings = HLSv3.Findings()
+	for line in (4, 5, 6):
+		findings.add(HLSv3.F_TARGET_EXCEEDED, line)
+	assert list(findings) == ['EXTINF value exceeds Max on lines= 4-6 (3 lines)']
+	assert findings.lineCount() == 3
+
+def testLinesWithAGapAreNotMerged():
+	#Without the previous tag line only the very next line extends a run
+	findings = HLSv3.Findings()
+	for line in (4, 6, 7):
+		findings.add(HLSv3.F_TARGET_EXCEEDED, line)
+	assert list(findings) == ['EXTINF value exceeds Max on line= 4', 'EXTINF value exceeds Max on lines= 6-7 (2 lines)']
+
+def testConsecutiveTagsMakeOneRange():
+	#An error on every EXTINF is one run, counting the tags and not the URI lines
+	findings = HLSv3.Findings()
+	previous = 2
+	for line in (4, 6, 8):
+		findings.add(HLSv3.F_TARGET_EXCEEDED, line, previous=previous)
+		previous = line
+	assert list(findings) == ['EXTINF value exceeds Max on lines= 4-8 (3 lines)']
+
+def testATagWithoutTheErrorEndsTheRange():
+	#The EXTINF on line 6 had no error, so line 8 does not extend the run of line 4
+	findings = HLSv3.Findings()
+	findings.add(HLSv3.F_TARGET_EXCEEDED, 4, previous=2)
+	findings.add(HLSv3.F_TARGET_EXCEEDED, 8, previous=6)
+	assert list(findings) == ['EXTINF value exceeds Max on line= 4', 'EXTINF value exceeds Max on line= 8']
+
+def testInterleavedCodesKeepTheirRuns():
+	#An EXT-X-KEY and an EXTINF error in every segment are two runs, not one per line
+	findings = HLSv3.Findings()
+	for segment in range(0, 3):
+		line = 3 + segment * 3
+		findings.add(HLSv3.F_VERSION_IV, line, previous=line - 3)
+		findings.add(HLSv3.F_VERSION_FLOAT, line + 1, previous=line - 2)
+	assert list(findings) == ['EXT-X-KEY:IV tag on lines: 3-9 (3 lines)',
+		'EXTINF tag with decimals & Version less than 3.0  on lines= 4-10 (3 lines)']
+
+def testAnotherCodeEndsTheRange():
+	findings = HLSv3.Findings()
+	findings.add(HLSv3.F_TARGET_EXCEEDED, 4)
+	findings.add(HLSv3.F_TARGET_ROUNDED, 5)
+	findings.add(HLSv3.F_TARGET_EXCEEDED, 6)
+	assert len(findings) == 3
+	assert [(code, first, last) for code, severity, first, last, count in findings.runs()] == [
+		(HLSv3.F_TARGET_EXCEEDED, 4, 4), (HLSv3.F_TARGET_ROUNDED, 5, 5), (HLSv3.F_TARGET_EXCEEDED, 6, 6)]
+
+def testRepeatedLineIsNotARange():
+	findings = HLSv3.Findings()
+	findings.add(HLSv3.F_TARGET_EXCEEDED, 4)
+	findings.add(HLSv3.F_TARGET_EXCEEDED, 4)
+	assert len(findings) == 2
+
+def testNotesAreKeptInOrder():
+	findings = HLSv3.Findings()
+	findings.add(HLSv3.F_TARGET_FIRST, 3)
+	findings.note('No error lines found')
+	assert list(findings) == ['First EXT-X-TARGETDURATION tag found on line= 3', 'No error lines found']
+	assert findings[-1] == 'No error lines found'
+
+def testExtendKeepsTheRanges():
+	first = HLSv3.Findings()
+	first.add(HLSv3.F_TARGET_EXCEEDED, 4)
+	first.add(HLSv3.F_TARGET_EXCEEDED, 5)
+	first.note('note')
+	copy = HLSv3.Findings()
+	copy.extend(first)
+	assert list(copy) == list(first)
+	copy.add(HLSv3.F_TARGET_EXCEEDED, 9)
+	assert len(first) == 2
+
+def testSeverityOfTheRuns():
+	findings = HLSv3.Findings()
+	findings.add(HLSv3.F_TARGET_FIRST, 3)
+	findings.add(HLSv3.F_TARGET_ROUNDED, 8)
+	findings.add(HLSv3.F_TARGET_EXCEEDED, 10)
+	assert [severity for code, severity, first, last, count in findings.runs()] == [
+		HLSv3.SEVERITY_INFO, HLSv3.SEVERITY_WARNING, HLSv3.SEVERITY_ERROR]
+
+def testTargetDurationFindingsOfAPlaylist():
+	#Over-target EXTINF tags on lines 4 and 6 are one run; the invalid EXTINF on line 8
+	#and the over-target one after it are not part of it
+	lines = ['#EXTM3U', '#EXT-X-TARGETDURATION:10', '#EXT-X-VERSION:3', '#EXTINF:12.0,', 's0.ts',
+		'#EXTINF:11.0,', 's1.ts', '#EXTINF:abc,', 's2.ts', '#EXTINF:13.0,', 's3.ts', '#EXTINF:9.0,', 's4.ts',
+		'#EXTINF:14.0,', 's5.ts']
+	playlist = HLSv3.createVariant(lines, 'a.m3u8')
+	HLSv3.runChecks(playlist)
+	assert list(playlist.vTargetDurationLines) == ['First EXT-X-TARGETDURATION tag found on line= 2',
+		'EXTINF value exceeds Max on lines= 4-6 (2 lines)', 'EXTINF duration is not a valid number on line= 8',
+		'EXTINF value exceeds Max on line= 10', 'EXTINF value exceeds Max on line= 14']
+	assert list(playlist.vRoundingLines) == ['EXTINF duration rounds above the target on lines= 4-6 (2 lines)',
+		'EXTINF duration rounds above the target on line= 10', 'EXTINF duration rounds above the target on line= 14']
+	assert playlist.vDurCheck.startswith('FAILED')
+
+def testEveryFloatEXTINFBelowVersion3IsOneRun():
+	lines = ['#EXTM3U', '#EXT-X-TARGETDURATION:10']
+	for segment in range(0, 1000):
+		lines += ['#EXTINF:9.5,', 's%d.ts' % segment]
+	playlist = HLSv3.createVariant(lines, 'a.m3u8')
+	HLSv3.runChecks(playlist)
+	assert list(playlist.verCompCkErrorLines) == ['EXTINF tag with decimals & Version less than 3.0  on lines= 3-2001 (1000 lines)']
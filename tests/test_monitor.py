@@ -0,0 +1,59 @@
+####################################
+#
+# Tests of the monitor mode: LiveMonitor checks the segments each reload adds with
+# the variant rules, and MonitorScheduler keeps reloading after an error.
+#
+####################################
+
+import asyncio
+
+import HLSv3
+
+def livePlaylist(first, count, target='4', durations=None):
+	lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:' + target, '#EXT-X-MEDIA-SEQUENCE:%d' % first]
+	for sequence in range(first, first + count):
+		lines += ['#EXTINF:%s,' % (durations or {}).get(sequence, '4.0'), 's%d.ts' % sequence]
+	return '\n'.join(lines) + '\n'
+
+def testAppendedSegmentsAreChecked():
+	monitor = HLSv3.LiveMonitor('live.m3u8')
+	assert monitor.refresh(0.0, livePlaylist(0, 3)) == []
+	findings = monitor.refresh(4.0, livePlaylist(1, 3, durations={3: '6.0'}))
+	assert monitor.newSegments == 1
+	assert 'EXTINF value exceeds Max on line= 9' in findings
+
+def testInvalidTargetDurationIsAFinding():
+	monitor = HLSv3.LiveMonitor('live.m3u8')
+	findings = monitor.refresh(0.0, livePlaylist(0, 3, target='abc'))
+	assert 'FAILED: EXT-X-TARGETDURATION value is not a valid number' in findings
+	findings = monitor.refresh(5.0, livePlaylist(1, 3, target='abc'))
+	assert monitor.loads == 2
+	assert 'EXT-X-TARGETDURATION tag is REQUIRED' not in findings
+
+def testInvalidTargetDurationOfAVariant():
+	lines = livePlaylist(0, 2, target='ten').splitlines()
+	playlist = HLSv3.createVariant(lines, 'a.m3u8')
+	HLSv3.runChecks(playlist)
+	assert playlist.vTagCheck == 'FAILED: EXT-X-TARGETDURATION value is not a valid number'
+	assert 'EXT-X-TARGETDURATION value is not a valid number on line= 3' in list(playlist.vTargetDurationLines)
+	assert playlist.vDurCheck.startswith('PASSED')
+
+def testSchedulerReloadsAfterAnUnexpectedError(monkeypatch):
+	monkeypatch.setattr(HLSv3, 'asyncio', asyncio)
+	monkeypatch.setattr(HLSv3, 'MONITOR_RELOAD', 0.01)
+	monkeypatch.setattr(HLSv3, 'loadBody', lambda url: livePlaylist(0, 2, target='0', durations={0: '0', 1: '0'}))
+	refresh = HLSv3.LiveMonitor.refresh
+	calls = []
+	def failingRefresh(self, now, body=None):
+		calls.append(now)
+		if len(calls) == 1:
+			raise RuntimeError('rule error')
+		return refresh(self, now, body)
+	monkeypatch.setattr(HLSv3.LiveMonitor, 'refresh', failingRefresh)
+	scheduler = HLSv3.MonitorScheduler(['live.m3u8'], refreshes=2)
+	monitor = scheduler.heap[0][2]
+	asyncio.run(scheduler.run())
+	#The failed reload counts toward refreshes=2 and the monitor is reloaded twice more
+	assert len(calls) == 3
+	assert monitor.failures == 1
+	assert monitor.loads == 2
@@ -0,0 +1,85 @@
+####################################
+#
+# Tests of resolveURI() and of the Variant URLs of a Master: relative URIs are
+# resolved against the Master, and each distinct Variant is retrieved once.
+#
+####################################
+
+import os
+
+import HLSv3
+
+MEDIA = '#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:10\n#EXTINF:9.009,\ns0.ts\n#EXT-X-ENDLIST\n'
+
+def testWebURIs():
+	base = 'http://cdn.example.com/live/master.m3u8?token=1'
+	assert HLSv3.resolveURI(base, 'hi/index.m3u8') == 'http://cdn.example.com/live/hi/index.m3u8'
+	assert HLSv3.resolveURI(base, '../vod/index.m3u8') == 'http://cdn.example.com/vod/index.m3u8'
+	assert HLSv3.resolveURI(base, '/root.m3u8') == 'http://cdn.example.com/root.m3u8'
+	assert HLSv3.resolveURI(base, '//other.example.com/a.m3u8') == 'http://other.example.com/a.m3u8'
+	assert HLSv3.resolveURI(base, 'https://other.example.com/a.m3u8') == 'https://other.example.com/a.m3u8'
+
+def testFileURIs():
+	base = os.path.join('/data', 'show', 'master.m3u8')
+	assert HLSv3.resolveURI(base, 'hi/index.m3u8') == os.path.join('/data', 'show', 'hi', 'index.m3u8')
+	assert HLSv3.resolveURI(base, '../other/index.m3u8') == os.path.join('/data', 'other', 'index.m3u8')
+	assert HLSv3.resolveURI(base, '/abs/index.m3u8') == '/abs/index.m3u8'
+	assert HLSv3.resolveURI(base, 'http://cdn.example.com/a.m3u8') == 'http://cdn.example.com/a.m3u8'
+	assert HLSv3.resolveURI('master.m3u8', 'hi/index.m3u8') == os.path.join('hi', 'index.m3u8')
+
+def testMasterResolvesAndFetchesEachVariantOnce(tmp_path, monkeypatch):
+	(tmp_path / 'hi').mkdir()
+	(tmp_path / 'audio').mkdir()
+	for name in ('hi/index.m3u8', 'lo.m3u8', 'audio/en.m3u8'):
+		(tmp_path / name).write_text(MEDIA)
+	master = ['#EXTM3U',
+		'#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="aud",NAME="en",URI="audio/en.m3u8"',
+		'#EXT-X-STREAM-INF:BANDWIDTH=300000,AUDIO="aud"', 'hi/index.m3u8',
+		'#EXT-X-STREAM-INF:BANDWIDTH=100000,AUDIO="aud"', 'lo.m3u8',
+		'#EXT-X-STREAM-INF:BANDWIDTH=400000,CODECS="avc1.640028",AUDIO="aud"', 'hi/../hi/index.m3u8']
+	fetched = []
+	fetchURL = HLSv3.fetchURL
+	def countingFetch(url, stream=False):
+		fetched.append(url)
+		return fetchURL(url, stream)
+	monkeypatch.setattr(HLSv3, 'fetchURL', countingFetch)
+	playlist = HLSv3.createMaster(master, str(tmp_path / 'master.m3u8'))
+	expected = [str(tmp_path / 'audio' / 'en.m3u8'), str(tmp_path / 'hi' / 'index.m3u8'), str(tmp_path / 'lo.m3u8'),
+		str(tmp_path / 'hi' / 'index.m3u8')]
+	assert playlist.variantURLs == expected
+	assert sorted(fetched) == sorted(set(expected))
+	assert playlist.variantErrors == []
+	assert playlist.variantList[1] is not playlist.variantList[3]
+	HLSv3.runChecks(playlist)
+	assert playlist.variantList[3].vVersionCk == playlist.variantList[1].vVersionCk == 'PASSED: EXT-X-VERSION test'
+
+def testMissingVariantIsNotChecked(tmp_path):
+	(tmp_path / 'lo.m3u8').write_text(MEDIA)
+	master = ['#EXTM3U', '#EXT-X-STREAM-INF:BANDWIDTH=100000', 'lo.m3u8', '#EXT-X-STREAM-INF:BANDWIDTH=200000', 'gone.m3u8']
+	playlist = HLSv3.createMaster(master, str(tmp_path / 'master.m3u8'))
+	HLSv3.runChecks(playlist)
+	assert [url for url, reason in playlist.variantErrors] == [str(tmp_path / 'gone.m3u8')]
+	missing = playlist.variantList[1]
+	assert missing.ckHeader == missing.vDurCheck == 'NOT RETRIEVED'
+	assert missing.rules is None
+	assert HLSv3.playlistRecord(playlist)['variants'][1]['fetchError'] == playlist.variantErrors[0][1]
+
+def testMonitorVariantsIncludeTheRenditions():
+	body = '\n'.join(['#EXTM3U',
+		'#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="aud",NAME="en",URI="audio/en.m3u8"',
+		'#EXT-X-MEDIA:TYPE=SUBTITLES,GROUP-ID="sub",NAME="en",URI="subs/en.m3u8"',
+		'#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="aud2",NAME="main"',
+		'#EXT-X-STREAM-INF:BANDWIDTH=300000,AUDIO="aud",SUBTITLES="sub"', 'hi/index.m3u8',
+		'#EXT-X-I-FRAME-STREAM-INF:BANDWIDTH=50000,URI="hi/iframe.m3u8"',
+		'#EXT-X-STREAM-INF:BANDWIDTH=300000,AUDIO="aud2"', 'hi/index.m3u8'])
+	assert list(HLSv3.variantURIs(body.splitlines())) == ['audio/en.m3u8', 'subs/en.m3u8', 'hi/index.m3u8',
+		'hi/iframe.m3u8', 'hi/index.m3u8']
+	base = 'http://cdn.example.com/live/master.m3u8'
+	assert HLSv3.variantLines(body, base) == ['http://cdn.example.com/live/audio/en.m3u8',
+		'http://cdn.example.com/live/subs/en.m3u8', 'http://cdn.example.com/live/hi/index.m3u8',
+		'http://cdn.example.com/live/hi/iframe.m3u8']
+	playlist = HLSv3.createMaster(body.splitlines(), base, loadVariants=False)
+	assert list(dict.fromkeys(playlist.variantURLs)) == HLSv3.variantLines(body, base)
+
+def testMediaPlaylistHasNoVariants():
+	assert HLSv3.variantLines('#EXTM3U\n#EXTINF:4.0,\ns0.ts\n', 'http://cdn.example.com/live.m3u8') == []
@@ -0,0 +1,74 @@
+####################################
+#
+# Tests of the ResponseCache (--cache DIR): conditional GET validators, reuse
+# of a stored body and of the rules stored for it.
+#
+####################################
+
+import pickle
+
+import HLSv3
+
+URL = 'http://example.com/live/index.m3u8'
+BODY = b'#EXTM3U\n#EXT-X-TARGETDURATION:10\n#EXTINF:9.0,\ns0.ts\n'
+RULES = {'checkHeader': 'stored rules'}
+
+def firstRun(directory):
+	#Downloads URL and stores its rules, as the first run of a --cache DIR does
+	cache = HLSv3.ResponseCache(directory)
+	cache.store(URL, None, {'etag': '"v1"', 'last-modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}, BODY)
+	cache.saveRules(URL, RULES)
+	return cache
+
+def notModifiedRun(directory):
+	#Starts a new run in which the server answers 304 for URL
+	cache = HLSv3.ResponseCache(directory)
+	assert cache.reuse(URL, cache.lookup(URL)) == BODY
+	return cache
+
+def testConditionalHeaders(tmp_path):
+	firstRun(str(tmp_path))
+	cache = HLSv3.ResponseCache(str(tmp_path))
+	headers = cache.conditionalHeaders(cache.lookup(URL))
+	assert headers == {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+
+def testLookupMiss(tmp_path):
+	cache = HLSv3.ResponseCache(str(tmp_path))
+	assert cache.lookup(URL) is None
+	assert cache.conditionalHeaders(None) == {}
+
+def testRulesReusedWhenNotModified(tmp_path):
+	firstRun(str(tmp_path))
+	cache = notModifiedRun(str(tmp_path))
+	assert cache.loadRules(URL) == RULES
+	assert cache.notModified == 1 and cache.savedBytes == len(BODY)
+
+def testRulesNotReusedWhenNotRetrievedThisRun(tmp_path):
+	firstRun(str(tmp_path))
+	cache = HLSv3.ResponseCache(str(tmp_path))
+	assert cache.loadRules(URL) is None
+
+def testRulesMissAfterBodyChanged(tmp_path):
+	firstRun(str(tmp_path))
+	cache = HLSv3.ResponseCache(str(tmp_path))
+	cache.store(URL, cache.lookup(URL), {'etag': '"v2"'}, BODY + b'#EXTINF:9.0,\ns1.ts\n')
+	assert URL not in cache.unchanged
+	assert cache.loadRules(URL) is None
+
+def testRulesMissAfterResultVersionChanged(tmp_path, monkeypatch):
+	firstRun(str(tmp_path))
+	monkeypatch.setattr(HLSv3, 'RESULT_VERSION', HLSv3.RESULT_VERSION + 1)
+	cache = notModifiedRun(str(tmp_path))
+	assert cache.loadRules(URL) is None
+
+def testOldRulesFileIsNotUnpickled(tmp_path, monkeypatch):
+	#A .rules file without the version line (as written by earlier code) is a miss,
+	#and pickle.load() is never called for it
+	cache = firstRun(str(tmp_path))
+	with open(cache.path(URL, '.rules'), 'wb') as rulesFile:
+		rulesFile.write(pickle.dumps((cache.bodyHashes[URL], ['old', 'rules'])))
+	loads = []
+	monkeypatch.setattr(HLSv3.pickle, 'load', lambda *args: loads.append(args))
+	cache = notModifiedRun(str(tmp_path))
+	assert cache.loadRules(URL) is None
+	assert loads == []
@@ -0,0 +1,77 @@
+####################################
+#
+# Tests of the ResultCache: validation results memoized by playlist content,
+# in memory and in the --result-db SQLite tier.
+#
+####################################
+
+import HLSv3
+
+LINES = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:10', '#EXTINF:9.009,', 's0.ts', '#EXT-X-ENDLIST']
+
+def variant(url='http://example.com/a.m3u8', lines=LINES):
+	return HLSv3.createVariant(list(lines), url)
+
+def testMissThenHit():
+	cache = HLSv3.ResultCache(size=4)
+	key = cache.key(variant())
+	assert cache.get(key) is None
+	cache.put(key, {'rules': 1}, 0.5)
+	assert cache.get(key) == {'rules': 1}
+	assert (cache.lookups, cache.memoryHits, cache.dbHits) == (2, 1, 0)
+	assert cache.secondsSaved == 0.5
+
+def testKeyIsTheContent():
+	#The same content at another URL, or with trailing blank lines, is the same entry
+	cache = HLSv3.ResultCache()
+	assert cache.key(variant()) == cache.key(variant('other.m3u8', LINES + ['', '']))
+	assert cache.key(variant()) != cache.key(variant(lines=LINES[:-1]))
+
+def testKeyChangesWithResultVersion(monkeypatch):
+	cache = HLSv3.ResultCache()
+	key = cache.key(variant())
+	cache.put(key, {'rules': 1}, 0.0)
+	monkeypatch.setattr(HLSv3, 'RESULT_VERSION', HLSv3.RESULT_VERSION + 1)
+	assert cache.key(variant()) != key
+	assert cache.get(cache.key(variant())) is None
+
+def testOldestEntryIsEvicted():
+	cache = HLSv3.ResultCache(size=1)
+	cache.put('a', 'rules a', 0.0)
+	cache.put('b', 'rules b', 0.0)
+	assert cache.get('a') is None
+	assert cache.get('b') == 'rules b'
+
+def testDatabaseTierAcrossRuns(tmp_path):
+	dbName = str(tmp_path / 'results.db')
+	first = HLSv3.ResultCache(size=0, dbName=dbName)
+	key = first.key(variant())
+	first.put(key, {'rules': 1}, 0.25)
+	first.close()
+	second = HLSv3.ResultCache(size=4, dbName=dbName)
+	assert second.get(key) == {'rules': 1}
+	assert second.get(key) == {'rules': 1}
+	assert (second.memoryHits, second.dbHits) == (1, 1)
+	second.close()
+
+def testEngineRulesReusesTheResults(monkeypatch):
+	cache = HLSv3.ResultCache()
+	monkeypatch.setattr(HLSv3, 'resultCache', cache)
+	monkeypatch.setattr(HLSv3, 'responseCache', None)
+	first = HLSv3.engineRules(variant())
+	second = HLSv3.engineRules(variant('http://example.com/b.m3u8'))
+	assert second is first
+	assert (cache.lookups, cache.memoryHits) == (2, 1)
+
+def testCachedResultsMatchAFreshValidation(monkeypatch):
+	#A playlist validated from cached rules reports the same as one validated fresh
+	monkeypatch.setattr(HLSv3, 'responseCache', None)
+	monkeypatch.setattr(HLSv3, 'resultCache', None)
+	fresh = variant()
+	HLSv3.runChecks(fresh)
+	monkeypatch.setattr(HLSv3, 'resultCache', HLSv3.ResultCache())
+	for run in range(0, 2):
+		cached = variant()
+		HLSv3.runChecks(cached)
+	assert HLSv3.resultCache.memoryHits == 1
+	assert HLSv3.playlistRecord(cached) == HLSv3.playlistRecord(fresh)
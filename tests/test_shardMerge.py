@@ -0,0 +1,90 @@
+####################################
+#
+# Tests of --shard K/N and the merge mode: the shards of a batch file, merged,
+# give the records of the whole batch.
+#
+####################################
+
+import json
+
+import HLSv3
+
+MEDIA = '#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:10\n#EXTINF:%s,\ns0.ts\n#EXT-X-ENDLIST\n'
+MASTER = '#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=100000\nlow.m3u8\n#EXT-X-STREAM-INF:BANDWIDTH=200000\nhigh.m3u8\n'
+
+def writeBatch(tmp_path):
+	#Writes media playlists (some failing checks), a Master with two Variants and a
+	#missing playlist, and the batch file listing them
+	lines = []
+	for index in range(0, 8):
+		playlist = tmp_path / ('media%d.m3u8' % index)
+		playlist.write_text(MEDIA % ('9.009' if index % 2 else '12.5'))
+		lines.append(str(playlist))
+	(tmp_path / 'low.m3u8').write_text(MEDIA % '9.009')
+	(tmp_path / 'high.m3u8').write_text(MEDIA % '11.0')
+	(tmp_path / 'master.m3u8').write_text(MASTER)
+	lines.append(str(tmp_path / 'master.m3u8'))
+	lines.append(str(tmp_path / 'missing.m3u8'))
+	batch = tmp_path / 'batch.txt'
+	batch.write_text('\n'.join(lines) + '\n')
+	return str(batch), lines
+
+def runBatch(tmp_path, batch, name, outputFormat, *options):
+	output = str(tmp_path / name)
+	HLSv3.main(['--log-level', 'off', '--format', outputFormat, '--output', output] + list(options) + ['batch', batch])
+	return output
+
+def mergeFiles(tmp_path, fileNames):
+	output = tmp_path / 'merged.json'
+	writer = HLSv3.RecordWriter('json', open(str(output), 'w'), True)
+	problems = HLSv3.mergeResults(fileNames, writer)
+	writer.close()
+	return json.loads(output.read_text()), problems
+
+def testEveryLineIsInOneShard():
+	lines = ['http://example.com/%d/index.m3u8' % index for index in range(0, 200)]
+	for count in (1, 2, 3, 7):
+		shards = [[line for line in lines if HLSv3.inShard(line, (index, count))] for index in range(1, count + 1)]
+		assert sorted(sum(shards, [])) == sorted(lines)
+		assert all(shards)
+
+def testShardIgnoresOrderAndWhitespace():
+	line = 'http://example.com/a.m3u8'
+	picked = [index for index in range(1, 5) if HLSv3.inShard(line, (index, 4))]
+	assert picked == [index for index in range(1, 5) if HLSv3.inShard('  ' + line + '\n', (index, 4))]
+	assert len(picked) == 1
+
+def testMergedShardsMatchTheWholeBatch(tmp_path, monkeypatch, capsys):
+	monkeypatch.chdir(tmp_path)
+	batch, lines = writeBatch(tmp_path)
+	whole = json.loads(open(runBatch(tmp_path, batch, 'whole.json', 'json')).read())
+	shards = [runBatch(tmp_path, batch, 'shard%d.ndjson' % index, 'ndjson', '--shard', '%d/3' % index) for index in range(1, 4)]
+	capsys.readouterr()
+	merged, problems = mergeFiles(tmp_path, shards)
+	assert problems == []
+	assert merged == sorted(whole, key=lambda record: record['url'])
+	master = [record for record in merged if record['type'] == 'master'][0]
+	assert [variant['url'] for variant in master['variants']] == [str(tmp_path / 'low.m3u8'), str(tmp_path / 'high.m3u8')]
+	report = capsys.readouterr().out
+	assert 'Result files= 3 Playlists= %d (Master= 1 Media= 8) Failed= 1' % len(lines) in report
+
+def testLastFileWinsForARepeatedURL(tmp_path):
+	first = tmp_path / 'first.ndjson'
+	second = tmp_path / 'second.ndjson'
+	first.write_text(json.dumps({'type': 'media', 'url': 'a.m3u8', 'checks': {'vVersionCk': 'old'}}) + '\n')
+	second.write_text(json.dumps({'type': 'media', 'url': 'a.m3u8', 'checks': {'vVersionCk': 'new'}}) + '\n')
+	merged, problems = mergeFiles(tmp_path, [str(first), str(second)])
+	assert [record['checks']['vVersionCk'] for record in merged] == ['new']
+
+def testCorruptShardIsReportedAndTheRestMerged(tmp_path, monkeypatch, capsys):
+	#A json file cut in the middle of its 6th record, and a file that is not there
+	monkeypatch.chdir(tmp_path)
+	batch, lines = writeBatch(tmp_path)
+	fileLines = open(runBatch(tmp_path, batch, 'whole.json', 'json')).read().splitlines()
+	truncated = tmp_path / 'truncated.json'
+	truncated.write_text('\n'.join(fileLines[:6]) + '\n' + fileLines[6][:40])
+	capsys.readouterr()
+	merged, problems = mergeFiles(tmp_path, [str(truncated), str(tmp_path / 'nothere.json')])
+	assert [(fileName, num) for fileName, num, reason in problems] == [(str(truncated), 7), (str(tmp_path / 'nothere.json'), None)]
+	assert [record['url'] for record in merged] == sorted(json.loads(line.rstrip(','))['url'] for line in fileLines[1:6])
+	assert 'UNREADABLE RECORDS' in capsys.readouterr().out
@@ -0,0 +1,54 @@
+####################################
+#
+# Tests of --stream: a media playlist validated while it is read gives the same
+# results as the same playlist read in full.
+#
+####################################
+
+import HLSv3
+
+#Text results and error lines of the variant checks
+RESULTS = ['ckHeader', 'vVersionCk', 'verCkErrorLines', 'compCheckV2', 'compCheckV3', 'compCheckV4',
+	'compCheckV5', 'compCheckV6', 'compCheckV7', 'verCompCkErrorLines', 'vTagsResult', 'vResultTag',
+	'vSegTag', 'vStartTag', 'vTimeTag', 'vTagCheck', 'vMultiTag', 'vDurCheck', 'vTargetDurationLines',
+	'vTCount', 'vMedTagCheck', 'vMultiSeqTag', 'vMediaSequenceLines', 'vDSTCount', 'vDSTagCheck',
+	'vDSMultiCheck', 'vFrameCheck', 'vMediaSeg']
+
+CLEAN = ['#EXTM3U', '#EXT-X-VERSION:4', '#EXT-X-TARGETDURATION:10', '#EXT-X-MEDIA-SEQUENCE:0',
+	'#EXTINF:9.009,first', 's0.ts', '#EXTINF:9.009,', 's1.ts', '#EXT-X-ENDLIST']
+
+#Version 2 with IV, decimal durations and byte ranges, a second EXT-X-TARGETDURATION,
+#sequence tags after the first segment, an overlong segment and a Master tag
+BROKEN = ['#EXTM3U', '#EXT-X-VERSION:2', '#EXT-X-TARGETDURATION:6', '#EXT-X-INDEPENDENT-SEGMENTS',
+	'#EXT-X-START:PRECISE=YES', '#EXT-X-KEY:METHOD=AES-128,URI="key.bin",IV=0x1f',
+	'#EXTINF:5.5,', '#EXT-X-BYTERANGE:1000@0', 'seg.ts', '#EXT-X-MEDIA-SEQUENCE:3',
+	'#EXTINF:7.25,title, with a comma', 's1.ts', '#EXT-X-DISCONTINUITY-SEQUENCE:1', '#EXT-X-DISCONTINUITY',
+	'#EXT-X-TARGETDURATION:8', '#EXT-X-MAP:URI="init.mp4"', '#EXTINF:8,', 's2.ts',
+	'#EXT-X-STREAM-INF:BANDWIDTH=1', 'other.ts', '#EXT-X-MEDIA-SEQUENCE:4']
+
+def checkResults(playlist):
+	#Returns a copy of the results, and clears the playlist as a batch run does
+	HLSv3.runChecks(playlist)
+	results = {}
+	for name in RESULTS:
+		value = getattr(playlist, name, None)
+		results[name] = list(value) if isinstance(value, list) or hasattr(value, 'runs') else value
+	HLSv3.clearVariant(playlist)
+	return results
+
+def readPlaylist(tmp_path, lines, stream):
+	path = tmp_path / 'media.m3u8'
+	path.write_text('\n'.join(lines) + '\n')
+	return HLSv3.createPlaylist(open(str(path)), True, False, str(path), stream)
+
+def testStreamedResultsEqualFullResults(tmp_path):
+	for lines in (CLEAN, BROKEN):
+		full = checkResults(readPlaylist(tmp_path, lines, False))
+		streamed = readPlaylist(tmp_path, lines, True)
+		assert streamed.streamed
+		assert checkResults(streamed) == full
+
+def testStreamedPlaylistDoesNotKeepItsLines(tmp_path):
+	streamed = readPlaylist(tmp_path, BROKEN, True)
+	assert streamed.vContent == []
+	assert streamed.rules is not None
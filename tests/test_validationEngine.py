@@ -0,0 +1,52 @@
+####################################
+#
+# Tests of the ValidationEngine: every rule is fed in one traversal, and a rule
+# still waiting for the line after a tag is told when the playlist ends.
+#
+####################################
+
+import HLSv3
+
+MASTER = ['#EXTM3U', '#EXT-X-STREAM-INF:BANDWIDTH=100000', 'low.m3u8', '#EXT-X-STREAM-INF:BANDWIDTH=200000']
+
+def streamInf(lines):
+	engine = HLSv3.ValidationEngine(True)
+	rules = engine.run(lines)
+	return rules['mStreamInf'].result(None)
+
+def testTokenizeContentKeepsOneCodePerLine():
+	codes = HLSv3.tokenizeContent(['#EXTM3U', '#EXTINF:9.0,', 's0.ts', '', '# comment', '#EXT-X-UNKNOWN-TAG:1'])
+	assert codes == bytearray([HLSv3.TAG_CODES['EXTM3U'], HLSv3.TAG_CODES['EXTINF'], HLSv3.TAG_URI,
+		HLSv3.TAG_BLANK, HLSv3.TAG_COMMENT, HLSv3.TAG_UNKNOWN])
+
+def testStreamInfFollowedByURI():
+	nextLine, bwAttr, findings = streamInf(MASTER + ['high.m3u8'])
+	assert (nextLine, bwAttr, list(findings)) == (False, True, [])
+
+def testStreamInfAtTheEndOfThePlaylistFails():
+	#The last line is the tag, with or without a trailing newline
+	for lines in (MASTER, MASTER + ['']):
+		nextLine, bwAttr, findings = streamInf(lines)
+		assert nextLine
+		assert list(findings) == ['EXT-X-STREAM-INF tag NOT followed by URI on line= 4']
+
+def testMasterCheckFailsWithoutTheLastURI(tmp_path):
+	(tmp_path / 'low.m3u8').write_text('#EXTM3U\n#EXT-X-TARGETDURATION:10\n#EXTINF:9.0,\ns0.ts\n#EXT-X-ENDLIST\n')
+	playlist = HLSv3.createMaster(list(MASTER), str(tmp_path / 'master.m3u8'))
+	HLSv3.runChecks(playlist)
+	assert playlist.mResultLine.startswith('FAILED')
+
+def testWaitingRulesCarryOverWithoutEnd():
+	#With end=False the next run() gives the waiting rule its first line
+	engine = HLSv3.ValidationEngine(True)
+	engine.run(MASTER, end=False)
+	rules = engine.run(['high.m3u8'], firstLine=len(MASTER))
+	assert rules['mStreamInf'].result(None)[0] is False
+	engine = HLSv3.ValidationEngine(True)
+	engine.run(MASTER, end=False)
+	rules = engine.run([], firstLine=len(MASTER))
+	assert rules['mStreamInf'].result(None)[0] is True
+
+def testEmptyPlaylist():
+	rules = HLSv3.ValidationEngine(True).run([])
+	assert rules['mStreamInf'].result(None)[0] is False